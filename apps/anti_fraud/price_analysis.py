@@ -0,0 +1,206 @@
+"""
+Narx anomaliyalarini vektorlashtirilgan hisoblash
+
+Tender narxlari NumPy massivi sifatida bir o'tishda tahlil qilinadi: o'rtacha
+va standart chetlanish (z-score), mediana/MAD (robust z-score) va IQR
+chegaralari. Tarixiy bazaviy qiymatlar tender turi bo'yicha narx/byudjet
+nisbatidan olinadi. Funksiyalar bazaga murojaat qilmaydi - massivlarni
+AntiFraudAnalyzer tayyorlaydi.
+"""
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+# MAD ni normal taqsimot standart chetlanishiga keltirish koeffitsienti
+MAD_SCALE = 0.6745
+IQR_FENCE = 1.5
+
+# Sun'iy yaxlitlash: o'rtachadan shuncha farq qilgan yuzlik narxlar
+ROUND_DEVIATION = 0.3
+
+MARKET_DEVIATION_RISK = 25
+UNNATURAL_ROUND_RISK = 30
+
+
+def price_statistics(values: np.ndarray) -> Dict[str, float]:
+    """Oddiy va robust statistikalar (bitta massiv bo'yicha)"""
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    return {
+        'count': int(values.size),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'median': float(median),
+        'mad': float(np.median(np.abs(values - median))),
+        'q1': float(q1),
+        'q3': float(q3),
+        'iqr': float(iqr),
+        'lower_fence': float(q1 - IQR_FENCE * iqr),
+        'upper_fence': float(q3 + IQR_FENCE * iqr),
+    }
+
+
+def robust_z_scores(values: np.ndarray, median: float, mad: float) -> np.ndarray:
+    """Mediana/MAD bo'yicha z-score (MAD nol bo'lsa nol)"""
+    if mad <= 0:
+        return np.zeros_like(values)
+    return MAD_SCALE * (values - median) / mad
+
+
+def unnaturally_round_mask(prices: np.ndarray, mean_price: float) -> np.ndarray:
+    """Sun'iy yaxlitlangan narxlar niqobi (.00/.50, mingliklar, chetlangan yuzliklar)"""
+    cents = np.rint(prices * 100).astype(np.int64) % 100
+    deviation = np.abs(prices - mean_price) / mean_price if mean_price > 0 else np.zeros_like(prices)
+    return (
+        (cents == 0) | (cents == 50)
+        | (np.mod(prices, 1000) == 0)
+        | ((deviation >= ROUND_DEVIATION) & (np.mod(prices, 100) == 0))
+    )
+
+
+def ratio_baseline(ratios: np.ndarray, min_samples: int) -> Optional[Dict[str, float]]:
+    """Narx/byudjet nisbatlari statistikasi (namunalar yetarli bo'lmasa None)"""
+    if ratios.size == 0 or ratios.size < min_samples:
+        return None
+    stats = price_statistics(ratios)
+    return {key: stats[key] for key in ('count', 'median', 'mad', 'q1', 'q3')}
+
+
+def category_baselines(categories: np.ndarray, ratios: np.ndarray, min_samples: int) -> Dict[str, Dict[str, float]]:
+    """Tender turi bo'yicha narx/byudjet nisbati statistikasi"""
+    baselines = {}
+    if ratios.size == 0:
+        return baselines
+    order = np.argsort(categories, kind='stable')
+    names, starts = np.unique(categories[order], return_index=True)
+    for name, group in zip(names, np.split(ratios[order], starts[1:])):
+        baseline = ratio_baseline(group, min_samples)
+        if baseline is not None:
+            baselines[str(name)] = baseline
+    return baselines
+
+
+def score_price_group(
+    participant_ids: Sequence[int],
+    prices: np.ndarray,
+    deviation_threshold: float,
+    budget: Optional[float] = None,
+    baseline: Optional[Dict[str, float]] = None,
+    robust_threshold: float = 3.5,
+) -> Dict[str, Any]:
+    """
+    Bitta tender narxlarini baholash
+
+    Aniqlashlar avvalgi formatda: o'rtachadan chetlanish (too_low/too_high),
+    sun'iy yaxlitlash (unnatural_round) va tender turi bazasidan keskin
+    chetlanish (market_deviation).
+    """
+    results = {
+        'detections': [],
+        'risk_score': 0.0,
+    }
+    if prices.size < 2:
+        return results
+
+    stats = price_statistics(prices)
+    mean_price = stats['mean']
+    std_price = stats['std']
+    distance = np.abs(prices - mean_price)
+    z_scores = distance / std_price if std_price > 0 else np.zeros_like(prices)
+    deviations = distance / mean_price if mean_price > 0 else np.zeros_like(prices)
+    robust_z = np.abs(robust_z_scores(prices, stats['median'], stats['mad']))
+    iqr_outliers = (prices < stats['lower_fence']) | (prices > stats['upper_fence'])
+    flagged = deviations >= deviation_threshold
+    round_mask = unnaturally_round_mask(prices, mean_price)
+
+    ratios = baseline_z = None
+    market_mask = np.zeros_like(flagged)
+    if baseline and budget:
+        ratios = prices / budget
+        baseline_z = np.abs(robust_z_scores(ratios, baseline['median'], baseline['mad']))
+        market_mask = (baseline_z >= robust_threshold) & ~flagged
+
+    price_range = {
+        key: stats[key] for key in ('min', 'max', 'mean', 'std', 'median', 'mad', 'q1', 'q3')
+    }
+
+    def baseline_evidence(index: int) -> Optional[Dict[str, float]]:
+        if ratios is None:
+            return None
+        return {
+            'price_to_budget': float(ratios[index]),
+            'median_ratio': baseline['median'],
+            'robust_z_score': float(baseline_z[index]),
+            'sample_size': baseline['count'],
+        }
+
+    for index in np.flatnonzero(flagged):
+        price = float(prices[index])
+        deviation = float(deviations[index])
+        if price < mean_price:
+            anomaly_type = 'too_low'
+            description = f'Taklif etilgan narx kutilganidan {deviation:.1%} past'
+        else:
+            anomaly_type = 'too_high'
+            description = f'Taklif etilgan narx kutilganidan {deviation:.1%} yuqori'
+        risk_score = min(deviation * 100, 100)
+        results['detections'].append({
+            'detection_type': 'price_anomaly',
+            'anomaly_type': anomaly_type,
+            'severity': 'critical' if deviation >= 0.5 else 'high',
+            'risk_score': risk_score,
+            'description': description,
+            'participant_id': participant_ids[index],
+            'evidence': {
+                'proposed_price': price,
+                'expected_price': mean_price,
+                'deviation_percentage': deviation,
+                'z_score': float(z_scores[index]),
+                'robust_z_score': float(robust_z[index]),
+                'iqr_outlier': bool(iqr_outliers[index]),
+                'price_range': price_range,
+                'category_baseline': baseline_evidence(index),
+            }
+        })
+        results['risk_score'] += risk_score
+
+    for index in np.flatnonzero(round_mask):
+        results['detections'].append({
+            'detection_type': 'price_anomaly',
+            'anomaly_type': 'unnatural_round',
+            'severity': 'medium',
+            'risk_score': UNNATURAL_ROUND_RISK,
+            'description': 'Narx sun\'iy yaxlitlangan ko\'rinadi',
+            'participant_id': participant_ids[index],
+            'evidence': {
+                'proposed_price': float(prices[index]),
+                'is_round_number': True,
+            }
+        })
+        results['risk_score'] += UNNATURAL_ROUND_RISK
+
+    for index in np.flatnonzero(market_mask):
+        evidence = baseline_evidence(index)
+        results['detections'].append({
+            'detection_type': 'price_anomaly',
+            'anomaly_type': 'market_deviation',
+            'severity': 'medium',
+            'risk_score': MARKET_DEVIATION_RISK,
+            'description': (
+                f"Narx/byudjet nisbati ({evidence['price_to_budget']:.2f}) shu turdagi tenderlar "
+                f"medianasidan ({evidence['median_ratio']:.2f}) keskin farq qiladi"
+            ),
+            'participant_id': participant_ids[index],
+            'evidence': {
+                'proposed_price': float(prices[index]),
+                'robust_z_score': float(robust_z[index]),
+                'iqr_outlier': bool(iqr_outliers[index]),
+                'price_range': price_range,
+                'category_baseline': evidence,
+            }
+        })
+        results['risk_score'] += MARKET_DEVIATION_RISK
+
+    return results
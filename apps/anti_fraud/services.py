@@ -4,20 +4,28 @@ import ipaddress
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Q, Count, Avg, StdDev
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from django.db.models import Q, Count, Avg, Max, StdDev
 import numpy as np
 from .models import (
     FraudDetection, MetadataAnalysis, PriceAnomalyDetection, 
     SimilarityAnalysis, FraudDetectionRule
 )
 from apps.tenders.models import Tender
+from apps.tenders.snapshot import ensure_snapshot
 from apps.participants.models import TenderParticipant, ParticipantDocument
+from .price_analysis import category_baselines, ratio_baseline, score_price_group
+from .shingles import ShingleIndex
 
 logger = logging.getLogger(__name__)
 
+FRAUD_ANALYSIS_CACHE_PREFIX = 'fraud_analysis:'
+# Tahlil mantiqi o'zgarganda oshiriladi - keshdagi eski xulosalar ishlatilmaydi
+FRAUD_ANALYSIS_VERSION = 2
+PRICE_HISTORY_CACHE_KEY = 'fraud_price_history'
+
 
 class AntiFraudAnalyzer:
     """Anti-korrupsiya tahlili xizmati"""
@@ -34,6 +42,7 @@ class AntiFraudAnalyzer:
         """
         try:
             logger.info(f"Tender korrupsiya tahlili boshlandi: {tender.id}")
+            tender = ensure_snapshot(tender)
             
             results = {
                 'tender_id': tender.id,
@@ -56,7 +65,7 @@ class AntiFraudAnalyzer:
             results['total_risk_score'] += metadata_results['risk_score']
             
             # Narx anomaliyalari tahlili
-            price_results = self._analyze_price_anomalies(tender, participants)
+            price_results = self._analyze_price_anomalies(tender, participants, self.get_price_history())
             results['detections'].extend(price_results['detections'])
             results['total_risk_score'] += price_results['risk_score']
             
@@ -95,6 +104,74 @@ class AntiFraudAnalyzer:
                 'error': str(e),
             }
     
+    def tender_data_version(self, tender: Tender) -> str:
+        """
+        Tender ishtirokchilari va hujjatlari holatining xeshi
+
+        Ishtirokchi yoki hujjat qo'shilsa, o'chirilsa yoki o'zgartirilsa versiya
+        o'zgaradi va keshdagi korrupsiya tahlili eskiradi.
+        """
+        participants = TenderParticipant.objects.filter(tender=tender).aggregate(
+            count=Count('id'), updated=Max('updated_at'), companies_updated=Max('participant__updated_at'),
+        )
+        documents = ParticipantDocument.objects.filter(tender_participant__tender=tender).aggregate(
+            count=Count('id'), updated=Max('updated_at'),
+        )
+        raw = '|'.join(str(value) for value in (
+            tender.id, tender.updated_at,
+            participants['count'], participants['updated'], participants['companies_updated'],
+            documents['count'], documents['updated'],
+        ))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+    def analysis_config_version(self) -> str:
+        """
+        Tahlil sozlamalari xeshi
+
+        Kod versiyasi, chegaralar yoki faol FraudDetectionRule qoidalari o'zgarsa
+        versiya o'zgaradi va keshdagi korrupsiya tahlili eskiradi.
+        """
+        rules = FraudDetectionRule.objects.filter(is_active=True).aggregate(
+            count=Count('id'), updated=Max('updated_at'),
+        )
+        raw = '|'.join(str(value) for value in (
+            FRAUD_ANALYSIS_VERSION,
+            self.similarity_threshold, self.price_deviation_threshold,
+            self.metadata_similarity_threshold, self.ip_similarity_threshold,
+            getattr(settings, 'PRICE_ROBUST_Z_THRESHOLD', 3.5),
+            getattr(settings, 'PRICE_BASELINE_MIN_SAMPLES', 20),
+            rules['count'], rules['updated'],
+        ))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+    def get_tender_fraud_analysis(self, tender: Tender, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Tender korrupsiya tahlili (tender ma'lumotlari va tahlil sozlamalari versiyasi bo'yicha keshlanadi)
+
+        Baholashda tahlil barcha ishtirokchilar uchun bir marta hisoblanadi.
+        """
+        key = (
+            f'{FRAUD_ANALYSIS_CACHE_PREFIX}{tender.id}:'
+            f'{self.tender_data_version(tender)}:{self.analysis_config_version()}'
+        )
+        if use_cache:
+            try:
+                cached = cache.get(key)
+            except Exception as e:
+                logger.warning(f"Korrupsiya tahlili keshini o'qishda xatolik: {str(e)}")
+                cached = None
+            if cached is not None:
+                logger.info(f"Tender korrupsiya tahlili keshdan olindi: {tender.id}")
+                return cached
+
+        results = self.analyze_tender_fraud_risks(tender)
+        if use_cache and 'error' not in results:
+            try:
+                cache.set(key, results, timeout=getattr(settings, 'FRAUD_ANALYSIS_CACHE_TTL', 3600))
+            except Exception as e:
+                logger.warning(f"Korrupsiya tahlilini keshlashda xatolik: {str(e)}")
+        return results
+
     def _analyze_metadata_similarity(self, participants) -> Dict[str, Any]:
         """Metadata o'xshashligini tahlil qilish"""
         results = {
@@ -157,99 +234,145 @@ class AntiFraudAnalyzer:
         
         return results
     
-    def _analyze_price_anomalies(self, tender: Tender, participants) -> Dict[str, Any]:
-        """Narx anomaliyalarini tahlil qilish"""
+    def _analyze_price_anomalies(self, tender: Tender, participants, history: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+        """
+        Narx anomaliyalarini tahlil qilish (bitta vektorlashtirilgan o'tish)
+
+        history berilsa, tender turi bazasi shu tenderning o'z takliflarisiz hisoblanadi.
+        """
         results = {
             'detections': [],
             'risk_score': 0.0,
         }
         
         try:
-            # Narxlar ro'yxatini olish
-            prices = []
-            participant_prices = {}
+            priced = [participant for participant in participants if participant.proposed_price]
+            prices = np.array([float(participant.proposed_price) for participant in priced], dtype=float)
+            
+            results = score_price_group(
+                [participant.id for participant in priced], prices, self.price_deviation_threshold,
+                budget=float(tender.estimated_budget or 0),
+                baseline=self.price_baseline(tender.tender_type, tender.id, history) if history is not None else None,
+                robust_threshold=getattr(settings, 'PRICE_ROBUST_Z_THRESHOLD', 3.5),
+            )
             
-            for participant in participants:
-                if participant.proposed_price:
-                    prices.append(float(participant.proposed_price))
-                    participant_prices[participant.id] = float(participant.proposed_price)
+            logger.info(f"Narx anomaliyalari tahlili: {len(results['detections'])} ta xavf topildi")
             
-            if len(prices) < 2:
+        except Exception as e:
+            logger.error(f"Narx anomaliyalari tahlilida xatolik: {str(e)}")
+        
+        return results
+    
+    def get_price_history(self, use_cache: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Tarixiy narx/byudjet nisbatlari: {'categories', 'tender_ids', 'ratios'} massivlari
+
+        Barcha tenderlar narxlari bitta so'rovda olinadi; natija keshlanadi.
+        """
+        if use_cache:
+            try:
+                cached = cache.get(PRICE_HISTORY_CACHE_KEY)
+            except Exception as e:
+                logger.warning(f"Narx bazasi keshini o'qishda xatolik: {str(e)}")
+                cached = None
+            if cached is not None:
+                return cached
+        
+        try:
+            rows = list(
+                TenderParticipant.objects
+                .filter(proposed_price__gt=0, tender__estimated_budget__gt=0)
+                .values_list('tender__tender_type', 'tender_id', 'proposed_price', 'tender__estimated_budget')
+            )
+            if rows:
+                categories, tender_ids, prices, budgets = zip(*rows)
+            else:
+                categories, tender_ids, prices, budgets = (), (), (), ()
+            history = {
+                'categories': np.array(categories, dtype=str),
+                'tender_ids': np.array(tender_ids, dtype=np.int64),
+                'ratios': np.array(prices, dtype=float) / np.array(budgets, dtype=float),
+            }
+        except Exception as e:
+            logger.error(f"Narx bazasini hisoblashda xatolik: {str(e)}")
+            return {
+                'categories': np.array([], dtype=str),
+                'tender_ids': np.array([], dtype=np.int64),
+                'ratios': np.array([], dtype=float),
+            }
+        
+        if use_cache:
+            try:
+                cache.set(PRICE_HISTORY_CACHE_KEY, history, timeout=getattr(settings, 'PRICE_BASELINE_CACHE_TTL', 24 * 3600))
+            except Exception as e:
+                logger.warning(f"Narx bazasini keshlashda xatolik: {str(e)}")
+        return history
+    
+    def price_baseline(
+        self,
+        category: str,
+        exclude_tender_id: Optional[int] = None,
+        history: Optional[Dict[str, np.ndarray]] = None,
+    ) -> Optional[Dict[str, float]]:
+        """
+        Bitta tender turi uchun narx/byudjet nisbati bazasi
+
+        Baholanayotgan tenderning o'z takliflari (exclude_tender_id) chiqarib
+        tashlanadi - aks holda mediana/MAD aniqlanishi kerak bo'lgan chetlanishlar
+        tomon siljiydi.
+        """
+        history = history if history is not None else self.get_price_history()
+        mask = (history['categories'] == category) & (history['tender_ids'] != exclude_tender_id)
+        return ratio_baseline(history['ratios'][mask], getattr(settings, 'PRICE_BASELINE_MIN_SAMPLES', 20))
+    
+    def get_price_baselines(self, exclude_tender_id: Optional[int] = None, use_cache: bool = True) -> Dict[str, Dict[str, float]]:
+        """Tender turi bo'yicha tarixiy narx/byudjet nisbati bazasi (barcha turlar)"""
+        history = self.get_price_history(use_cache)
+        mask = history['tender_ids'] != exclude_tender_id
+        return category_baselines(
+            history['categories'][mask], history['ratios'][mask], getattr(settings, 'PRICE_BASELINE_MIN_SAMPLES', 20)
+        )
+    
+    def score_price_anomalies_batch(self, tenders) -> Dict[int, Dict[str, Any]]:
+        """
+        Ko'p tenderlar narx anomaliyalarini birdaniga baholash
+
+        `tenders` - queryset yoki tender/ID ro'yxati. Narxlar bitta so'rovda
+        olinadi va tender bo'yicha guruhlanadi; narxli ishtirokchisi bor har bir
+        tender uchun {'detections', 'risk_score'} qaytariladi.
+        """
+        results = {}
+        try:
+            rows = list(
+                TenderParticipant.objects
+                .filter(tender__in=tenders, proposed_price__gt=0)
+                .order_by('tender_id', 'id')
+                .values_list('tender_id', 'id', 'proposed_price', 'tender__estimated_budget', 'tender__tender_type')
+            )
+            if not rows:
                 return results
             
-            # Statistik tahlil
-            mean_price = np.mean(prices)
-            std_price = np.std(prices)
-            
-            # Har bir ishtirokchi uchun narx anomaliyasini tekshirish
-            for participant_id, price in participant_prices.items():
-                # Z-score hisoblash
-                if std_price > 0:
-                    z_score = abs(price - mean_price) / std_price
-                else:
-                    z_score = 0
-                
-                # Foizdagi chetlanish
-                deviation_percentage = abs(price - mean_price) / mean_price if mean_price > 0 else 0
-                
-                if deviation_percentage >= self.price_deviation_threshold:
-                    # Anomaliya aniqlandi
-                    if price < mean_price:
-                        anomaly_type = 'too_low'
-                        description = f'Taklif etilgan narx kutilganidan {deviation_percentage:.1%} past'
-                    else:
-                        anomaly_type = 'too_high'
-                        description = f'Taklif etilgan narx kutilganidan {deviation_percentage:.1%} yuqori'
-                    
-                    risk_score = min(deviation_percentage * 100, 100)
-                    
-                    detection = {
-                        'detection_type': 'price_anomaly',
-                        'anomaly_type': anomaly_type,
-                        'severity': 'critical' if deviation_percentage >= 0.5 else 'high',
-                        'risk_score': risk_score,
-                        'description': description,
-                        'participant_id': participant_id,
-                        'evidence': {
-                            'proposed_price': price,
-                            'expected_price': mean_price,
-                            'deviation_percentage': deviation_percentage,
-                            'z_score': z_score,
-                            'price_range': {
-                                'min': min(prices),
-                                'max': max(prices),
-                                'mean': mean_price,
-                                'std': std_price,
-                            }
-                        }
-                    }
-                    
-                    results['detections'].append(detection)
-                    results['risk_score'] += risk_score
-            
-            # Sun'iy yaxlitlangan narxlarni tekshirish
-            for participant_id, price in participant_prices.items():
-                if self._is_unnaturally_round(price, mean_price):
-                    detection = {
-                        'detection_type': 'price_anomaly',
-                        'anomaly_type': 'unnatural_round',
-                        'severity': 'medium',
-                        'risk_score': 30,
-                        'description': 'Narx sun\'iy yaxlitlangan ko\'rinadi',
-                        'participant_id': participant_id,
-                        'evidence': {
-                            'proposed_price': price,
-                            'is_round_number': True,
-                        }
-                    }
-                    
-                    results['detections'].append(detection)
-                    results['risk_score'] += 30
-            
-            logger.info(f"Narx anomaliyalari tahlili: {len(results['detections'])} ta xavf topildi")
+            tender_ids, participant_ids, prices, budgets, categories = zip(*rows)
+            tender_ids = np.array(tender_ids)
+            prices = np.array(prices, dtype=float)
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(tender_ids)) + 1))
+            ends = np.append(starts[1:], tender_ids.size)
+            
+            history = self.get_price_history()
+            robust_threshold = getattr(settings, 'PRICE_ROBUST_Z_THRESHOLD', 3.5)
+            for start, end in zip(starts, ends):
+                tender_id = int(tender_ids[start])
+                results[tender_id] = score_price_group(
+                    participant_ids[start:end], prices[start:end], self.price_deviation_threshold,
+                    budget=float(budgets[start] or 0),
+                    baseline=self.price_baseline(categories[start], tender_id, history),
+                    robust_threshold=robust_threshold,
+                )
+            
+            logger.info(f"Narx anomaliyalari ommaviy tahlili: {len(results)} ta tender baholandi")
             
         except Exception as e:
-            logger.error(f"Narx anomaliyalari tahlilida xatolik: {str(e)}")
+            logger.error(f"Narx anomaliyalari ommaviy tahlilida xatolik: {str(e)}")
         
         return results
     
@@ -278,6 +401,9 @@ class AntiFraudAnalyzer:
                 return results
             
             # TF-IDF vektorizatsiya
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.metrics.pairwise import cosine_similarity
+            
             vectorizer = TfidfVectorizer(
                 max_features=1000,
                 stop_words=['va', 'ham', 'bilan', 'uchun', 'va', 'the', 'and', 'or', 'but'],
@@ -292,6 +418,7 @@ class AntiFraudAnalyzer:
                 
                 # Yuqori o'xshashlikdagi juftliklarni topish
                 participant_ids = list(participant_texts.keys())
+                shingle_indexes = {}
                 
                 for i in range(len(similarity_matrix)):
                     for j in range(i + 1, len(similarity_matrix)):
@@ -300,6 +427,12 @@ class AntiFraudAnalyzer:
                         if similarity >= self.similarity_threshold:
                             risk_score = similarity * 80
                             
+                            # Har bir hujjat indeksi bir marta quriladi
+                            for index in (i, j):
+                                if index not in shingle_indexes:
+                                    shingle_indexes[index] = ShingleIndex(texts[index])
+                            matches = self._find_matching_phrases(shingle_indexes[i], shingle_indexes[j])
+                            
                             detection = {
                                 'detection_type': 'content_similarity',
                                 'severity': 'critical' if similarity >= 0.9 else 'high',
@@ -313,9 +446,8 @@ class AntiFraudAnalyzer:
                                     'similarity_score': similarity,
                                     'text_length_1': len(texts[i]),
                                     'text_length_2': len(texts[j]),
-                                    'matching_phrases': self._find_matching_phrases(
-                                        texts[i], texts[j]
-                                    ),
+                                    'matching_phrases': [match['phrase'] for match in matches],
+                                    'matching_phrase_offsets': matches,
                                 }
                             }
                             
@@ -582,50 +714,23 @@ class AntiFraudAnalyzer:
         
         return list(software1 & software2)
     
-    def _is_unnaturally_round(self, price: float, mean_price: float) -> bool:
-        """Sun'iy yaxlitlangan narxni tekshirish"""
-        try:
-            # Narxning yaxlitlik darajasini tekshirish
-            price_str = f"{price:.2f}"
-            
-            # Agar .00 yoki .50 bilan tugasa
-            if price_str.endswith('.00') or price_str.endswith('.50'):
-                return True
-            
-            # Agar 1000, 10000 kabi yaxlit sonlar bo'lsa
-            if price % 1000 == 0:
-                return True
-            
-            # Agar o'rtacha narxdan juda farq qilsa va yaxlit bo'lsa
-            deviation = abs(price - mean_price) / mean_price if mean_price > 0 else 0
-            if deviation >= 0.3 and (price % 100 == 0):
-                return True
-            
-            return False
-        
-        except Exception as e:
-            logger.error(f"Sun'iy yaxlitlangan narxni tekshirishda xatolik: {str(e)}")
-            return False
-    
-    def _find_matching_phrases(self, text1: str, text2: str, min_length: int = 10) -> List[str]:
-        """Mos keladigan iboralarni topish"""
+    def _find_matching_phrases(self, index1: ShingleIndex, index2: ShingleIndex, min_length: int = 10, limit: int = 10) -> List[Dict[str, Any]]:
+        """Mos keladigan eng uzun iboralarni topish (shingle indekslari orqali)"""
         try:
-            # Matnlarni so'zlarga bo'lish
-            words1 = text1.lower().split()
-            words2 = text2.lower().split()
-            
             matching_phrases = []
-            
-            # 3-5 so'zli iboralarni tekshirish
-            for phrase_length in range(3, 6):
-                for i in range(len(words1) - phrase_length + 1):
-                    phrase = ' '.join(words1[i:i + phrase_length])
-                    
-                    if phrase in text2.lower() and len(phrase) >= min_length:
-                        matching_phrases.append(phrase)
-            
-            # Takrorlarni olib tashlash
-            return list(set(matching_phrases))[:10]  # Eng ko'pi bilan 10 ta
+            for run in index1.common_runs(index2):
+                phrase = index1.phrase(run.start_1, run.length)
+                if len(phrase) < min_length:
+                    continue
+                matching_phrases.append({
+                    'phrase': phrase,
+                    'word_count': run.length,
+                    'offset_1': index1.char_offset(run.start_1),
+                    'offset_2': index2.char_offset(run.start_2),
+                })
+                if len(matching_phrases) >= limit:
+                    break
+            return matching_phrases
         
         except Exception as e:
             logger.error(f"Mos keladigan iboralarni topishda xatolik: {str(e)}")
@@ -0,0 +1,109 @@
+"""
+So'z n-gram (shingle) indeksi
+
+Har bir hujjat bir marta so'zlarga bo'linadi va har bir n so'zli shingle uchun
+rolling hash hisoblanadi (hash -> pozitsiyalar). Ikki hujjatning umumiy
+bo'laklari shingle mosliklarini diagonal bo'yicha uzaytirish orqali topiladi:
+ikkinchi hujjat bir marta o'qiladi, shuning uchun vaqt hujjatlar uzunligiga
+deyarli chiziqli bog'liq (juda ko'p takrorlanadigan shablon shingle'lar
+hisobga olinmaydi).
+"""
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+SHINGLE_SIZE = 3
+HASH_BASE = 1000003
+HASH_MOD = (1 << 61) - 1
+
+# Hujjatda bundan ko'p uchraydigan shingle (shablon matn) mosliklarga olinmaydi
+MAX_SHINGLE_POSITIONS = 50
+
+
+class CommonRun(NamedTuple):
+    start_1: int  # birinchi hujjatdagi so'z pozitsiyasi
+    start_2: int  # ikkinchi hujjatdagi so'z pozitsiyasi
+    length: int  # so'zlar soni
+
+
+class ShingleIndex:
+    """Bitta hujjatning hashlangan shingle indeksi"""
+
+    def __init__(self, text: str, size: int = SHINGLE_SIZE):
+        self.text = text or ''
+        self.size = size
+        self.words: List[str] = []
+        self.spans: List[Tuple[int, int]] = []
+        for match in WORD_RE.finditer(self.text.lower()):
+            self.words.append(match.group())
+            self.spans.append(match.span())
+        self.hashes = self._rolling_hashes()
+        self.positions: Dict[int, List[int]] = {}
+        for position, value in enumerate(self.hashes):
+            self.positions.setdefault(value, []).append(position)
+
+    def _rolling_hashes(self) -> List[int]:
+        if len(self.words) < self.size:
+            return []
+        word_hashes = [hash(word) & HASH_MOD for word in self.words]
+        top = pow(HASH_BASE, self.size - 1, HASH_MOD)
+        value = 0
+        for word_hash in word_hashes[:self.size]:
+            value = (value * HASH_BASE + word_hash) % HASH_MOD
+        hashes = [value]
+        for position in range(self.size, len(word_hashes)):
+            value = (value - word_hashes[position - self.size] * top) % HASH_MOD
+            value = (value * HASH_BASE + word_hashes[position]) % HASH_MOD
+            hashes.append(value)
+        return hashes
+
+    def phrase(self, start: int, length: int) -> str:
+        """So'z pozitsiyalari bo'yicha asl matndagi ibora"""
+        return self.text[self.spans[start][0]:self.spans[start + length - 1][1]]
+
+    def char_offset(self, start: int) -> int:
+        return self.spans[start][0]
+
+    def common_runs(self, other: 'ShingleIndex') -> List[CommonRun]:
+        """
+        Ikki hujjatning eng uzun umumiy so'z ketma-ketliklari (uzunlik bo'yicha kamayish tartibida)
+
+        Ketma-ket mos shingle'lar bir diagonalda (i - j) uzaytiriladi; har bir
+        maksimal bo'lak bir marta qaytariladi, ikkinchi hujjatda bir-birini
+        qoplamaydigan bo'laklar tanlanadi.
+        """
+        if self.size != other.size:
+            raise ValueError("Shingle o'lchamlari mos emas")
+
+        runs = []
+        active: Dict[int, int] = {}  # diagonal -> bo'lak boshi (other dagi pozitsiya)
+        for position, value in enumerate(other.hashes):
+            candidates = self.positions.get(value, ())
+            if len(candidates) > MAX_SHINGLE_POSITIONS:
+                candidates = ()
+            current = {}
+            for candidate in candidates:
+                # Hash to'qnashuvidan himoya
+                if self.words[candidate:candidate + self.size] != other.words[position:position + self.size]:
+                    continue
+                diagonal = candidate - position
+                current[diagonal] = active.get(diagonal, position)
+            for diagonal, start in active.items():
+                if diagonal not in current:
+                    runs.append(CommonRun(start + diagonal, start, position - start + self.size - 1))
+            active = current
+        end = len(other.hashes)
+        for diagonal, start in active.items():
+            runs.append(CommonRun(start + diagonal, start, end - start + self.size - 1))
+
+        runs.sort(key=lambda run: (-run.length, run.start_2))
+        selected = []
+        covered = set()
+        for run in runs:
+            span = range(run.start_2, run.start_2 + run.length)
+            if covered.intersection(span):
+                continue
+            covered.update(span)
+            selected.append(run)
+        return selected
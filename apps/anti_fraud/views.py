@@ -122,7 +122,8 @@ JSON FORMAT:
         llm_result = llm_engine.generate_response(
             analysis_prompt,
             system_prompt="Sen korrupsiya va firibgarlikni aniqlash bo'yicha yuqori malakali ekspertsan. Tender jarayonlaridagi barcha shubhali belgilarni aniqlay olasan. Faqat JSON formatida javob ber.",
-            temperature=0.2
+            temperature=0.2,
+            caller='fraud'
         )
         
         if not llm_result.get('success'):
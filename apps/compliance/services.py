@@ -7,6 +7,7 @@ from django.utils import timezone
 from django.db.models import Q, Count, Avg
 from .models import ComplianceRule, ComplianceCheck, ComplianceReport, DocumentCompliance
 from apps.tenders.models import Tender, TenderRequirement
+from apps.tenders.snapshot import ensure_snapshot
 from apps.participants.models import TenderParticipant, ParticipantDocument
 
 logger = logging.getLogger(__name__)
@@ -25,6 +26,7 @@ class ComplianceChecker:
         """
         try:
             logger.info(f"Tender compliance tekshiruvi boshlandi: {tender.id}")
+            tender = ensure_snapshot(tender)
             
             results = {
                 'tender_id': tender.id,
@@ -397,9 +399,9 @@ class ComplianceChecker:
     def _check_technical_specification(self, tender: Tender, rule: Dict[str, Any]) -> Dict[str, Any]:
         """Texnik spetsifikatsiyani tekshirish"""
         try:
-            tech_requirements = tender.requirements.filter(requirement_type='technical')
+            tech_requirements = [req for req in tender.requirements.all() if req.requirement_type == 'technical']
             
-            if not tech_requirements.exists():
+            if not tech_requirements:
                 return {
                     'rule_id': rule['id'],
                     'status': 'failed',
@@ -410,7 +412,7 @@ class ComplianceChecker:
             
             # Texnik talablarning sifatini tekshirish
             quality_score = 0
-            total_requirements = tech_requirements.count()
+            total_requirements = len(tech_requirements)
             
             for req in tech_requirements:
                 # Tavsifning uzunligi
@@ -453,9 +455,9 @@ class ComplianceChecker:
     def _check_evaluation_criteria(self, tender: Tender, rule: Dict[str, Any]) -> Dict[str, Any]:
         """Baholash mezonlarini tekshirish"""
         try:
-            requirements = tender.requirements.all()
+            requirements = list(tender.requirements.all())
             
-            if not requirements.exists():
+            if not requirements:
                 return {
                     'rule_id': rule['id'],
                     'status': 'failed',
@@ -465,7 +467,7 @@ class ComplianceChecker:
                 }
             
             # Baholash mezonlarining to'g'riligini tekshirish
-            total_weight = requirements.aggregate(total=Sum('weight'))['total'] or 0
+            total_weight = sum(req.weight for req in requirements)
             
             # Vaznlarning yig'indisi 100 ga yaqin bo'lishi kerak
             if abs(total_weight - 100) <= 10:
@@ -479,7 +481,7 @@ class ComplianceChecker:
                 weight_status = 'failed'
             
             # Har bir tur uchun mezonlar borligini tekshirish
-            requirement_types = set(requirements.values_list('requirement_type', flat=True))
+            requirement_types = {req.requirement_type for req in requirements}
             required_types = {'technical', 'financial', 'experience'}
             
             missing_types = required_types - requirement_types
@@ -567,11 +569,11 @@ class ComplianceChecker:
         }
         
         try:
-            documents = tender.documents.all()
+            documents = list(tender.documents.all())
             
             # Majburiy hujjatlar
             required_docs = ['requirements', 'technical']
-            found_docs = set(documents.values_list('document_type', flat=True))
+            found_docs = {doc.document_type for doc in documents}
             missing_docs = set(required_docs) - found_docs
             
             if missing_docs:
@@ -584,13 +586,13 @@ class ComplianceChecker:
                 })
             
             # Hujjatlarni qayta ishlash holati
-            unprocessed_docs = documents.filter(is_processed=False)
-            if unprocessed_docs.exists():
+            unprocessed_docs = [doc for doc in documents if not doc.is_processed]
+            if unprocessed_docs:
                 results['violations'].append({
                     'rule_id': 'doc_002',
                     'rule_name': 'Hujjatlar qayta ishlashi',
                     'severity': 'medium',
-                    'description': f'{unprocessed_docs.count()} ta hujjat hali qayta ishlanmagan',
+                    'description': f'{len(unprocessed_docs)} ta hujjat hali qayta ishlanmagan',
                     'recommendation': 'Hujjatlarni qayta ishlashni boshlang',
                 })
         
@@ -670,11 +672,11 @@ class ComplianceChecker:
         }
         
         try:
-            documents = participant.documents.all()
+            documents = list(participant.documents.all())
             
             # Majburiy hujjatlar
             required_docs = ['proposal', 'financial', 'technical']
-            found_docs = set(documents.values_list('document_type', flat=True))
+            found_docs = {doc.document_type for doc in documents}
             missing_docs = set(required_docs) - found_docs
             
             if missing_docs:
@@ -687,13 +689,13 @@ class ComplianceChecker:
                 })
             
             # Hujjatlarni qayta ishlash holati
-            unprocessed_docs = documents.filter(is_processed=False)
-            if unprocessed_docs.exists():
+            unprocessed_docs = [doc for doc in documents if not doc.is_processed]
+            if unprocessed_docs:
                 results['violations'].append({
                     'rule_id': 'part_doc_002',
                     'rule_name': 'Hujjatlar qayta ishlashi',
                     'severity': 'medium',
-                    'description': f'{unprocessed_docs.count()} ta hujjat hali qayta ishlanmagan',
+                    'description': f'{len(unprocessed_docs)} ta hujjat hali qayta ishlanmagan',
                     'recommendation': 'Hujjatlarni qayta ishlashni kutib turing',
                 })
         
@@ -712,7 +714,7 @@ class ComplianceChecker:
         try:
             # Tajriba talablari
             tender = participant.tender
-            experience_requirements = tender.requirements.filter(requirement_type='experience')
+            experience_requirements = [req for req in tender.requirements.all() if req.requirement_type == 'experience']
             
             for req in experience_requirements:
                 if req.is_mandatory:
@@ -771,8 +773,7 @@ class ComplianceChecker:
         
         try:
             # Texnik hujjat mavjudligi
-            tech_docs = participant.documents.filter(document_type='technical')
-            if not tech_docs.exists():
+            if not any(doc.document_type == 'technical' for doc in participant.documents.all()):
                 results['violations'].append({
                     'rule_id': 'part_tech_001',
                     'rule_name': 'Texnik hujjat',
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Evaluation, TenderAnalysisResult
+from .models import AnalysisJob, Evaluation, LLMUsageStat, TenderAnalysisResult
 
 
 @admin.register(Evaluation)
@@ -33,3 +33,18 @@ class TenderAnalysisResultAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(LLMUsageStat)
+class LLMUsageStatAdmin(admin.ModelAdmin):
+    list_display = ['period', 'caller', 'provider', 'model', 'calls', 'failures', 'prompt_tokens', 'completion_tokens', 'max_latency_ms', 'cost_usd']
+    list_filter = ['caller', 'provider', 'model']
+    date_hierarchy = 'period'
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ['job_id', 'status', 'user', 'created_at', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['job_id', 'user__username']
+    readonly_fields = ['created_at', 'updated_at']
@@ -10,16 +10,22 @@ from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 import os
+import json
+import hashlib
 import logging
-import PyPDF2
 from docx import Document
 import tempfile
 import io
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 # PDF uchun
 from reportlab.lib import colors
@@ -31,9 +37,18 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase.pdfmetrics import registerFontFamily
 
-from core.tender_analyzer import tender_analyzer
-from core.services import document_processor
-from .models import TenderAnalysisResult
+from core.tender_analyzer import (
+    TenderAnalyzer,
+    resolve_participant_names,
+    run_full_analysis,
+    make_tender_key,
+    save_tender_analysis,
+    load_tender_analysis,
+)
+from core.services import document_processor, extraction_version
+from core.document_validity import check_document_validity
+from .models import TenderAnalysisResult, ExtractedDocumentText
+from .tasks import run_full_analysis_job, create_analysis_job, update_analysis_job, get_analysis_job
 
 logger = logging.getLogger(__name__)
 
@@ -95,25 +110,89 @@ def _msg(language: str, uz_latn: str, uz_cyrl: str, ru: str) -> str:
     return uz_latn
 
 
-def extract_text_from_file(file) -> str:
-    """Fayldan matn ajratib olish"""
+def _resolve_tender_data(request) -> dict:
+    """
+    So'rovga tegishli tender tahlilini topish
+    
+    Tartib: aniq tender_key -> tender_data ichidagi tender_key (omborda bo'lsa)
+    -> tender_data o'zi -> sessiyadagi oxirgi tender_key.
+    """
+    tender_key = request.data.get('tender_key') or request.query_params.get('tender_key')
+    tender_data = request.data.get('tender_data', '')
+    if tender_data and isinstance(tender_data, str):
+        try:
+            tender_data = json.loads(tender_data)
+        except Exception as e:
+            logger.warning(f"tender_data ni parse qilishda xatolik: {e}")
+            tender_data = None
+    if not isinstance(tender_data, dict):
+        tender_data = None
+    
+    if not tender_key and tender_data:
+        tender_key = tender_data.get('tender_key')
+    
+    stored = load_tender_analysis(tender_key)
+    if stored:
+        return stored
+    if tender_data:
+        return tender_data
+    return load_tender_analysis(request.session.get('tender_key')) if hasattr(request, 'session') else None
+
+
+def _store_tender_analysis(request, tender_text: str, analysis: dict, language: str = '') -> str:
+    """Tender tahlilini omborga saqlash va kalitni sessiyaga yozish"""
+    tender_key = make_tender_key(tender_text, language)
+    analysis['tender_key'] = tender_key
+    save_tender_analysis(tender_key, analysis)
+    if hasattr(request, 'session'):
+        request.session['tender_key'] = tender_key
+    return tender_key
+
+
+def _wants_stream(request) -> bool:
+    """So'rov oqimli javob talab qiladimi (stream=true)"""
+    value = request.data.get('stream', request.query_params.get('stream', False))
+    return str(value).lower() in ['1', 'true', 'yes']
+
+
+def _ndjson_response(events) -> StreamingHttpResponse:
+    """Hodisalar oqimini NDJSON (har satrda bitta JSON) sifatida qaytarish"""
+    def _lines():
+        for event in events:
+            yield json.dumps(event, ensure_ascii=False, default=str) + '\n'
+    
+    response = StreamingHttpResponse(_lines(), content_type='application/x-ndjson; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _hash_uploaded_file(file) -> str:
+    """Yuklangan fayl mazmunining SHA-256 xeshi"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _parse_uploaded_file(file, file_type: str) -> Dict[str, Any]:
+    """Faylni parse qilish: {'text': ..., 'page_count': ...}"""
     text = ""
-    filename = file.name.lower()
+    page_count = None
+    tmp_path = None
     
     try:
         # Vaqtinchalik faylga saqlash
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_type) as tmp:
             for chunk in file.chunks():
                 tmp.write(chunk)
             tmp_path = tmp.name
         
-        if filename.endswith('.pdf'):
-            with open(tmp_path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+        if file_type == '.pdf':
+            text, page_count = document_processor.read_pdf_text(tmp_path)
         
-        elif filename.endswith('.docx'):
+        elif file_type == '.docx':
             doc = Document(tmp_path)
             for para in doc.paragraphs:
                 text += para.text + "\n"
@@ -123,22 +202,124 @@ def extract_text_from_file(file) -> str:
                         text += cell.text + " "
                     text += "\n"
         
-        elif filename.endswith('.txt'):
+        elif file_type == '.txt':
             with open(tmp_path, 'r', encoding='utf-8') as f:
                 text = f.read()
         
         else:
             # Oddiy matn sifatida o'qish
+            file.seek(0)
             text = file.read().decode('utf-8', errors='ignore')
         
-        # Vaqtinchalik faylni o'chirish
-        os.unlink(tmp_path)
-        
     except Exception as e:
         logger.error(f"Fayl o'qishda xatolik: {str(e)}")
         text = ""
     
-    return text
+    finally:
+        # Vaqtinchalik faylni o'chirish
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    
+    return {'text': text, 'page_count': page_count}
+
+
+def _load_extracted_text(file, file_type: str, content_hash: str, version: str) -> Optional[Dict[str, Any]]:
+    """Bazadagi ajratilgan matn (topilmasa None)"""
+    try:
+        cached = ExtractedDocumentText.objects.filter(
+            content_hash=content_hash, file_type=file_type, extractor_version=version
+        ).first()
+        if cached is None:
+            return None
+        ExtractedDocumentText.objects.filter(pk=cached.pk).update(
+            hit_count=F('hit_count') + 1, last_used_at=timezone.now()
+        )
+        logger.info(f"Fayl matni keshdan olindi: {file.name} ({content_hash[:12]})")
+        return {
+            'text': cached.text,
+            'page_count': cached.page_count,
+            'content_hash': content_hash,
+            'cached': True,
+        }
+    except Exception as e:
+        logger.warning(f"Matn keshidan o'qishda xatolik: {str(e)}")
+        return None
+
+
+def _store_extracted_text(file, file_type: str, content_hash: str, version: str, parsed: Dict[str, Any]) -> None:
+    """Ajratilgan matnni bazaga yozish (bo'sh natija - parse xatosi - keshlanmaydi)"""
+    if not parsed['text'].strip():
+        return
+    try:
+        ExtractedDocumentText.objects.update_or_create(
+            content_hash=content_hash,
+            file_type=file_type,
+            extractor_version=version,
+            defaults={
+                'text': parsed['text'],
+                'page_count': parsed['page_count'],
+                'file_size': file.size or 0,
+            },
+        )
+    except Exception as e:
+        logger.warning(f"Matn keshiga yozishda xatolik: {str(e)}")
+
+
+def extract_documents(files: List[Any], max_workers: int = 1) -> List[Dict[str, Any]]:
+    """
+    Bir nechta fayldan matn ajratish (kirish tartibi saqlanadi)
+    
+    Natija fayl mazmunining SHA-256 xeshi va ajratuvchi versiyasi bo'yicha bazada
+    saqlanadi: xuddi shu fayl qayta yuklanganda parse qilinmaydi, ajratuvchi yoki OCR
+    (Tesseract, tillar, DPI) o'zgarganda esa qayta ajratiladi. Keshga murojaat so'rov
+    oqimida bajariladi - oqimlar puliga faqat parse beriladi, shuning uchun pul
+    oqimlari DB ulanishi ochmaydi.
+    
+    Returns:
+        [{'text', 'page_count', 'content_hash', 'cached'}, ...]
+    """
+    use_cache = getattr(settings, 'EXTRACTION_CACHE_ENABLED', True)
+    results: List[Optional[Dict[str, Any]]] = []
+    misses = []
+    for index, file in enumerate(files):
+        file_type = os.path.splitext(file.name.lower())[1]
+        content_hash = _hash_uploaded_file(file)
+        version = extraction_version(file_type)
+        cached = _load_extracted_text(file, file_type, content_hash, version) if use_cache else None
+        results.append(cached)
+        if cached is None:
+            misses.append((index, file, file_type, content_hash, version))
+    
+    if not misses:
+        return results
+    
+    workers = max(1, min(max_workers, len(misses)))
+    if workers == 1:
+        parsed_list = [_parse_uploaded_file(file, file_type) for _, file, file_type, _, _ in misses]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parsed_list = list(executor.map(lambda miss: _parse_uploaded_file(miss[1], miss[2]), misses))
+    
+    for (index, file, file_type, content_hash, version), parsed in zip(misses, parsed_list):
+        if use_cache:
+            _store_extracted_text(file, file_type, content_hash, version, parsed)
+        results[index] = {**parsed, 'content_hash': content_hash, 'cached': False}
+    return results
+
+
+def extract_document(file) -> Dict[str, Any]:
+    """
+    Fayldan matn va sahifa ma'lumotlarini ajratish (keshlash - extract_documents da)
+    
+    Returns:
+        {'text', 'page_count', 'content_hash', 'cached'}
+    """
+    return extract_documents([file])[0]
+
+
+def extract_text_from_file(file) -> str:
+    """Fayldan matn ajratib olish"""
+    return extract_document(file)['text']
 
 
 @api_view(['POST'])
@@ -154,10 +335,12 @@ def analyze_tender(request):
         - text: Yoki to'g'ridan-to'g'ri matn
         - metadata: Qo'shimcha ma'lumotlar (JSON)
         - language: Til (uz yoki ru)
+        - stream: true bo'lsa, talablar NDJSON oqimi sifatida qaytariladi
     
     Returns:
         - success: bool
         - analysis: Tender tahlili natijalari
+        - tender_key: Ishtirokchi tahlilida ishlatiladigan tender kaliti
     """
     try:
         tender_text = ""
@@ -180,10 +363,13 @@ def analyze_tender(request):
                     'success': False,
                     'error': error_msg
                 }, status=status.HTTP_400_BAD_REQUEST)
-            tender_text = extract_text_from_file(file)
+            extracted = extract_document(file)
+            tender_text = extracted['text']
             metadata['filename'] = file.name
             metadata['file_size'] = file.size
-        # Mazmun va mantiqiy tekshiruv (GPT orqali)
+            if extracted['page_count']:
+                metadata['page_count'] = extracted['page_count']
+        # Mazmun va mantiqiy tekshiruv
         if tender_text.strip():
             from core.llm_engine import llm_engine
             if not getattr(llm_engine, 'providers', None):
@@ -198,17 +384,9 @@ def analyze_tender(request):
                     'error': error_msg
                 }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-            check_prompt = f"""
-Quyidagi matn tender shartnomasi yoki unga o'xshash rasmiy hujjatmi? Mazmunan va mantiqan to'g'ri, to'liq va tahlil qilishga yaroqlimi? Faqat 'HA' yoki 'YO' deb javob ber:
-
-{tender_text[:2000]}
-"""
-            check_result = llm_engine.generate_response(check_prompt, system_prompt="Faqat 'HA' yoki 'YO' deb javob ber.", temperature=0.0)
-            if isinstance(check_result, dict):
-                check_response = check_result.get('response', '').strip().upper()
-            else:
-                check_response = str(check_result).strip().upper()
-            if 'YO' in check_response:
+            # Mahalliy klassifikator; LLM faqat noaniq hujjatlar uchun chaqiriladi
+            verdict = check_document_validity(tender_text, 'tender')
+            if not verdict.valid:
                 error_msg = _msg(
                     language,
                     "Yuklangan fayl mazmunan yoki mantiqan noto'g'ri. Iltimos, to'g'ri tender faylini yuklang.",
@@ -256,10 +434,28 @@ Quyidagi matn tender shartnomasi yoki unga o'xshash rasmiy hujjatmi? Mazmunan va
         
         metadata['language'] = language
         
-        # Tahlil qilish
-        result = tender_analyzer.analyze_tender_document(tender_text, metadata)
+        # Tahlil qilish - har bir so'rov uchun alohida analyzer
+        analyzer = TenderAnalyzer()
+        
+        if _wants_stream(request):
+            tender_key = make_tender_key(tender_text, language)
+            if hasattr(request, 'session'):
+                request.session['tender_key'] = tender_key
+            
+            def _events():
+                for event in analyzer.stream_tender_analysis(tender_text, metadata):
+                    if event['type'] == 'done':
+                        event['analysis']['tender_key'] = tender_key
+                        event['tender_key'] = tender_key
+                        save_tender_analysis(tender_key, event['analysis'])
+                    yield event
+            
+            return _ndjson_response(_events())
+        
+        result = analyzer.analyze_tender_document(tender_text, metadata)
         
         if result['success']:
+            result['tender_key'] = _store_tender_analysis(request, tender_text, result['analysis'], language)
             return Response(result, status=status.HTTP_200_OK)
 
         error_text = str(result.get('error', ''))
@@ -299,7 +495,8 @@ def analyze_participant(request):
         - text: Yoki to'g'ridan-to'g'ri matn
         - metadata: Qo'shimcha ma'lumotlar (JSON)
         - language: Til (uz yoki ru)
-        - tender_data: Tender tahlili (agar server xotirasida yo'q bo'lsa)
+        - tender_key: analyze-tender qaytargan tender kaliti
+        - tender_data: Tender tahlili (agar omborda yo'q bo'lsa)
     
     Returns:
         - success: bool
@@ -313,25 +510,9 @@ def analyze_participant(request):
         metadata = {'language': language}
         
         logger.info(f"Ishtirokchi tahlili so'rovi: {participant_name}")
-        logger.info(f"tender_requirements mavjud: {len(tender_analyzer.tender_requirements)}")
-        
-        # Agar tender tahlili yo'q bo'lsa, frontend'dan kelgan ma'lumotni tiklash
-        if not tender_analyzer.tender_requirements:
-            tender_data_str = request.data.get('tender_data', '')
-            logger.info(f"tender_data mavjud: {bool(tender_data_str)}, uzunligi: {len(str(tender_data_str)) if tender_data_str else 0}")
-            
-            if tender_data_str:
-                try:
-                    import json
-                    tender_data = json.loads(tender_data_str) if isinstance(tender_data_str, str) else tender_data_str
-                    logger.info(f"tender_data parse qilindi, kalit: {list(tender_data.keys()) if isinstance(tender_data, dict) else 'dict emas'}")
-                    # Tender ma'lumotlarini tiklash
-                    restored = tender_analyzer.restore_tender_analysis(tender_data)
-                    logger.info(f"Tender tahlili tiklandi: {restored}, requirements: {len(tender_analyzer.tender_requirements)}")
-                except Exception as e:
-                    logger.warning(f"Tender ma'lumotlarini tiklashda xatolik: {e}")
-                    import traceback
-                    traceback.print_exc()
+        # Tender talablari so'rovning o'zidan yoki ombordan olinadi
+        analyzer = TenderAnalyzer.from_tender_data(_resolve_tender_data(request))
+        logger.info(f"tender_requirements mavjud: {len(analyzer.tender_requirements)}")
         
         # Fayldan yoki matndan olish
         if 'file' in request.FILES:
@@ -352,20 +533,11 @@ def analyze_participant(request):
             participant_text = extract_text_from_file(file)
             metadata['filename'] = file.name
             metadata['file_size'] = file.size
-        # Mazmun va mantiqiy tekshiruv (GPT orqali)
+        # Mazmun va mantiqiy tekshiruv
         if participant_text.strip():
-            from core.llm_engine import llm_engine
-            check_prompt = f"""
-Quyidagi matn ishtirokchi hujjatlari yoki unga o'xshash rasmiy hujjatmi? Mazmunan va mantiqan to'g'ri, to'liq va tahlil qilishga yaroqlimi? Faqat 'HA' yoki 'YO' deb javob ber:
-
-{participant_text[:2000]}
-"""
-            check_result = llm_engine.generate_response(check_prompt, system_prompt="Faqat 'HA' yoki 'YO' deb javob ber.", temperature=0.0)
-            if isinstance(check_result, dict):
-                check_response = check_result.get('response', '').strip().upper()
-            else:
-                check_response = str(check_result).strip().upper()
-            if 'YO' in check_response:
+            # Mahalliy klassifikator; LLM faqat noaniq hujjatlar uchun chaqiriladi
+            verdict = check_document_validity(participant_text, 'participant')
+            if not verdict.valid:
                 error_msg = _msg(
                     language,
                     "Yuklangan fayl mazmunan yoki mantiqan noto'g'ri. Iltimos, to'g'ri ishtirokchi faylini yuklang.",
@@ -412,7 +584,7 @@ Quyidagi matn ishtirokchi hujjatlari yoki unga o'xshash rasmiy hujjatmi? Mazmuna
                 pass
         
         # Tahlil qilish
-        result = tender_analyzer.analyze_participant(
+        result = analyzer.analyze_participant(
             participant_name, 
             participant_text, 
             metadata
@@ -442,6 +614,7 @@ def compare_participants(request):
     Body:
         - participants: Ishtirokchilar tahlillari ro'yxati
         - language: Til (uz yoki ru)
+        - stream: true bo'lsa, xulosa NDJSON oqimi sifatida qaytariladi
     
     Returns:
         - success: bool
@@ -465,7 +638,10 @@ def compare_participants(request):
                 'error': error_msg
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        result = tender_analyzer.compare_participants(participants, language)
+        if _wants_stream(request):
+            return _ndjson_response(TenderAnalyzer().stream_compare_participants(participants, language))
+        
+        result = TenderAnalyzer().compare_participants(participants, language)
         
         if result['success']:
             return Response(result, status=status.HTTP_200_OK)
@@ -504,155 +680,40 @@ def full_analysis(request):
         - summary: Xulosa
     """
     try:
-        results = {
-            'success': True,
-            'tender_analysis': None,
-            'participants_analysis': [],
-            'ranking': [],
-            'winner': None,
-            'summary': '',
-            'progress': {
-                'step': 'init',
-                'current': 0,
-                'total': 1,
-                'status': 'Tender tahlili boshlanmoqda'
-            }
-        }
-        
-        # 1. Tender tahlili
-        tender_text = ""
-        if 'tender_file' in request.FILES:
-            tender_text = extract_text_from_file(request.FILES['tender_file'])
-        elif 'tender_text' in request.data:
-            tender_text = request.data.get('tender_text', '')
+        tender_text, participants, total_participants = _collect_full_analysis_input(request)
         
         if not tender_text.strip():
-            results['progress'] = {
-                'step': 'tender_error',
-                'current': 0,
-                'total': 1,
-                'status': 'Tender fayli yoki matni talab qilinmadi'
-            }
             return Response({
                 'success': False,
                 'error': 'Tender fayli yoki matni talab qilinadi',
-                'progress': results['progress']
+                'progress': {
+                    'step': 'tender_error',
+                    'current': 0,
+                    'total': 1,
+                    'status': 'Tender fayli yoki matni talab qilinmadi'
+                }
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Har doim yangi tender tahlil obyektini yaratamiz
-        from core.tender_analyzer import TenderAnalyzer
-        global tender_analyzer
-        tender_analyzer = TenderAnalyzer()
-        results['progress'] = {
-            'step': 'tender_analysis',
-            'current': 1,
-            'total': 1,
-            'status': 'Tender tahlili yakunlandi'
-        }
-        tender_result = tender_analyzer.analyze_tender_document(tender_text)
-        if not tender_result['success']:
-            results['progress'] = {
-                'step': 'tender_error',
-                'current': 1,
-                'total': 1,
-                'status': 'Tender tahlilida xatolik'
-            }
-            return Response({**tender_result, 'progress': results['progress']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        # To'liq tender tahlilini saqlaymiz (requirements va boshqa maydonlar bilan)
-        full_tender_analysis = tender_result['analysis'] if 'analysis' in tender_result else tender_result
-        results['tender_analysis'] = full_tender_analysis
-        
-        # 2. Ishtirokchilar tahlili
-        participants_data = request.data.get('participants', [])
-        participant_names = set()
-        participant_counter = 1
-        total_participants = len([k for k in request.FILES if k.startswith('participant_')]) + len(participants_data)
-        current_participant = 0
-        # Fayldan
-        for key in request.FILES:
-            if key.startswith('participant_'):
-                idx = key.replace('participant_', '').replace('_file', '')
-                name = request.data.get(f'participant_{idx}_name', '').strip()
-                if not name or name in participant_names:
-                    name = f'Ishtirokchi {participant_counter}'
-                file = request.FILES[key]
-                text = extract_text_from_file(file)
-                if text.strip():
-                    tender_analyzer.restore_tender_analysis(full_tender_analysis)
-                    participant_result = tender_analyzer.analyze_participant(name, text)
-                    if participant_result['success']:
-                        analysis = participant_result['analysis']
-                        # Ensure risk_level is always present
-                        if 'risk_level' not in analysis:
-                            risk = analysis.get('risk_assessment', {}).get('overall_risk', 'unknown')
-                            analysis['risk_level'] = risk
-                        results['participants_analysis'].append(analysis)
-                        participant_names.add(name)
-                        participant_counter += 1
-                current_participant += 1
-                results['progress'] = {
-                    'step': 'participant',
-                    'current': current_participant,
-                    'total': total_participants,
-                    'status': f'{name} tahlil qilindi'
-                }
-        # JSON dan
-        for p in participants_data:
-            name = p.get('name', '').strip()
-            if not name or name in participant_names:
-                name = f'Ishtirokchi {participant_counter}'
-            text = p.get('text', '')
-            if text.strip():
-                tender_analyzer.restore_tender_analysis(full_tender_analysis)
-                participant_result = tender_analyzer.analyze_participant(name, text)
-                if participant_result['success']:
-                    analysis = participant_result['analysis']
-                    if 'risk_level' not in analysis:
-                        risk = analysis.get('risk_assessment', {}).get('overall_risk', 'unknown')
-                        analysis['risk_level'] = risk
-                    results['participants_analysis'].append(analysis)
-                    participant_names.add(name)
-                    participant_counter += 1
-            current_participant += 1
-            results['progress'] = {
-                'step': 'participant',
-                'current': current_participant,
-                'total': total_participants,
-                'status': f'{name} tahlil qilindi'
-            }
+        results = run_full_analysis(
+            tender_text,
+            participants,
+            total_participants=total_participants,
+            max_workers=getattr(settings, 'PARTICIPANT_ANALYSIS_MAX_WORKERS', 4),
+        )
+        results.pop('partial_results', None)
         
-        # 3. Solishtirish
-        if len(results['participants_analysis']) < 2:
-            error_msg = 'Reyting yaratish uchun kamida 2 ta ishtirokchi kerak. Hozircha {} ta tahlil qilingan. Yana ishtirokchi qo\'shing.'.format(len(results['participants_analysis']))
-            results['progress'] = {
-                'step': 'compare_error',
-                'current': current_participant,
-                'total': total_participants,
-                'status': error_msg
-            }
+        if results.get('tender_analysis') and hasattr(request, 'session'):
+            request.session['tender_key'] = results['tender_analysis'].get('tender_key')
+        
+        step = results['progress']['step']
+        if step == 'tender_error':
+            return Response(results, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if not results['success']:
             return Response({
                 'success': False,
-                'error': error_msg,
+                'error': results['error'],
                 'progress': results['progress']
             }, status=status.HTTP_400_BAD_REQUEST)
-        compare_result = tender_analyzer.compare_participants(results['participants_analysis'])
-        if compare_result['success']:
-            results['ranking'] = compare_result['ranking']
-            results['winner'] = compare_result['winner']
-            results['summary'] = compare_result['summary']
-            results['progress'] = {
-                'step': 'done',
-                'current': current_participant,
-                'total': total_participants,
-                'status': 'Tahlil yakunlandi'
-            }
-        else:
-            results['progress'] = {
-                'step': 'compare_error',
-                'current': current_participant,
-                'total': total_participants,
-                'status': compare_result.get('error', 'Solishtirishda xatolik')
-            }
         return Response(results, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -663,6 +724,132 @@ def full_analysis(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _collect_full_analysis_input(request):
+    """
+    full_analysis so'rovidan tender matni va ishtirokchilarni ajratish
+    
+    Returns:
+        (tender_text, ishtirokchilar, yuborilgan ishtirokchilar soni)
+    """
+    tender_text = ""
+    if 'tender_file' in request.FILES:
+        tender_text = extract_text_from_file(request.FILES['tender_file'])
+    elif 'tender_text' in request.data:
+        tender_text = request.data.get('tender_text', '')
+    
+    participants_data = request.data.get('participants', [])
+    participant_files = [
+        (key, request.FILES[key]) for key in request.FILES if key.startswith('participant_')
+    ]
+    total_participants = len(participant_files) + len(participants_data)
+    max_workers = getattr(settings, 'PARTICIPANT_ANALYSIS_MAX_WORKERS', 4)
+    
+    # Fayllardan matnni parallel ajratish (kirish tartibi saqlanadi)
+    raw_participants = []
+    if participant_files:
+        documents = extract_documents([file for _, file in participant_files], max_workers=max_workers)
+        file_texts = [document['text'] for document in documents]
+        for (key, _), text in zip(participant_files, file_texts):
+            idx = key.replace('participant_', '').replace('_file', '')
+            raw_participants.append((request.data.get(f'participant_{idx}_name', ''), text))
+    # JSON dan
+    for p in participants_data:
+        raw_participants.append((p.get('name', ''), p.get('text', '')))
+    
+    # Nomlar tahlildan oldin deterministik tarzda belgilanadi
+    return tender_text, resolve_participant_names(raw_participants), total_participants
+
+
+@extend_schema(
+    operation_id='submit_full_analysis_job',
+    responses={202: OpenApiTypes.OBJECT},
+    tags=['evaluations']
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def submit_full_analysis_job(request):
+    """
+    To'liq tahlilni fon vazifasi sifatida boshlash
+    
+    POST /api/evaluations/full-analysis/jobs/
+    
+    Body: full_analysis bilan bir xil
+    
+    Returns:
+        - success: bool
+        - job_id: Vazifa identifikatori
+        - status_url: Holatni kuzatish manzili
+    """
+    try:
+        tender_text, participants, total_participants = _collect_full_analysis_input(request)
+        
+        if not tender_text.strip():
+            return Response({
+                'success': False,
+                'error': 'Tender fayli yoki matni talab qilinadi'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = create_analysis_job(total_participants, user=request.user)
+        try:
+            run_full_analysis_job.apply_async(
+                args=[job['job_id'], tender_text, participants, total_participants],
+                task_id=job['job_id'],
+            )
+        except Exception as e:
+            logger.error(f"Tahlil vazifasini navbatga qo'yishda xatolik: {str(e)}")
+            update_analysis_job(job['job_id'], status='failed', error=str(e))
+            return Response({
+                'success': False,
+                'error': "Tahlil vazifasini navbatga qo'yib bo'lmadi"
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        return Response({
+            'success': True,
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'status_url': f"/api/evaluations/full-analysis/jobs/{job['job_id']}/",
+        }, status=status.HTTP_202_ACCEPTED)
+        
+    except Exception as e:
+        logger.error(f"Tahlil vazifasini yaratishda xatolik: {str(e)}")
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@extend_schema(
+    operation_id='get_full_analysis_job',
+    responses={200: OpenApiTypes.OBJECT},
+    tags=['evaluations']
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_full_analysis_job(request, job_id):
+    """
+    To'liq tahlil vazifasining holati
+    
+    GET /api/evaluations/full-analysis/jobs/<job_id>/
+    
+    Vazifani faqat uni yaratgan foydalanuvchi (yoki administrator) ko'radi,
+    boshqalar uchun 404 qaytariladi.
+    
+    Returns:
+        - status: queued | running | completed | failed
+        - progress: Joriy bosqich
+        - partial_results: Tayyor bo'lgan ishtirokchi tahlillari
+        - result: Yakuniy natija (completed bo'lganda)
+    """
+    job = get_analysis_job(job_id, user=request.user)
+    if job is None:
+        return Response({
+            'success': False,
+            'error': 'Vazifa topilmadi'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({'success': True, **job})
+
+
 @extend_schema(
     operation_id='get_tender_requirements',
     responses={200: OpenApiTypes.OBJECT},
@@ -673,10 +860,10 @@ def get_tender_requirements(request):
     """
     Joriy tender talablarini olish
     
-    GET /api/evaluations/tender-requirements/
+    GET /api/evaluations/tender-requirements/?tender_key=...
     """
-    requirements = tender_analyzer.get_tender_requirements()
-    tender_info = tender_analyzer.get_tender_info()
+    tender_info = _resolve_tender_data(request) or {}
+    requirements = TenderAnalyzer.from_tender_data(tender_info).get_tender_requirements()
     
     return Response({
         'success': True,
@@ -697,10 +884,13 @@ def reset_analysis(request):
     Tahlilni qayta boshlash
     
     POST /api/evaluations/reset/
+    
+    Faqat sessiyadagi tender_key ko'rsatkichi olib tashlanadi. Umumiy ombordagi
+    tahlil o'chirilmaydi - uni boshqa foydalanuvchilar ham shu kalit bilan
+    ishlatayotgan bo'lishi mumkin; yozuv TENDER_ANALYSIS_STORE_TTL dan keyin o'zi eskiradi.
     """
-    global tender_analyzer
-    from core.tender_analyzer import TenderAnalyzer
-    tender_analyzer = TenderAnalyzer()
+    if hasattr(request, 'session'):
+        request.session.pop('tender_key', None)
     
     return Response({
         'success': True,
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-16 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0003_tenderanalysisresult_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedDocumentText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='Fayl xeshi (SHA-256)')),
+                ('file_type', models.CharField(max_length=10, verbose_name='Fayl turi')),
+                ('text', models.TextField(verbose_name='Ajratilgan matn')),
+                ('page_count', models.IntegerField(blank=True, null=True, verbose_name='Sahifalar soni')),
+                ('file_size', models.BigIntegerField(default=0, verbose_name='Fayl hajmi (bayt)')),
+                ('hit_count', models.IntegerField(default=0, verbose_name='Qayta foydalanishlar soni')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')),
+                ('last_used_at', models.DateTimeField(auto_now=True, verbose_name='Oxirgi foydalanish')),
+            ],
+            options={
+                'verbose_name': 'Ajratilgan matn',
+                'verbose_name_plural': 'Ajratilgan matnlar',
+                'unique_together': {('content_hash', 'file_type')},
+            },
+        ),
+    ]
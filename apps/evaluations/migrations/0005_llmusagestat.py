@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-16 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0004_extracteddocumenttext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMUsageStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateTimeField(verbose_name='Davr (soat boshi)')),
+                ('caller', models.CharField(max_length=50, verbose_name='Chaqiruvchi')),
+                ('provider', models.CharField(max_length=30, verbose_name='Provayder')),
+                ('model', models.CharField(max_length=100, verbose_name='Model')),
+                ('calls', models.IntegerField(default=0, verbose_name='Chaqiruvlar soni')),
+                ('failures', models.IntegerField(default=0, verbose_name='Xatoliklar soni')),
+                ('cache_hits', models.IntegerField(default=0, verbose_name='Keshdan olinganlar')),
+                ('failovers', models.IntegerField(default=0, verbose_name="Zaxira provayderga o'tishlar")),
+                ('prompt_tokens', models.BigIntegerField(default=0, verbose_name='Prompt tokenlari')),
+                ('completion_tokens', models.BigIntegerField(default=0, verbose_name='Javob tokenlari')),
+                ('total_latency_ms', models.BigIntegerField(default=0, verbose_name='Umumiy kechikish (ms)')),
+                ('max_latency_ms', models.IntegerField(default=0, verbose_name='Maksimal kechikish (ms)')),
+                ('cost_usd', models.FloatField(default=0.0, verbose_name='Narx (USD)')),
+            ],
+            options={
+                'verbose_name': 'LLM statistikasi',
+                'verbose_name_plural': 'LLM statistikasi',
+                'ordering': ['-period', 'caller'],
+                'unique_together': {('period', 'caller', 'provider', 'model')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-16 23:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0005_llmusagestat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(max_length=32, unique=True, verbose_name='Vazifa ID')),
+                ('status', models.CharField(choices=[('queued', 'Navbatda'), ('running', 'Bajarilmoqda'), ('completed', 'Yakunlangan'), ('failed', 'Xatolik')], default='queued', max_length=20, verbose_name='Holati')),
+                ('progress', models.JSONField(default=dict, verbose_name='Joriy bosqich')),
+                ('partial_results', models.JSONField(default=list, verbose_name='Oraliq natijalar')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Yakuniy natija')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Xatolik')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')),
+            ],
+            options={
+                'verbose_name': 'Tahlil vazifasi',
+                'verbose_name_plural': 'Tahlil vazifalari',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
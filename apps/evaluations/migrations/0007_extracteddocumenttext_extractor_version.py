@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-16 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0006_analysisjob'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='extracteddocumenttext',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='extracteddocumenttext',
+            name='extractor_version',
+            field=models.CharField(default='', max_length=200, verbose_name='Ajratuvchi versiyasi'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='extracteddocumenttext',
+            unique_together={('content_hash', 'file_type', 'extractor_version')},
+        ),
+    ]
@@ -193,3 +193,104 @@ class TenderAnalysisResult(models.Model):
     def __str__(self):
         return f"{self.tender_name} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
+
+
+class ExtractedDocumentText(models.Model):
+    """
+    Yuklangan fayllardan ajratilgan matn keshi.
+    Fayl mazmunining SHA-256 xeshi va ajratuvchi versiyasi bo'yicha saqlanadi - bir xil
+    fayl qayta parse qilinmaydi, ajratuvchi yoki OCR yangilansa esa qayta ajratiladi.
+    """
+    
+    content_hash = models.CharField(max_length=64, verbose_name='Fayl xeshi (SHA-256)')
+    file_type = models.CharField(max_length=10, verbose_name='Fayl turi')
+    extractor_version = models.CharField(max_length=200, default='', verbose_name='Ajratuvchi versiyasi')
+    text = models.TextField(verbose_name='Ajratilgan matn')
+    page_count = models.IntegerField(null=True, blank=True, verbose_name='Sahifalar soni')
+    file_size = models.BigIntegerField(default=0, verbose_name='Fayl hajmi (bayt)')
+    hit_count = models.IntegerField(default=0, verbose_name='Qayta foydalanishlar soni')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')
+    last_used_at = models.DateTimeField(auto_now=True, verbose_name='Oxirgi foydalanish')
+    
+    class Meta:
+        verbose_name = 'Ajratilgan matn'
+        verbose_name_plural = 'Ajratilgan matnlar'
+        unique_together = ['content_hash', 'file_type', 'extractor_version']
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.file_type})"
+
+
+class LLMUsageStat(models.Model):
+    """
+    LLM chaqiruvlari statistikasi (soatlik agregat).
+    Har bir chaqiruvchi (tender tahlili, ishtirokchi tahlili, ...), provayder va model
+    bo'yicha tokenlar, kechikish, xatoliklar va narx yig'iladi.
+    """
+    
+    period = models.DateTimeField(verbose_name='Davr (soat boshi)')
+    caller = models.CharField(max_length=50, verbose_name='Chaqiruvchi')
+    provider = models.CharField(max_length=30, verbose_name='Provayder')
+    model = models.CharField(max_length=100, verbose_name='Model')
+    calls = models.IntegerField(default=0, verbose_name='Chaqiruvlar soni')
+    failures = models.IntegerField(default=0, verbose_name='Xatoliklar soni')
+    cache_hits = models.IntegerField(default=0, verbose_name='Keshdan olinganlar')
+    failovers = models.IntegerField(default=0, verbose_name='Zaxira provayderga o\'tishlar')
+    prompt_tokens = models.BigIntegerField(default=0, verbose_name='Prompt tokenlari')
+    completion_tokens = models.BigIntegerField(default=0, verbose_name='Javob tokenlari')
+    total_latency_ms = models.BigIntegerField(default=0, verbose_name='Umumiy kechikish (ms)')
+    max_latency_ms = models.IntegerField(default=0, verbose_name='Maksimal kechikish (ms)')
+    cost_usd = models.FloatField(default=0.0, verbose_name='Narx (USD)')
+    
+    class Meta:
+        verbose_name = 'LLM statistikasi'
+        verbose_name_plural = 'LLM statistikasi'
+        unique_together = ['period', 'caller', 'provider', 'model']
+        ordering = ['-period', 'caller']
+    
+    def __str__(self):
+        return f"{self.period:%Y-%m-%d %H}:00 {self.caller} ({self.provider})"
+
+
+class AnalysisJob(models.Model):
+    """
+    To'liq tahlil vazifasining holati (asinxron API).
+    Bazada saqlanadi - web va Celery jarayonlari bir xil holatni ko'radi.
+    """
+    
+    STATUS_CHOICES = [
+        ('queued', 'Navbatda'),
+        ('running', 'Bajarilmoqda'),
+        ('completed', 'Yakunlangan'),
+        ('failed', 'Xatolik'),
+    ]
+    
+    job_id = models.CharField(max_length=32, unique=True, verbose_name='Vazifa ID')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='analysis_jobs', verbose_name='Foydalanuvchi')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', verbose_name='Holati')
+    progress = models.JSONField(default=dict, verbose_name='Joriy bosqich')
+    partial_results = models.JSONField(default=list, verbose_name='Oraliq natijalar')
+    result = models.JSONField(null=True, blank=True, verbose_name='Yakuniy natija')
+    error = models.TextField(null=True, blank=True, verbose_name='Xatolik')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')
+    
+    class Meta:
+        verbose_name = 'Tahlil vazifasi'
+        verbose_name_plural = 'Tahlil vazifalari'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.job_id} ({self.status})"
+    
+    def as_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'progress': self.progress,
+            'partial_results': self.partial_results,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+        }
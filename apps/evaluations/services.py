@@ -3,11 +3,13 @@ import json
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Q, Count, Avg, Sum, F
 from django.db.models.functions import Rank
 from .models import Evaluation, ParticipantScore, ScoreDetail, EvaluationLog
 from apps.tenders.models import Tender, TenderRequirement
+from apps.tenders.snapshot import load_evaluation_snapshot
 from apps.participants.models import TenderParticipant
 from apps.compliance.services import compliance_checker
 from apps.anti_fraud.services import anti_fraud_analyzer
@@ -41,16 +43,19 @@ class ScoringEngine:
         try:
             logger.info(f"Tender baholash boshlandi: {tender.id}")
             
+            # Tender, talablar, hujjatlar va ishtirokchilar bitta snapshot'da
+            tender = load_evaluation_snapshot(tender)
+            participants = tender.participants.all()
+            
             # Baholash yaratish
             evaluation = Evaluation.objects.create(
                 tender=tender,
                 evaluator_id=evaluator_id,
                 status='in_progress',
                 started_at=timezone.now(),
-                total_participants=tender.participants.count()
+                total_participants=len(participants)
             )
             
-            participants = tender.participants.all()
             results = {
                 'evaluation_id': evaluation.id,
                 'tender_id': tender.id,
@@ -66,21 +71,33 @@ class ScoringEngine:
             }
             
             participant_scores = []
+            # Bazaga yoziladigan qatorlar xotirada yig'iladi va oxirida bitta tranzaksiyada yoziladi
+            score_rows = {}
+            detail_rows = []
+            log_rows = []
+            
+            # Tender darajasidagi korrupsiya tahlili barcha ishtirokchilar uchun bir marta
+            fraud_analysis = anti_fraud_analyzer.get_tender_fraud_analysis(tender)
             
             # Har bir ishtirokchi uchun ballarni hisoblash
             for participant in participants:
-                score_result = self._calculate_participant_score(participant, evaluation)
+                score_result, participant_score, score_details = self._score_participant(
+                    participant, evaluation, fraud_analysis
+                )
                 participant_scores.append(score_result)
+                if participant_score is not None:
+                    score_rows[participant.id] = participant_score
+                    detail_rows.extend(score_details)
                 
                 # Log qilish
-                EvaluationLog.objects.create(
+                log_rows.append(EvaluationLog(
                     evaluation=evaluation,
                     log_type='info',
                     message=f"Ishtirokchi baholandi: {participant.participant.company_name}",
                     details={'participant_id': participant.id, 'total_score': score_result['total_score']},
                     agent_name='ScoringEngine',
                     agent_type='scoring'
-                )
+                ))
             
             # Reytinqni aniqlash
             ranked_scores = sorted(participant_scores, key=lambda x: x['total_score'], reverse=True)
@@ -89,14 +106,14 @@ class ScoringEngine:
                 score_data['rank'] = rank
                 
                 # G'olibni aniqlash (faqat saralanganlar orasida)
-                if score_data['is_qualified'] and not results['summary']['winner_id']:
+                if score_data.get('is_qualified') and not results['summary']['winner_id']:
                     results['summary']['winner_id'] = score_data['participant_id']
                     score_data['is_winner'] = True
                 else:
                     score_data['is_winner'] = False
             
             # Umumiy statistika
-            qualified_scores = [s['total_score'] for s in participant_scores if s['is_qualified']]
+            qualified_scores = [s['total_score'] for s in participant_scores if s.get('is_qualified')]
             
             results['summary']['qualified_count'] = len(qualified_scores)
             results['summary']['disqualified_count'] = len(participant_scores) - len(qualified_scores)
@@ -104,12 +121,26 @@ class ScoringEngine:
             results['participants_scores'] = participant_scores
             results['ranking'] = ranked_scores
             
-            # Baholashni yakunlash
-            evaluation.status = 'completed'
-            evaluation.completed_at = timezone.now()
-            evaluation.qualified_participants = results['summary']['qualified_count']
-            evaluation.disqualified_participants = results['summary']['disqualified_count']
-            evaluation.save()
+            # Natijalarni yozish va baholashni yakunlash - bitta tranzaksiyada
+            with transaction.atomic():
+                rows = list(score_rows.values())
+                ParticipantScore.objects.bulk_create(rows)
+                ScoreDetail.objects.bulk_create(detail_rows)
+                EvaluationLog.objects.bulk_create(log_rows)
+                
+                # O'rin va g'olib belgisi qatorlar yaratilgandan keyin bitta so'rovda
+                for score_data in ranked_scores:
+                    row = score_rows.get(score_data['participant_id'])
+                    if row is not None:
+                        row.rank = score_data['rank']
+                        row.is_winner = score_data['is_winner']
+                ParticipantScore.objects.bulk_update(rows, ['rank', 'is_winner'])
+                
+                evaluation.status = 'completed'
+                evaluation.completed_at = timezone.now()
+                evaluation.qualified_participants = results['summary']['qualified_count']
+                evaluation.disqualified_participants = results['summary']['disqualified_count']
+                evaluation.save()
             
             logger.info(f"Tender baholash yakunlandi: {evaluation.id}")
             return results
@@ -126,9 +157,20 @@ class ScoringEngine:
                 'error': str(e),
             }
     
-    def _calculate_participant_score(self, participant: TenderParticipant, evaluation: Evaluation) -> Dict[str, Any]:
+    def _score_participant(
+        self,
+        participant: TenderParticipant,
+        evaluation: Evaluation,
+        fraud_analysis: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Dict[str, Any], Optional[ParticipantScore], List[ScoreDetail]]:
         """
         Ishtirokchi ballini hisoblash
+        
+        Bazaga hech narsa yozilmaydi: natija bilan birga saqlanmagan ParticipantScore
+        va ScoreDetail obyektlari qaytariladi (evaluate_tender_participants ularni
+        bulk_create bilan yozadi).
+        
+        fraud_analysis - tender korrupsiya tahlili (berilmasa keshdan olinadi yoki hisoblanadi)
         """
         try:
             logger.info(f"Ishtirokchi balli hisoblanmoqda: {participant.id}")
@@ -169,7 +211,8 @@ class ScoringEngine:
                 total_score += score * weight
             
             # Xavf jarimalari
-            fraud_analysis = anti_fraud_analyzer.analyze_tender_fraud_risks(participant.tender)
+            if fraud_analysis is None:
+                fraud_analysis = anti_fraud_analyzer.get_tender_fraud_analysis(participant.tender)
             participant_risk = fraud_analysis.get('participants_risk', {}).get(participant.id, {})
             risk_level = participant_risk.get('risk_level', 'low')
             risk_penalty = self.risk_penalties.get(risk_level, 0.0)
@@ -180,8 +223,8 @@ class ScoringEngine:
             # Saralash holati
             is_qualified = total_score >= 60 and risk_level != 'critical'
             
-            # ParticipantScore yaratish
-            participant_score = ParticipantScore.objects.create(
+            # ParticipantScore (hali saqlanmagan)
+            participant_score = ParticipantScore(
                 evaluation=evaluation,
                 tender_participant=participant,
                 total_score=Decimal(str(total_score)),
@@ -197,8 +240,8 @@ class ScoringEngine:
                 is_winner=False
             )
             
-            # Tafsilot yozuvlarini yaratish
-            self._create_score_details(participant_score, scores, {
+            # Tafsilot yozuvlari
+            score_details = self._build_score_details(participant_score, scores, {
                 'compliance': compliance_result,
                 'financial': financial_result,
                 'technical': technical_result,
@@ -226,7 +269,7 @@ class ScoringEngine:
             }
             
             logger.info(f"Ishtirokchi balli hisoblandi: {participant.id} - {total_score}")
-            return result
+            return result, participant_score, score_details
             
         except Exception as e:
             logger.error(f"Ishtirokchi ballini hisoblashda xatolik: {str(e)}")
@@ -234,7 +277,7 @@ class ScoringEngine:
                 'participant_id': participant.id,
                 'total_score': 0.0,
                 'error': str(e),
-            }
+            }, None, []
     
     def _calculate_financial_score(self, participant: TenderParticipant) -> Dict[str, Any]:
         """Moliyaviy ballni hisoblash"""
@@ -323,9 +366,11 @@ class ScoringEngine:
             breakdown = {}
             
             tender = participant.tender
-            technical_requirements = tender.requirements.filter(requirement_type='technical')
+            technical_requirements = [
+                req for req in tender.requirements.all() if req.requirement_type == 'technical'
+            ]
             
-            if not technical_requirements.exists():
+            if not technical_requirements:
                 return {
                     'score': 50.0,  # Default
                     'breakdown': {'note': 'Texnik talablar mavjud emas'}
@@ -333,7 +378,7 @@ class ScoringEngine:
             
             # 1. Texnik talablarga muvofiqlik (60%)
             requirement_scores = []
-            total_weight = technical_requirements.aggregate(total=Sum('weight'))['total'] or 0
+            total_weight = float(sum(req.weight for req in technical_requirements))
             
             for req in technical_requirements:
                 # Bu yerda talabning qanoatlantirilish darajasini tekshirish kerak
@@ -369,13 +414,13 @@ class ScoringEngine:
             }
             
             # 2. Hujjatlar sifati (20%)
-            tech_docs = participant.documents.filter(document_type='technical')
-            if tech_docs.exists():
+            tech_docs = [doc for doc in participant.documents.all() if doc.document_type == 'technical']
+            if tech_docs:
                 doc_quality_score = 20.0
                 breakdown['document_quality'] = {
                     'score': doc_quality_score,
-                    'document_count': tech_docs.count(),
-                    'processed_count': tech_docs.filter(is_processed=True).count()
+                    'document_count': len(tech_docs),
+                    'processed_count': sum(1 for doc in tech_docs if doc.is_processed)
                 }
             else:
                 doc_quality_score = 0.0
@@ -629,66 +674,33 @@ class ScoringEngine:
         
         return ". ".join(reasoning_parts) + "."
     
-    def _create_score_details(self, participant_score: ParticipantScore, scores: Dict[str, float], breakdowns: Dict[str, Any]):
-        """Ball tafsilotlarini yaratish"""
-        try:
-            # Compliance tafsilotlari
-            ScoreDetail.objects.create(
-                participant_score=participant_score,
-                score_type='compliance',
-                max_score=25.0,
-                achieved_score=Decimal(str(scores['compliance'])),
-                percentage=Decimal(str(scores['compliance'])),
-                analysis=breakdowns['compliance'].get('compliance_score', 0),
-                reasoning=f"Compliance tekshiruvi natijasi: {scores['compliance']:.1f} ball"
-            )
-            
-            # Moliyaviy tafsilotlar
-            ScoreDetail.objects.create(
-                participant_score=participant_score,
-                score_type='financial',
-                max_score=20.0,
-                achieved_score=Decimal(str(scores['financial'])),
-                percentage=Decimal(str(scores['financial'])),
-                analysis=json.dumps(breakdowns['financial'].get('breakdown', {})),
-                reasoning=f"Moliyaviy baholash natijasi: {scores['financial']:.1f} ball"
-            )
-            
-            # Texnik tafsilotlar
-            ScoreDetail.objects.create(
-                participant_score=participant_score,
-                score_type='technical',
-                max_score=30.0,
-                achieved_score=Decimal(str(scores['technical'])),
-                percentage=Decimal(str(scores['technical'])),
-                analysis=json.dumps(breakdowns['technical'].get('breakdown', {})),
-                reasoning=f"Texnik baholash natijasi: {scores['technical']:.1f} ball"
-            )
-            
-            # Tajriba tafsilotlari
-            ScoreDetail.objects.create(
-                participant_score=participant_score,
-                score_type='experience',
-                max_score=15.0,
-                achieved_score=Decimal(str(scores['experience'])),
-                percentage=Decimal(str(scores['experience'])),
-                analysis=json.dumps(breakdowns['experience'].get('breakdown', {})),
-                reasoning=f"Tajriba baholash natijasi: {scores['experience']:.1f} ball"
-            )
-            
-            # Narx tafsilotlari
-            ScoreDetail.objects.create(
+    # (ball turi, maksimal ball, sabab matni)
+    SCORE_DETAIL_TYPES = (
+        ('compliance', 25.0, "Compliance tekshiruvi natijasi"),
+        ('financial', 20.0, "Moliyaviy baholash natijasi"),
+        ('technical', 30.0, "Texnik baholash natijasi"),
+        ('experience', 15.0, "Tajriba baholash natijasi"),
+        ('price', 10.0, "Narx baholash natijasi"),
+    )
+    
+    def _build_score_details(self, participant_score: ParticipantScore, scores: Dict[str, float], breakdowns: Dict[str, Any]) -> List[ScoreDetail]:
+        """Ball tafsilotlari (saqlanmagan obyektlar)"""
+        details = []
+        for score_type, max_score, reasoning in self.SCORE_DETAIL_TYPES:
+            if score_type == 'compliance':
+                analysis = breakdowns['compliance'].get('compliance_score', 0)
+            else:
+                analysis = json.dumps(breakdowns[score_type].get('breakdown', {}))
+            details.append(ScoreDetail(
                 participant_score=participant_score,
-                score_type='price',
-                max_score=10.0,
-                achieved_score=Decimal(str(scores['price'])),
-                percentage=Decimal(str(scores['price'])),
-                analysis=json.dumps(breakdowns['price'].get('breakdown', {})),
-                reasoning=f"Narx baholash natijasi: {scores['price']:.1f} ball"
-            )
-            
-        except Exception as e:
-            logger.error(f"Ball tafsilotlarini yaratishda xatolik: {str(e)}")
+                score_type=score_type,
+                max_score=max_score,
+                achieved_score=Decimal(str(scores[score_type])),
+                percentage=Decimal(str(scores[score_type])),
+                analysis=analysis,
+                reasoning=f"{reasoning}: {scores[score_type]:.1f} ball"
+            ))
+        return details
     
     def get_evaluation_results(self, evaluation_id: int) -> Dict[str, Any]:
         """Baholash natijalarini olish"""
@@ -1,13 +1,64 @@
 from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 import logging
-from typing import Dict, Any
+import threading
+import uuid
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
 from .services import scoring_engine
-from .models import Evaluation, EvaluationLog
+from .models import AnalysisJob, Evaluation, EvaluationLog
 from apps.tenders.models import Tender
 
 logger = logging.getLogger(__name__)
 
+JOB_FIELDS = ('status', 'progress', 'partial_results', 'result', 'error')
+
+
+def _expired_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'ANALYSIS_JOB_TTL', 24 * 3600))
+
+
+def create_analysis_job(total_participants: int = 0, user=None) -> Dict[str, Any]:
+    """Yangi tahlil vazifasi yozuvini yaratish (eskirgan vazifalar o'chiriladi)"""
+    AnalysisJob.objects.filter(updated_at__lt=_expired_before()).delete()
+    job = AnalysisJob.objects.create(
+        job_id=uuid.uuid4().hex,
+        user=user,
+        progress={
+            'step': 'queued',
+            'current': 0,
+            'total': total_participants,
+            'status': 'Navbatda'
+        },
+    )
+    return job.as_dict()
+
+
+def get_analysis_job(job_id: str, user=None) -> Optional[Dict[str, Any]]:
+    """
+    Tahlil vazifasi holatini olish
+
+    user berilsa, faqat shu foydalanuvchining vazifasi qaytariladi (administrator barchasini ko'radi)
+    """
+    jobs = AnalysisJob.objects.filter(job_id=job_id, updated_at__gte=_expired_before())
+    if user is not None and not getattr(user, 'is_admin', False):
+        jobs = jobs.filter(user=user)
+    job = jobs.first()
+    return job.as_dict() if job else None
+
+
+def update_analysis_job(job_id: str, **fields) -> Optional[Dict[str, Any]]:
+    """Tahlil vazifasi maydonlarini yangilash"""
+    fields = {key: value for key, value in fields.items() if key in JOB_FIELDS}
+    with transaction.atomic():
+        job, _ = AnalysisJob.objects.select_for_update().get_or_create(job_id=job_id)
+        for key, value in fields.items():
+            setattr(job, key, value)
+        job.save()
+    return job.as_dict()
+
 
 @shared_task(bind=True, max_retries=3)
 def evaluate_tender_participants(self, tender_id: int, evaluator_id: int = None) -> Dict[str, Any]:
@@ -178,3 +229,67 @@ def check_pending_evaluations():
             'status': 'error',
             'error': str(e),
         }
+
+
+@shared_task(bind=True)
+def run_full_analysis_job(
+    self,
+    job_id: str,
+    tender_text: str,
+    participants: List[Dict[str, Any]],
+    total_participants: int = None,
+) -> Dict[str, Any]:
+    """
+    To'liq tender tahlili (asinxron) - bosqichma-bosqich holat bilan
+    """
+    from core.tender_analyzer import run_full_analysis
+    
+    logger.info(f"Asinxron to'liq tahlil boshlandi: {job_id}")
+    update_analysis_job(job_id, status='running')
+    
+    def _on_progress(results: Dict[str, Any]) -> None:
+        # Ishtirokchi oqimlaridan ham chaqiriladi: holat yozuvi tahlilni to'xtatmaydi,
+        # oqim ochgan DB ulanishi darhol yopiladi
+        try:
+            update_analysis_job(
+                job_id,
+                progress=dict(results['progress']),
+                partial_results=list(results['partial_results']),
+            )
+        except Exception as e:
+            logger.warning(f"Tahlil holatini yangilashda xatolik: {str(e)}")
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+    
+    try:
+        results = run_full_analysis(
+            tender_text,
+            participants,
+            total_participants=total_participants,
+            max_workers=getattr(settings, 'PARTICIPANT_ANALYSIS_MAX_WORKERS', 4),
+            on_progress=_on_progress,
+        )
+        partial_results = results.pop('partial_results', [])
+        update_analysis_job(
+            job_id,
+            status='completed' if results['success'] else 'failed',
+            progress=results['progress'],
+            partial_results=partial_results,
+            result=results,
+            error=results.get('error'),
+        )
+        logger.info(f"Asinxron to'liq tahlil yakunlandi: {job_id}")
+        return {
+            'status': 'success' if results['success'] else 'error',
+            'job_id': job_id,
+        }
+    
+    except Exception as e:
+        logger.error(f"Asinxron to'liq tahlilda xatolik: {str(e)}")
+        update_analysis_job(job_id, status='failed', error=str(e))
+        return {
+            'status': 'error',
+            'job_id': job_id,
+            'error': str(e),
+        }
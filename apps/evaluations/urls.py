@@ -17,6 +17,8 @@ urlpatterns = [
     path('analyze-participant/', analysis_views.analyze_participant, name='analyze-participant'),
     path('compare-participants/', analysis_views.compare_participants, name='compare-participants'),
     path('full-analysis/', analysis_views.full_analysis, name='full-analysis'),
+    path('full-analysis/jobs/', analysis_views.submit_full_analysis_job, name='full-analysis-job-submit'),
+    path('full-analysis/jobs/<str:job_id>/', analysis_views.get_full_analysis_job, name='full-analysis-job-status'),
     path('tender-requirements/', analysis_views.get_tender_requirements, name='tender-requirements'),
     path('reset/', analysis_views.reset_analysis, name='reset-analysis'),
     path('export-pdf/', analysis_views.export_pdf, name='export-pdf'),
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-16 22:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0002_initial'),
+        ('tenders', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('tender', 'Tender hujjati'), ('participant', 'Ishtirokchi hujjati')], max_length=20, verbose_name='Manba')),
+                ('chunk_index', models.IntegerField(verbose_name="Bo'lak tartibi")),
+                ('text', models.TextField(verbose_name="Bo'lak matni")),
+                ('content_hash', models.CharField(db_index=True, max_length=64, verbose_name='Matn xeshi')),
+                ('embedding', models.BinaryField(verbose_name='Embedding vektori')),
+                ('dimensions', models.IntegerField(verbose_name="Vektor o'lchami")),
+                ('embedding_model', models.CharField(max_length=100, verbose_name='Embedding modeli')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('participant_document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='participants.participantdocument')),
+                ('tender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_chunks', to='tenders.tender')),
+                ('tender_document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='tenders.tenderdocument')),
+            ],
+            options={
+                'verbose_name': "Hujjat bo'lagi",
+                'verbose_name_plural': "Hujjat bo'laklari",
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['tender', 'source'], name='participant_tender__813710_idx')],
+            },
+        ),
+    ]
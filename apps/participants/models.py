@@ -144,3 +144,42 @@ class ParticipantDocument(models.Model):
     
     def __str__(self):
         return f"{self.tender_participant.participant.company_name} - {self.title}"
+
+
+class DocumentChunk(models.Model):
+    """Hujjat bo'lagi va uning embedding vektori (float32, ikkilik ko'rinishda)"""
+    SOURCE_CHOICES = [
+        ('tender', 'Tender hujjati'),
+        ('participant', 'Ishtirokchi hujjati'),
+    ]
+    
+    tender = models.ForeignKey(Tender, on_delete=models.CASCADE, related_name='document_chunks')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, verbose_name='Manba')
+    tender_document = models.ForeignKey(
+        'tenders.TenderDocument', on_delete=models.CASCADE, null=True, blank=True, related_name='chunks'
+    )
+    participant_document = models.ForeignKey(
+        ParticipantDocument, on_delete=models.CASCADE, null=True, blank=True, related_name='chunks'
+    )
+    
+    chunk_index = models.IntegerField(verbose_name='Bo\'lak tartibi')
+    text = models.TextField(verbose_name='Bo\'lak matni')
+    content_hash = models.CharField(max_length=64, db_index=True, verbose_name='Matn xeshi')
+    
+    # Vektor: numpy float32 baytlari
+    embedding = models.BinaryField(verbose_name='Embedding vektori')
+    dimensions = models.IntegerField(verbose_name='Vektor o\'lchami')
+    embedding_model = models.CharField(max_length=100, verbose_name='Embedding modeli')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Hujjat bo\'lagi'
+        verbose_name_plural = 'Hujjat bo\'laklari'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['tender', 'source']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_source_display()} #{self.chunk_index} ({self.tender_id})"
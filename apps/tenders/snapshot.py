@@ -0,0 +1,41 @@
+"""
+Tender baholash grafigini yuklash
+
+ScoringEngine, ComplianceChecker va AntiFraudAnalyzer tender, uning talablari,
+hujjatlari, ishtirokchilari (kompaniyasi bilan) va ishtirokchi hujjatlarini
+o'qiydi. Snapshot bularning barchasini ishtirokchilar sonidan qat'i nazar
+belgilangan sondagi so'rovlarda oladi; keyingi tekshiruvlar faqat `.all()`
+orqali xotiradagi ma'lumotlar bilan ishlaydi (`.filter()`, `.count()`,
+`.aggregate()` yangi so'rov yuboradi, shuning uchun ular Python'da bajariladi).
+"""
+from django.db.models import Prefetch
+
+from apps.participants.models import TenderParticipant
+from .models import Tender
+
+SNAPSHOT_ATTR = '_evaluation_snapshot'
+
+
+def load_evaluation_snapshot(tender) -> Tender:
+    """Tenderni butun baholash grafigi bilan yuklash (5 ta so'rov)"""
+    tender_id = tender.pk if isinstance(tender, Tender) else tender
+    participants = (
+        TenderParticipant.objects
+        .select_related('participant')
+        .prefetch_related('documents')
+        .order_by('id')
+    )
+    snapshot = (
+        Tender.objects
+        .prefetch_related('requirements', 'documents', Prefetch('participants', queryset=participants))
+        .get(pk=tender_id)
+    )
+    setattr(snapshot, SNAPSHOT_ATTR, True)
+    return snapshot
+
+
+def ensure_snapshot(tender: Tender) -> Tender:
+    """Snapshot bo'lmasa yuklash (allaqachon yuklangan bo'lsa o'zini qaytarish)"""
+    if getattr(tender, SNAPSHOT_ATTR, False):
+        return tender
+    return load_evaluation_snapshot(tender)
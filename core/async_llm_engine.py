@@ -0,0 +1,455 @@
+"""
+Asinxron gibrid LLM dvigateli
+
+HybridLLMEngine bilan bir xil failover, kesh va circuit breaker mantiqi, lekin
+so'rovlar asyncio orqali yuboriladi: generatsiya davomida WSGI oqimi yoki
+Celery slot'i band bo'lmaydi va bitta jarayon o'nlab generatsiyalarni bir
+vaqtda kutishi mumkin. Async Django view'lari va asyncio.run ichidagi
+vazifalar uchun.
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from .circuit_breaker import CircuitBreaker, HALF_OPEN
+from .http_clients import get_async_http_client, get_async_openai_client, scaled_timeout
+from .llm_cache import LLMResponseCache, make_cache_key
+from .llm_engine import OllamaProvider, OpenAIProvider
+from .llm_metrics import record_llm_call, usage_from_text
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOpenAIProvider(OpenAIProvider):
+    """Asinxron OpenAI provayderi (so'rov parametrlari sinxron provayder bilan umumiy)"""
+
+    def __init__(self):
+        # Klient event loop'ga bog'langan - har bir so'rovda joriy loop uchun olinadi
+        self.api_key = settings.OPENAI_API_KEY
+        self.model = settings.OPENAI_MODEL
+
+    @property
+    def client(self):
+        return get_async_openai_client(self.api_key)
+
+    async def is_available(self) -> bool:
+        """OpenAI mavjudligini tekshirish (test so'rov yubormay)"""
+        return bool(self.api_key)
+
+    async def generate_response(self, prompt: str, **kwargs) -> str:
+        """OpenAI orqali javob generatsiya qilish"""
+        return (await self.generate_with_usage(prompt, **kwargs))[0]
+
+    @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=2), reraise=True)
+    async def generate_with_usage(self, prompt: str, **kwargs) -> Tuple[str, Dict[str, int]]:
+        """OpenAI orqali javob va token sarfi"""
+        if not self.api_key:
+            raise ValueError("OpenAI client mavjud emas")
+
+        try:
+            response = await self.client.chat.completions.create(
+                timeout=scaled_timeout(kwargs.get('max_tokens', 1000))[1],
+                **self._build_request(prompt, **kwargs)
+            )
+            text = response.choices[0].message.content.strip()
+            return text, self._usage(response, prompt, text, **kwargs)
+        except Exception as e:
+            logger.error(f"OpenAI dan javob olishda xatolik: {str(e)}")
+            raise
+
+    async def stream_response(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """OpenAI orqali javobni bo'laklab generatsiya qilish"""
+        if not self.api_key:
+            raise ValueError("OpenAI client mavjud emas")
+
+        try:
+            stream = await self.client.chat.completions.create(
+                stream=True,
+                timeout=scaled_timeout(0)[1],
+                **self._build_request(prompt, **kwargs)
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            logger.error(f"OpenAI oqimida xatolik: {str(e)}")
+            raise
+
+
+class AsyncOllamaProvider(OllamaProvider):
+    """Asinxron Ollama provayderi (httpx.AsyncClient orqali)"""
+
+    def __init__(self):
+        self.base_url = settings.OLLAMA_BASE_URL
+        self.model = settings.OLLAMA_MODEL
+
+    @property
+    def client(self):
+        return get_async_http_client()
+
+    async def is_available(self) -> bool:
+        """Ollama mavjudligini tekshirish"""
+        try:
+            response = await self.client.get(f"{self.base_url}/api/tags", timeout=scaled_timeout(0)[0])
+            if response.status_code == 200:
+                models = response.json().get('models', [])
+                return any(self.model in model['name'] for model in models)
+            return False
+        except Exception as e:
+            logger.warning(f"Ollama mavjud emas: {str(e)}")
+            return False
+
+    async def generate_response(self, prompt: str, **kwargs) -> str:
+        """Ollama orqali javob generatsiya qilish"""
+        return (await self.generate_with_usage(prompt, **kwargs))[0]
+
+    @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=2), reraise=True)
+    async def generate_with_usage(self, prompt: str, **kwargs) -> Tuple[str, Dict[str, int]]:
+        """Ollama orqali javob va token sarfi"""
+        import httpx
+
+        try:
+            connect, read = scaled_timeout(kwargs.get('max_tokens', 1000))
+            response = await self.client.post(
+                f"{self.base_url}/api/generate",
+                json=self._build_payload(prompt, stream=False, **kwargs),
+                timeout=httpx.Timeout(read, connect=connect),
+            )
+            if response.status_code == 200:
+                result = response.json()
+                text = result.get('response', '').strip()
+                return text, self._usage(result, prompt, text, **kwargs)
+            raise Exception(f"Ollama API xatosi: {response.status_code}")
+        except Exception as e:
+            logger.error(f"Ollama dan javob olishda xatolik: {str(e)}")
+            raise
+
+    async def stream_response(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Ollama orqali javobni bo'laklab generatsiya qilish"""
+        import httpx
+
+        connect, read = scaled_timeout(0)
+        try:
+            async with self.client.stream(
+                'POST',
+                f"{self.base_url}/api/generate",
+                json=self._build_payload(prompt, stream=True, **kwargs),
+                timeout=httpx.Timeout(read, connect=connect),
+            ) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Ollama API xatosi: {response.status_code}")
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get('response'):
+                        yield data['response']
+                    if data.get('done'):
+                        break
+        except Exception as e:
+            logger.error(f"Ollama oqimida xatolik: {str(e)}")
+            raise
+
+
+class AsyncHybridLLMEngine:
+    """Asinxron gibrid LLM dvigateli"""
+
+    def __init__(self):
+        self.providers = []
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.cache = LLMResponseCache()
+        self.max_concurrency = getattr(settings, 'LLM_ASYNC_MAX_CONCURRENCY', 50)
+        # event loop -> asyncio.Semaphore
+        self._semaphores: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._probed = False
+        self._initialize_providers()
+
+    def _initialize_providers(self):
+        """Provayderlarni ro'yxatga olish (Ollama birinchi so'rovda tekshiriladi)"""
+        openai_provider = AsyncOpenAIProvider()
+        if openai_provider.api_key:
+            self.providers.append(('openai', openai_provider))
+            logger.info("OpenAI provayderi ulandi (async)")
+
+        self.providers.append(('ollama', AsyncOllamaProvider()))
+
+    async def _probe_providers(self):
+        """Boshlang'ich mavjudlik tekshiruvi - ishlamayotgan provayder darhol o'chiriladi"""
+        if self._probed:
+            return
+        self._probed = True
+        for provider_name, provider in self.providers:
+            if provider_name != 'ollama':
+                continue
+            if await provider.is_available():
+                logger.info("Ollama provayderi ulandi (async)")
+            else:
+                self._breaker(provider_name).force_open("Ollama mavjud emas")
+                logger.warning("Ollama hozircha mavjud emas, keyinroq qayta tekshiriladi")
+
+    def _breaker(self, provider_name: str) -> CircuitBreaker:
+        """Provayder uchun circuit breaker"""
+        breaker = self.breakers.get(provider_name)
+        if breaker is None:
+            breaker = self.breakers[provider_name] = CircuitBreaker(provider_name)
+        return breaker
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Joriy event loop'dagi bir vaqtdagi generatsiyalar chegarasi"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _acquire_provider(self, provider_name: str, provider) -> bool:
+        """Provayderga so'rov yuborish mumkinmi (circuit breaker holatiga ko'ra)"""
+        breaker = self._breaker(provider_name)
+        if not breaker.allow_request():
+            logger.info(f"{provider_name} provayderi vaqtincha o'chirilgan (circuit breaker)")
+            return False
+        if breaker.state == HALF_OPEN:
+            available = None
+            try:
+                available = await provider.is_available()
+            except Exception as e:
+                available = False
+                logger.warning(f"{provider_name} provayderini tekshirishda xatolik: {str(e)}")
+            finally:
+                if available is None:
+                    # Tekshiruv bekor qilindi (CancelledError) - sinov natijasiz bo'shatiladi
+                    breaker.release_trial()
+            if not available:
+                breaker.record_failure("Mavjudlik tekshiruvi muvaffaqiyatsiz")
+                return False
+            logger.info(f"{provider_name} provayderi qayta sinab ko'rilmoqda")
+        return True
+
+    def _cache_key(self, prompt: str, **kwargs) -> str:
+        """Provayderlar zanjiri va parametrlar bo'yicha kesh kaliti (sinxron dvigatel bilan bir xil)"""
+        models = ','.join(f"{name}:{getattr(p, 'model', 'unknown')}" for name, p in self.providers)
+        return make_cache_key(prompt, models, **kwargs)
+
+    async def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        # Umumiy kesh (Redis/DB) sinxron - event loop bloklanmasligi uchun oqimda
+        return await sync_to_async(self.cache.get, thread_sensitive=False)(key)
+
+    async def _cache_set(self, key: str, value: Dict[str, Any]) -> None:
+        await sync_to_async(self.cache.set, thread_sensitive=False)(key, value)
+
+    async def _record(self, *args, **kwargs) -> None:
+        # Metrikalar jadvaliga yozish ORM orqali - event loop tashqarisida
+        await sync_to_async(record_llm_call, thread_sensitive=False)(*args, **kwargs)
+
+    def _all_failed_message(self, last_error: Optional[Exception]) -> str:
+        if last_error is None:
+            return "Barcha LLM provayderlari vaqtincha o'chirilgan (circuit breaker)"
+        return f"Barcha LLM provayderlari xatolik berdi. Oxirgi xatolik: {str(last_error)}"
+
+    async def generate_response(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Javob generatsiya qilish (kesh va failover bilan)
+
+        use_cache=False berilsa, kesh chetlab o'tiladi.
+        """
+        if not self.providers:
+            raise ValueError("Hech qanday LLM provayderi mavjud emas")
+        await self._probe_providers()
+
+        caller = kwargs.pop('caller', None)
+        prompt_version = kwargs.pop('prompt_version', None)
+        use_cache = kwargs.pop('use_cache', True)
+        cache_key = None
+        if use_cache and self.cache.enabled:
+            cache_key = self._cache_key(prompt, prompt_version=prompt_version, **kwargs)
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM javobi keshdan olindi ({cached.get('provider')})")
+                await self._record(caller, cached.get('provider'), cached.get('model'), True, cached=True)
+                return {**cached, 'cached': True}
+
+        last_error = None
+        failovers = 0
+
+        async with self._semaphore():
+            for provider_name, provider in self.providers:
+                if not await self._acquire_provider(provider_name, provider):
+                    continue
+
+                breaker = self._breaker(provider_name)
+                model = getattr(provider, 'model', 'unknown')
+                started = time.monotonic()
+                finished = False
+                try:
+                    logger.info(f"{provider_name} provayderi orqali javob generatsiya qilinmoqda (async)...")
+                    if hasattr(provider, 'generate_with_usage'):
+                        response, usage = await provider.generate_with_usage(prompt, **kwargs)
+                    else:
+                        response = await provider.generate_response(prompt, **kwargs)
+                        usage = usage_from_text(prompt, response, kwargs.get('system_prompt', ''), model)
+                    latency = time.monotonic() - started
+                    breaker.record_success(latency)
+                    finished = True
+                except Exception as e:
+                    finished = True
+                    last_error = e
+                    latency = time.monotonic() - started
+                    breaker.record_failure(e, latency)
+                    await self._record(caller, provider_name, model, False, latency)
+                    failovers += 1
+                    logger.warning(f"{provider_name} provayderi xatolik berdi: {str(e)}")
+                    continue
+                finally:
+                    if not finished:
+                        # CancelledError (BaseException) - sinov natijasiz bo'shatiladi
+                        breaker.release_trial()
+
+                await self._record(caller, provider_name, model, True, latency, failovers=failovers, **usage)
+                result = {
+                    'success': True,
+                    'response': response,
+                    'provider': provider_name,
+                    'model': model,
+                    'usage': {**usage, 'latency_ms': int(latency * 1000)},
+                    'prompt_version': prompt_version,
+                }
+                if cache_key:
+                    await self._cache_set(cache_key, result)
+                return {**result, 'cached': False}
+
+        error_msg = self._all_failed_message(last_error)
+        logger.error(error_msg)
+        if last_error is None:
+            await self._record(caller, None, None, False)
+
+        return {
+            'success': False,
+            'error': error_msg,
+            'provider': None,
+            'response': None,
+        }
+
+    async def generate_many(self, prompts: List[str], **kwargs) -> List[Dict[str, Any]]:
+        """Bir nechta promptni bir vaqtda generatsiya qilish (natijalar tartibi saqlanadi)"""
+        return await asyncio.gather(*(self.generate_response(prompt, **kwargs) for prompt in prompts))
+
+    async def stream_response(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Javobni bo'laklab generatsiya qilish (kesh va failover bilan)
+
+        Failover faqat birinchi bo'lak kelguncha ishlaydi - oqim boshlangandan
+        keyingi xatolik chaqiruvchiga uzatiladi. To'liq javob keshga yoziladi.
+        Oqim davomida bitta generatsiya slot'i band bo'ladi; oqimni oxirigacha
+        o'qimagan chaqiruvchi `aclose()` chaqirishi kerak - shunda slot,
+        half_open sinovi va provayder ulanishi darhol bo'shatiladi.
+        """
+        if not self.providers:
+            raise ValueError("Hech qanday LLM provayderi mavjud emas")
+        await self._probe_providers()
+
+        caller = kwargs.pop('caller', None)
+        prompt_version = kwargs.pop('prompt_version', None)
+        use_cache = kwargs.pop('use_cache', True)
+        cache_key = None
+        if use_cache and self.cache.enabled:
+            cache_key = self._cache_key(prompt, prompt_version=prompt_version, **kwargs)
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM javobi keshdan olindi ({cached.get('provider')})")
+                await self._record(caller, cached.get('provider'), cached.get('model'), True, cached=True)
+                yield cached['response']
+                return
+
+        last_error = None
+        failovers = 0
+
+        semaphore = self._semaphore()
+        await semaphore.acquire()
+        try:
+            for provider_name, provider in self.providers:
+                if not await self._acquire_provider(provider_name, provider):
+                    continue
+
+                breaker = self._breaker(provider_name)
+                model = getattr(provider, 'model', 'unknown')
+                started = time.monotonic()
+                chunks = []
+                finished = False
+                try:
+                    logger.info(f"{provider_name} provayderi orqali oqimli javob generatsiya qilinmoqda (async)...")
+                    async with aclosing(provider.stream_response(prompt, **kwargs)) as stream:
+                        async for chunk in stream:
+                            chunks.append(chunk)
+                            yield chunk
+                    finished = True
+                except Exception as e:
+                    finished = True
+                    latency = time.monotonic() - started
+                    breaker.record_failure(e, latency)
+                    await self._record(caller, provider_name, model, False, latency)
+                    if chunks:
+                        raise
+                    last_error = e
+                    failovers += 1
+                    logger.warning(f"{provider_name} provayderi xatolik berdi: {str(e)}")
+                    continue
+                finally:
+                    if not finished:
+                        # Oqim yopildi yoki bekor qilindi - sinov natijasiz bo'shatiladi
+                        breaker.release_trial()
+
+                latency = time.monotonic() - started
+                response = ''.join(chunks).strip()
+                breaker.record_success(latency)
+                usage = usage_from_text(prompt, response, kwargs.get('system_prompt', ''), model)
+                await self._record(caller, provider_name, model, True, latency, failovers=failovers, **usage)
+                if cache_key:
+                    await self._cache_set(cache_key, {
+                        'success': True,
+                        'response': response,
+                        'provider': provider_name,
+                        'model': model,
+                        'usage': {**usage, 'latency_ms': int(latency * 1000)},
+                        'prompt_version': prompt_version,
+                    })
+                return
+        finally:
+            semaphore.release()
+
+        error_msg = self._all_failed_message(last_error)
+        logger.error(error_msg)
+        if last_error is None:
+            await self._record(caller, None, None, False)
+        raise ValueError(error_msg)
+
+    def check_provider_status(self) -> Dict[str, Any]:
+        """Barcha provayderlarning keshlangan statusi (jonli so'rovsiz)"""
+        status = {
+            provider_name: {
+                **self._breaker(provider_name).snapshot(),
+                'model': getattr(provider, 'model', 'unknown'),
+            }
+            for provider_name, provider in self.providers
+        }
+        return {
+            'total_providers': len(self.providers),
+            'available_providers': len([p for p in status.values() if p['available']]),
+            'providers': status,
+            'cache': self.cache.get_stats(),
+        }
+
+
+# Global instance - birinchi murojaatda yaratiladi
+async_llm_engine = SimpleLazyObject(AsyncHybridLLMEngine)
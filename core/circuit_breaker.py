@@ -0,0 +1,148 @@
+"""
+LLM provayderlari uchun circuit breaker
+
+Har bir provayder uchun oxirgi so'rovlar natijasi va kechikishi kuzatiladi:
+    - closed    - provayder ishlaydi, so'rovlar o'tadi
+    - open      - ketma-ket xatoliklar yoki yuqori xatolik ulushi sababli
+                  provayder vaqtincha chetlab o'tiladi
+    - half_open - kutish muddati tugagach bitta sinov so'rovi o'tkaziladi;
+                  muvaffaqiyatli bo'lsa provayder qayta yoqiladi. Sinov natijasiz
+                  tugasa (oqim yopilgan, vazifa bekor qilingan) release_trial()
+                  chaqiriladi; chaqirilmasa ham sinov trial_timeout dan keyin
+                  eskirgan hisoblanadi va yangi sinovga ruxsat beriladi
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Bitta provayder holati (thread-safe)"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        error_rate_threshold: Optional[float] = None,
+        window_size: Optional[int] = None,
+        cooldown: Optional[float] = None,
+        max_cooldown: Optional[float] = None,
+        trial_timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or getattr(settings, 'LLM_BREAKER_FAILURE_THRESHOLD', 3)
+        self.error_rate_threshold = error_rate_threshold or getattr(settings, 'LLM_BREAKER_ERROR_RATE', 0.5)
+        self.window_size = window_size or getattr(settings, 'LLM_BREAKER_WINDOW', 20)
+        self.base_cooldown = cooldown or getattr(settings, 'LLM_BREAKER_COOLDOWN', 30)
+        self.max_cooldown = max_cooldown or getattr(settings, 'LLM_BREAKER_MAX_COOLDOWN', 600)
+        self.trial_timeout = trial_timeout or getattr(settings, 'LLM_BREAKER_TRIAL_TIMEOUT', 180)
+
+        self.state = CLOSED
+        self.cooldown = self.base_cooldown
+        self.opened_at: Optional[float] = None
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        # (muvaffaqiyatli, kechikish soniyalarda)
+        self._window: deque = deque(maxlen=self.window_size)
+        self._trial_in_flight = False
+        self._trial_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """So'rov provayderga yuborilishi mumkinmi"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            # half_open: bir vaqtda faqat bitta sinov so'rovi
+            now = time.monotonic()
+            if self._trial_in_flight and now - self._trial_started_at < self.trial_timeout:
+                return False
+            self._trial_in_flight = True
+            self._trial_started_at = now
+            return True
+
+    def release_trial(self) -> None:
+        """Natijasiz tugagan sinovni bo'shatish (holat half_open bo'lib qoladi)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._window.append((True, latency))
+            self.consecutive_failures = 0
+            self.last_success_at = time.time()
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.cooldown = self.base_cooldown
+                self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self, error: Any = None, latency: float = 0.0) -> None:
+        with self._lock:
+            self._window.append((False, latency))
+            self.consecutive_failures += 1
+            self.last_error = str(error) if error is not None else None
+            self.last_failure_at = time.time()
+
+            if self.state == HALF_OPEN:
+                # Sinov muvaffaqiyatsiz - kutish muddati ikki barobar oshadi
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+            elif self.state == CLOSED and self._should_open():
+                self._open()
+            self._trial_in_flight = False
+
+    def force_open(self, error: Any = None) -> None:
+        """Provayderni darhol o'chirish (masalan boshlang'ich tekshiruv muvaffaqiyatsiz bo'lsa)"""
+        with self._lock:
+            self.last_error = str(error) if error is not None else self.last_error
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def _should_open(self) -> bool:
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        if len(self._window) >= self.window_size // 2:
+            failures = sum(1 for ok, _ in self._window if not ok)
+            return failures / len(self._window) >= self.error_rate_threshold
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Keshlangan holat - jonli so'rovsiz"""
+        with self._lock:
+            calls = len(self._window)
+            failures = sum(1 for ok, _ in self._window if not ok)
+            latencies = sorted(latency for ok, latency in self._window if ok)
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, round(self.cooldown - (time.monotonic() - self.opened_at), 1))
+            return {
+                'state': self.state,
+                'available': self.state != OPEN,
+                'recent_calls': calls,
+                'error_rate': round(failures / calls, 3) if calls else 0.0,
+                'consecutive_failures': self.consecutive_failures,
+                'avg_latency_ms': round(sum(latencies) / len(latencies) * 1000) if latencies else None,
+                'p95_latency_ms': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000) if latencies else None,
+                'last_error': self.last_error,
+                'last_success_at': self.last_success_at,
+                'last_failure_at': self.last_failure_at,
+                'retry_in_seconds': retry_in,
+            }
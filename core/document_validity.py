@@ -0,0 +1,147 @@
+"""
+Yuklangan hujjat yaroqliligini tekshirish
+
+Avval mahalliy tezkor klassifikator ishlaydi: matndagi tender/ishtirokchi
+hujjatlariga xos kalit so'zlar (o'zbek lotin, kirill va rus tillarida),
+harflar ulushi va so'zlar soni bo'yicha ball hisoblanadi. Aniq tender
+hujjatlari darhol qabul qilinadi, aniq axlat (bo'sh, ikkilik ma'lumot, mavzuga
+aloqasiz matn) darhol rad etiladi. Faqat noaniq oraliqda LLM dan "HA"/"YO"
+so'raladi - oddiy yuklashda qo'shimcha LLM chaqiruvi bo'lmaydi.
+"""
+import logging
+import re
+from typing import Dict, FrozenSet, NamedTuple, Optional
+
+from django.conf import settings
+
+from .prompt_budget import truncate_to_tokens
+from .retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+VALID = 'valid'
+INVALID = 'invalid'
+UNCERTAIN = 'uncertain'
+
+# Noaniq holatda LLM ga yuboriladigan bosh qism (tokenlarda)
+VALIDITY_SAMPLE_TOKENS = 600
+
+# Mahalliy klassifikator ko'radigan bosh qism (belgilarda)
+CLASSIFIER_SAMPLE_CHARS = 20000
+
+# Kalit so'z o'zaklari (retrieval.tokenize kabi kichik harf, so'z boshidan)
+COMMON_TERMS = frozenset({
+    # uz_latn
+    'shartn', 'talab', 'xarid', 'narx', 'sifat', 'litsen', 'tajrib', 'muddat', 'kafola',
+    'hujjat', 'texnik', 'malaka', 'yetkaz', 'xizmat', 'tolov', 'summa', 'soliq',
+    # uz_cyrl
+    'шартно', 'талаб', 'харид', 'нарх', 'сифат', 'лиценз', 'тажриб', 'муддат', 'кафола',
+    'ҳужжат', 'хужжат', 'техник', 'малака', 'етказ', 'хизмат', 'тўлов', 'сумма', 'солиқ',
+    # ru
+    'догово', 'контра', 'требов', 'закупк', 'цена', 'стоимо', 'лиценз', 'опыт', 'срок',
+    'гарант', 'докуме', 'технич', 'квалиф', 'постав', 'услуг', 'оплат', 'налог',
+})
+
+KIND_TERMS: Dict[str, FrozenSet[str]] = {
+    'tender': frozenset({
+        'tender', 'tanlov', 'buyurt', 'ishtir', 'bahola', 'mezon',
+        'тендер', 'танлов', 'буюртм', 'иштиро', 'баҳола', 'мезон',
+        'заказч', 'участн', 'оценк', 'критер', 'конкур',
+    }),
+    'participant': frozenset({
+        'kompan', 'tashki', 'mchj', 'korxon', 'taklif', 'direkt', 'manzil', 'guvohn', 'stir', 'bank',
+        'компан', 'ташкил', 'мчж', 'корхон', 'таклиф', 'директ', 'манзил', 'гувоҳн', 'стир', 'банк',
+        'органи', 'ооо', 'предло', 'адрес', 'свидет', 'инн', 'предпр',
+    }),
+}
+
+LETTER_RE = re.compile(r'[^\W\d_]', re.UNICODE)
+
+
+class ValidityVerdict(NamedTuple):
+    label: str
+    score: float
+    source: str  # 'local' yoki 'llm'
+
+    @property
+    def valid(self) -> bool:
+        # LLM ham aniq javob bermasa, hujjat rad etilmaydi
+        return self.label != INVALID
+
+
+def _matches(stem: str, terms: FrozenSet[str]) -> Optional[str]:
+    for length in range(len(stem), 2, -1):
+        if stem[:length] in terms:
+            return stem[:length]
+    return None
+
+
+def classify_document(text: str, kind: str = 'tender') -> ValidityVerdict:
+    """
+    Mahalliy klassifikator (LLM siz)
+
+    Ball - topilgan turli kalit so'zlar soni; kalit so'zlar zichligi va harflar
+    ulushi past bo'lsa hujjat rad etiladi.
+    """
+    sample = (text or '')[:CLASSIFIER_SAMPLE_CHARS]
+    tokens = tokenize(sample)
+    if len(tokens) < getattr(settings, 'VALIDITY_MIN_WORDS', 20):
+        return ValidityVerdict(INVALID, 0.0, 'local')
+
+    letters = len(LETTER_RE.findall(sample))
+    visible = sum(1 for char in sample if not char.isspace())
+    if visible and letters / visible < 0.5:
+        # Ikkilik ma'lumot yoki raqamlar jadvali
+        return ValidityVerdict(INVALID, 0.0, 'local')
+
+    terms = COMMON_TERMS | KIND_TERMS.get(kind, frozenset())
+    distinct = set()
+    hits = 0
+    for token in tokens:
+        term = _matches(token, terms)
+        if term:
+            distinct.add(term)
+            hits += 1
+    density = hits / len(tokens)
+    score = float(len(distinct))
+
+    if len(distinct) >= getattr(settings, 'VALIDITY_ACCEPT_TERMS', 6) and density >= 0.01:
+        return ValidityVerdict(VALID, score, 'local')
+    if len(distinct) <= getattr(settings, 'VALIDITY_REJECT_TERMS', 1):
+        return ValidityVerdict(INVALID, score, 'local')
+    return ValidityVerdict(UNCERTAIN, score, 'local')
+
+
+def _llm_check(text: str, kind: str) -> Optional[bool]:
+    """Noaniq hujjatni LLM orqali tekshirish (javob bo'lmasa None)"""
+    from .llm_engine import llm_engine
+
+    subject = 'tender shartnomasi' if kind == 'tender' else 'ishtirokchi hujjatlari'
+    check_prompt = f"""
+Quyidagi matn {subject} yoki unga o'xshash rasmiy hujjatmi? Mazmunan va mantiqan to'g'ri, to'liq va tahlil qilishga yaroqlimi? Faqat 'HA' yoki 'YO' deb javob ber:
+
+{truncate_to_tokens(text, VALIDITY_SAMPLE_TOKENS)}
+"""
+    check_result = llm_engine.generate_response(
+        check_prompt, system_prompt="Faqat 'HA' yoki 'YO' deb javob ber.", temperature=0.0, caller='validity_check'
+    )
+    if not check_result.get('success'):
+        return None
+    return 'YO' not in (check_result.get('response') or '').strip().upper()
+
+
+def check_document_validity(text: str, kind: str = 'tender') -> ValidityVerdict:
+    """Hujjat yaroqliligi: mahalliy klassifikator, noaniq bo'lsa LLM"""
+    verdict = classify_document(text, kind)
+    if verdict.label != UNCERTAIN or not getattr(settings, 'VALIDITY_LLM_FALLBACK', True):
+        logger.info(f"Hujjat yaroqliligi ({kind}): {verdict.label}, ball {verdict.score}")
+        return verdict
+
+    try:
+        answer = _llm_check(text, kind)
+    except Exception as e:
+        logger.warning(f"LLM yaroqlilik tekshiruvida xatolik: {str(e)}")
+        answer = None
+    if answer is None:
+        return verdict
+    return ValidityVerdict(VALID if answer else INVALID, verdict.score, 'llm')
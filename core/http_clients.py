@@ -0,0 +1,132 @@
+"""
+LLM xizmatlari uchun umumiy HTTP klientlar
+
+Har bir jarayonda bitta keep-alive ulanishlar puli ishlatiladi: Ollama uchun
+requests.Session, OpenAI uchun bitta sozlangan klient. Jarayon fork qilinganda
+(Celery prefork) klientlar yangi jarayonda qayta yaratiladi. Asinxron klientlar
+event loop'ga bog'langan, shuning uchun har bir loop uchun alohida yaratiladi.
+"""
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_clients: Dict[Tuple[str, int, str], Any] = {}
+_lock = threading.Lock()
+# event loop -> {kalit: asinxron klient}
+_async_clients: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+
+def _pool_size() -> int:
+    return getattr(settings, 'LLM_HTTP_POOL_SIZE', 10)
+
+
+def get_http_session() -> requests.Session:
+    """Jarayon uchun umumiy keep-alive requests sessiyasi"""
+    key = ('requests', os.getpid(), '')
+    with _lock:
+        session = _clients.get(key)
+        if session is None:
+            session = requests.Session()
+            # Qayta urinishlar tenacity va circuit breaker tomonidan boshqariladi
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_pool_size(), max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _clients[key] = session
+        return session
+
+
+def get_openai_client(api_key: Optional[str] = None):
+    """Jarayon uchun umumiy OpenAI klienti (ulanishlar puli sozlangan)"""
+    api_key = api_key or getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY')
+    key = ('openai', os.getpid(), api_key or '')
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            import httpx
+            import openai
+
+            pool_size = _pool_size()
+            client = openai.OpenAI(
+                api_key=api_key,
+                max_retries=0,
+                timeout=httpx.Timeout(scaled_timeout(1000)[1], connect=scaled_timeout(0)[0]),
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                ),
+            )
+            _clients[key] = client
+        return client
+
+
+def _async_pool_size() -> int:
+    return getattr(settings, 'LLM_ASYNC_POOL_SIZE', 50)
+
+
+def _loop_clients() -> Dict[Tuple[str, int, str], Any]:
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            clients = _async_clients[loop] = {}
+        return clients
+
+
+def get_async_http_client():
+    """Joriy event loop uchun umumiy keep-alive httpx.AsyncClient"""
+    clients = _loop_clients()
+    key = ('httpx', os.getpid(), '')
+    client = clients.get(key)
+    if client is None:
+        import httpx
+
+        pool_size = _async_pool_size()
+        client = clients[key] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+    return client
+
+
+def get_async_openai_client(api_key: Optional[str] = None):
+    """Joriy event loop uchun umumiy AsyncOpenAI klienti"""
+    api_key = api_key or getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY')
+    clients = _loop_clients()
+    key = ('openai', os.getpid(), api_key or '')
+    client = clients.get(key)
+    if client is None:
+        import httpx
+        import openai
+
+        pool_size = _async_pool_size()
+        client = clients[key] = openai.AsyncOpenAI(
+            api_key=api_key,
+            max_retries=0,
+            timeout=httpx.Timeout(scaled_timeout(1000)[1], connect=scaled_timeout(0)[0]),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            ),
+        )
+    return client
+
+
+def scaled_timeout(max_tokens: Optional[int]) -> Tuple[float, float]:
+    """
+    So'ralgan token hajmiga mos (connect, read) timeout
+
+    read = asosiy vaqt + max_tokens / generatsiya tezligi, yuqoridan chegaralangan.
+    """
+    connect = getattr(settings, 'LLM_CONNECT_TIMEOUT', 5)
+    base = getattr(settings, 'LLM_TIMEOUT_BASE', 15)
+    tokens_per_second = max(1, getattr(settings, 'LLM_TOKENS_PER_SECOND', 20))
+    max_timeout = getattr(settings, 'LLM_MAX_TIMEOUT', 600)
+    read = min(max_timeout, base + (max_tokens or 0) / tokens_per_second)
+    return float(connect), float(read)
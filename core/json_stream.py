@@ -0,0 +1,119 @@
+"""
+Oqimli JSON yig'uvchi
+
+LLM javobi bo'laklab kelganda JSON'ni to'liq tugashini kutmasdan, massiv
+ichidagi tayyor obyektlarni (masalan "requirements" elementlarini) darhol
+ajratib beradi.
+"""
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+
+def _loads_lenient(text: str) -> Any:
+    """LLM javobidagi odatiy xatolarni tozalab JSON parse qilish"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        cleaned = re.sub(r',\s*}', '}', text)
+        cleaned = re.sub(r',\s*]', ']', cleaned)
+        cleaned = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', cleaned)
+        return json.loads(cleaned)
+
+
+class IncrementalJSONAssembler:
+    """
+    Bo'laklab keladigan JSON matnini yig'uvchi
+
+    Foydalanish:
+        assembler = IncrementalJSONAssembler()
+        for chunk in llm_engine.stream_response(prompt):
+            for key, item in assembler.feed(chunk):
+                ...  # masalan key == 'requirements'
+        analysis = assembler.result
+    """
+
+    def __init__(self):
+        self.result: Optional[Any] = None
+        self._text = ''
+        self._pos = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        # Har bir ochiq konteyner: [turi, boshlanish, kaliti, oxirgi satr, joriy kalit]
+        self._stack: List[list] = []
+
+    @property
+    def text(self) -> str:
+        """Hozirgacha kelgan to'liq matn"""
+        return self._text
+
+    @property
+    def is_complete(self) -> bool:
+        """Yuqori darajadagi JSON obyekti yopilganmi"""
+        return self.result is not None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Yangi bo'lakni qo'shish
+
+        Returns:
+            Shu bo'lak bilan yakunlangan massiv elementlari: [(massiv kaliti, obyekt), ...]
+        """
+        self._text += chunk
+        completed: List[Tuple[str, Any]] = []
+
+        text = self._text
+        while self._pos < len(text) and self.result is None:
+            char = text[self._pos]
+            pos = self._pos
+            self._pos += 1
+
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._stack.append(['{', pos, None, None, None])
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    frame = self._stack[-1]
+                    if frame[0] == '{':
+                        frame[3] = text[self._string_start + 1:pos]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ':':
+                frame = self._stack[-1]
+                if frame[0] == '{':
+                    frame[4] = frame[3]
+            elif char in '{[':
+                parent = self._stack[-1]
+                key = parent[4] if parent[0] == '{' else parent[2]
+                self._stack.append([char, pos, key, None, None])
+            elif char in '}]':
+                frame = self._stack.pop()
+                if not self._stack:
+                    try:
+                        self.result = _loads_lenient(text[frame[1]:pos + 1])
+                    except (json.JSONDecodeError, ValueError):
+                        self.result = None
+                    break
+                parent = self._stack[-1]
+                if frame[0] == '{' and parent[0] == '[' and parent[2]:
+                    try:
+                        completed.append((parent[2], _loads_lenient(text[frame[1]:pos + 1])))
+                    except (json.JSONDecodeError, ValueError):
+                        pass
+                if parent[0] == '{':
+                    parent[4] = None
+
+        return completed
@@ -0,0 +1,182 @@
+"""
+LLM javoblari keshi
+
+Bir xil prompt, system prompt, model va parametrlar bilan qilingan so'rovlar
+qayta LLM ga yuborilmaydi. Kesh ikki qatlamli:
+    - lokal (jarayon ichidagi) LRU kesh, TTL bilan
+    - umumiy kesh - Django cache backend (Redis/DB), barcha worker'lar uchun
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Kesh kalitiga ta'sir qiladigan generatsiya parametrlari
+CACHE_KEY_PARAMS = (
+    'system_prompt',
+    'max_tokens',
+    'temperature',
+    'top_p',
+    'frequency_penalty',
+    'presence_penalty',
+    'prompt_version',
+)
+
+
+def _normalize_text(text: Optional[str]) -> str:
+    """Matnni normallashtirish - ortiqcha bo'shliqlar kalitga ta'sir qilmasin"""
+    if not text:
+        return ''
+    lines = [' '.join(line.split()) for line in str(text).strip().splitlines()]
+    return '\n'.join(line for line in lines if line)
+
+
+def make_cache_key(prompt: str, model: str, **kwargs) -> str:
+    """Prompt va parametrlardan kontent-adresli kesh kalitini yaratish"""
+    payload = {
+        'prompt': _normalize_text(prompt),
+        'model': model or '',
+    }
+    for name in CACHE_KEY_PARAMS:
+        value = kwargs.get(name)
+        payload[name] = _normalize_text(value) if name == 'system_prompt' else value
+
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LocalLRUCache:
+    """Jarayon ichidagi TTL + LRU kesh (thread-safe)"""
+
+    def __init__(self, max_entries: int = 512, ttl: int = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LLMResponseCache:
+    """Ikki qatlamli LLM javob keshi"""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        shared_alias: Optional[str] = None,
+    ):
+        self.enabled = getattr(settings, 'LLM_CACHE_ENABLED', True) if enabled is None else enabled
+        self.ttl = ttl or getattr(settings, 'LLM_CACHE_TTL', 24 * 3600)
+        self.shared_alias = shared_alias if shared_alias is not None else getattr(settings, 'LLM_CACHE_ALIAS', 'default')
+        self.local = LocalLRUCache(
+            max_entries=max_entries or getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 512),
+            ttl=self.ttl,
+        )
+        self._stats = {'hits': 0, 'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'sets': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, *names: str) -> None:
+        with self._stats_lock:
+            for name in names:
+                self._stats[name] += 1
+
+    def _shared_cache(self):
+        """Umumiy kesh backend'i (Redis/DB). Sozlanmagan bo'lsa None"""
+        if not self.shared_alias:
+            return None
+        try:
+            from django.core.cache import caches
+            return caches[self.shared_alias]
+        except Exception as e:
+            logger.warning(f"Umumiy LLM keshi mavjud emas: {str(e)}")
+            return None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Keshdan javobni olish"""
+        if not self.enabled:
+            return None
+
+        value = self.local.get(key)
+        if value is not None:
+            self._count('hits', 'local_hits')
+            return value
+
+        shared = self._shared_cache()
+        if shared is not None:
+            try:
+                value = shared.get(f'llm:{key}')
+            except Exception as e:
+                logger.warning(f"Umumiy LLM keshidan o'qishda xatolik: {str(e)}")
+                value = None
+            if value is not None:
+                self.local.set(key, value)
+                self._count('hits', 'shared_hits')
+                return value
+
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Javobni keshga yozish"""
+        if not self.enabled:
+            return
+
+        self.local.set(key, value)
+        shared = self._shared_cache()
+        if shared is not None:
+            try:
+                shared.set(f'llm:{key}', value, timeout=self.ttl)
+            except Exception as e:
+                logger.warning(f"Umumiy LLM keshiga yozishda xatolik: {str(e)}")
+        self._count('sets')
+
+    def clear(self) -> None:
+        """Lokal keshni va hisoblagichlarni tozalash"""
+        self.local.clear()
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss statistikasi"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['local_entries'] = len(self.local)
+        stats['enabled'] = self.enabled
+        return stats
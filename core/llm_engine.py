@@ -1,12 +1,18 @@
 import logging
 import os
 import json
-from typing import Dict, List, Any, Optional, Union
+import threading
+import time
+from typing import Dict, Iterator, List, Any, Optional, Tuple, Union
 from abc import ABC, abstractmethod
-import openai
-import requests
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 from tenacity import retry, stop_after_attempt, wait_exponential
+from .llm_cache import LLMResponseCache, make_cache_key
+from .circuit_breaker import CircuitBreaker, HALF_OPEN
+from .http_clients import get_http_session, get_openai_client, scaled_timeout
+from .llm_metrics import record_llm_call, usage_from_text
+from .prompt_budget import context_window
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +29,15 @@ class BaseLLMProvider(ABC):
     def is_available(self) -> bool:
         """Provayderni mavjudligini tekshirish"""
         pass
+    
+    def stream_response(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Javobni bo'laklab generatsiya qilish (standart: bitta bo'lak)"""
+        yield self.generate_response(prompt, **kwargs)
+    
+    def generate_with_usage(self, prompt: str, **kwargs) -> Tuple[str, Dict[str, int]]:
+        """Javob va token sarfi (standart: matn uzunligidan taxmin)"""
+        response = self.generate_response(prompt, **kwargs)
+        return response, usage_from_text(prompt, response, kwargs.get('system_prompt', ''))
 
 
 class OpenAIProvider(BaseLLMProvider):
@@ -35,7 +50,7 @@ class OpenAIProvider(BaseLLMProvider):
         
         if self.api_key:
             try:
-                self.client = openai.OpenAI(api_key=self.api_key)
+                self.client = get_openai_client(self.api_key)
             except Exception as e:
                 logger.error(f"OpenAI clientini ishga tushirishda xatolik: {str(e)}")
     
@@ -44,33 +59,75 @@ class OpenAIProvider(BaseLLMProvider):
         # Faqat client va API key mavjudligini tekshirish (test so'rov yubormay)
         return self.client is not None and self.api_key is not None
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def generate_response(self, prompt: str, **kwargs) -> str:
         """OpenAI orqali javob generatsiya qilish"""
+        return self.generate_with_usage(prompt, **kwargs)[0]
+    
+    # Faqat qisqa uzilishlar uchun bitta tez qayta urinish - uzoq nosozliklarni circuit breaker ushlaydi
+    @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=2), reraise=True)
+    def generate_with_usage(self, prompt: str, **kwargs) -> Tuple[str, Dict[str, int]]:
+        """OpenAI orqali javob va token sarfi"""
         if not self.client:
             raise ValueError("OpenAI client mavjud emas")
         
         try:
-            messages = [
-                {"role": "system", "content": kwargs.get('system_prompt', '')},
-                {"role": "user", "content": prompt}
-            ]
-            
             response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=kwargs.get('max_tokens', 1000),
-                temperature=kwargs.get('temperature', 0.7),
-                top_p=kwargs.get('top_p', 1.0),
-                frequency_penalty=kwargs.get('frequency_penalty', 0.0),
-                presence_penalty=kwargs.get('presence_penalty', 0.0)
+                timeout=scaled_timeout(kwargs.get('max_tokens', 1000))[1],
+                **self._build_request(prompt, **kwargs)
             )
             
-            return response.choices[0].message.content.strip()
+            text = response.choices[0].message.content.strip()
+            return text, self._usage(response, prompt, text, **kwargs)
             
         except Exception as e:
             logger.error(f"OpenAI dan javob olishda xatolik: {str(e)}")
             raise
+    
+    def stream_response(self, prompt: str, **kwargs) -> Iterator[str]:
+        """OpenAI orqali javobni bo'laklab generatsiya qilish"""
+        if not self.client:
+            raise ValueError("OpenAI client mavjud emas")
+        
+        try:
+            # Oqimda timeout bo'laklar orasidagi kutishga tegishli
+            stream = self.client.chat.completions.create(
+                stream=True,
+                timeout=scaled_timeout(0)[1],
+                **self._build_request(prompt, **kwargs)
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            logger.error(f"OpenAI oqimida xatolik: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _usage(response, prompt: str, text: str, **kwargs) -> Dict[str, int]:
+        """API qaytargan token sarfi (bo'lmasa taxmin)"""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return usage_from_text(prompt, text, kwargs.get('system_prompt', ''))
+        return {'prompt_tokens': usage.prompt_tokens or 0, 'completion_tokens': usage.completion_tokens or 0}
+    
+    def _build_request(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Chat completions so'rovi parametrlari"""
+        messages = [
+            {"role": "system", "content": kwargs.get('system_prompt', '')},
+            {"role": "user", "content": prompt}
+        ]
+        return {
+            'model': self.model,
+            'messages': messages,
+            'max_tokens': kwargs.get('max_tokens', 1000),
+            'temperature': kwargs.get('temperature', 0.7),
+            'top_p': kwargs.get('top_p', 1.0),
+            'frequency_penalty': kwargs.get('frequency_penalty', 0.0),
+            'presence_penalty': kwargs.get('presence_penalty', 0.0),
+        }
 
 
 class OllamaProvider(BaseLLMProvider):
@@ -79,12 +136,13 @@ class OllamaProvider(BaseLLMProvider):
     def __init__(self):
         self.base_url = settings.OLLAMA_BASE_URL
         self.model = settings.OLLAMA_MODEL
-        self.timeout = 60
+        # Keep-alive ulanishlar puli (jarayon uchun umumiy)
+        self.session = get_http_session()
     
     def is_available(self) -> bool:
         """Ollama mavjudligini tekshirish"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=scaled_timeout(0)[0])
             if response.status_code == 200:
                 models = response.json().get('models', [])
                 model_names = [model['name'] for model in models]
@@ -94,39 +152,89 @@ class OllamaProvider(BaseLLMProvider):
             logger.warning(f"Ollama mavjud emas: {str(e)}")
             return False
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def generate_response(self, prompt: str, **kwargs) -> str:
         """Ollama orqali javob generatsiya qilish"""
+        return self.generate_with_usage(prompt, **kwargs)[0]
+    
+    # Faqat qisqa uzilishlar uchun bitta tez qayta urinish - uzoq nosozliklarni circuit breaker ushlaydi
+    @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=2), reraise=True)
+    def generate_with_usage(self, prompt: str, **kwargs) -> Tuple[str, Dict[str, int]]:
+        """Ollama orqali javob va token sarfi"""
         try:
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": kwargs.get('temperature', 0.7),
-                    "top_p": kwargs.get('top_p', 1.0),
-                    "num_predict": kwargs.get('max_tokens', 1000),
-                }
-            }
-            
-            if kwargs.get('system_prompt'):
-                payload["system"] = kwargs['system_prompt']
+            payload = self._build_payload(prompt, stream=False, **kwargs)
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
                 json=payload,
-                timeout=self.timeout
+                timeout=scaled_timeout(kwargs.get('max_tokens', 1000))
             )
             
             if response.status_code == 200:
                 result = response.json()
-                return result.get('response', '').strip()
+                text = result.get('response', '').strip()
+                return text, self._usage(result, prompt, text, **kwargs)
             else:
                 raise Exception(f"Ollama API xatosi: {response.status_code}")
                 
         except Exception as e:
             logger.error(f"Ollama dan javob olishda xatolik: {str(e)}")
             raise
+    
+    def stream_response(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Ollama orqali javobni bo'laklab generatsiya qilish"""
+        payload = self._build_payload(prompt, stream=True, **kwargs)
+        
+        try:
+            with self.session.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=scaled_timeout(0),
+                stream=True
+            ) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Ollama API xatosi: {response.status_code}")
+                
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get('response'):
+                        yield data['response']
+                    if data.get('done'):
+                        break
+        except Exception as e:
+            logger.error(f"Ollama oqimida xatolik: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _usage(result: Dict[str, Any], prompt: str, text: str, **kwargs) -> Dict[str, int]:
+        """Ollama javobidagi prompt_eval_count/eval_count (bo'lmasa taxmin)"""
+        if 'eval_count' not in result:
+            return usage_from_text(prompt, text, kwargs.get('system_prompt', ''))
+        return {
+            'prompt_tokens': result.get('prompt_eval_count') or 0,
+            'completion_tokens': result.get('eval_count') or 0,
+        }
+    
+    def _build_payload(self, prompt: str, stream: bool = False, **kwargs) -> Dict[str, Any]:
+        """/api/generate so'rovi tanasi"""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": kwargs.get('temperature', 0.7),
+                "top_p": kwargs.get('top_p', 1.0),
+                "num_predict": kwargs.get('max_tokens', 1000),
+                # Ollama standart 2048 token bilan cheklaydi - prompt byudjeti bilan bir xil oyna
+                "num_ctx": context_window(self.model),
+            }
+        }
+        
+        if kwargs.get('system_prompt'):
+            payload["system"] = kwargs['system_prompt']
+        
+        return payload
 
 
 class HybridLLMEngine:
@@ -134,54 +242,131 @@ class HybridLLMEngine:
     
     def __init__(self):
         self.providers = []
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        self.cache = LLMResponseCache()
         self._initialize_providers()
     
     def _initialize_providers(self):
         """Provayderlarni ishga tushirish"""
-        # OpenAI provayderi
+        # OpenAI provayderi (API kalit sozlangan bo'lsa)
         openai_provider = OpenAIProvider()
         if openai_provider.is_available():
             self.providers.append(('openai', openai_provider))
             logger.info("OpenAI provayderi ulandi")
         
-        # Ollama provayderi
+        # Ollama provayderi - hozir ishlamasa ham ro'yxatga olinadi, circuit breaker
+        # kutish muddatidan keyin uni qayta tekshiradi
         ollama_provider = OllamaProvider()
+        self.providers.append(('ollama', ollama_provider))
         if ollama_provider.is_available():
-            self.providers.append(('ollama', ollama_provider))
             logger.info("Ollama provayderi ulandi")
-        
-        if not self.providers:
-            logger.error("Hech qanday LLM provayderi mavjud emas!")
+        else:
+            self._breaker('ollama').force_open("Ollama mavjud emas")
+            logger.warning("Ollama hozircha mavjud emas, keyinroq qayta tekshiriladi")
+    
+    def _breaker(self, provider_name: str) -> CircuitBreaker:
+        """Provayder uchun circuit breaker"""
+        with self._breakers_lock:
+            breaker = self.breakers.get(provider_name)
+            if breaker is None:
+                breaker = self.breakers[provider_name] = CircuitBreaker(provider_name)
+            return breaker
+    
+    def _acquire_provider(self, provider_name: str, provider) -> bool:
+        """Provayderga so'rov yuborish mumkinmi (circuit breaker holatiga ko'ra)"""
+        breaker = self._breaker(provider_name)
+        if not breaker.allow_request():
+            logger.info(f"{provider_name} provayderi vaqtincha o'chirilgan (circuit breaker)")
+            return False
+        if breaker.state == HALF_OPEN:
+            # Sinov: to'liq so'rovdan oldin arzon mavjudlik tekshiruvi
+            try:
+                available = provider.is_available()
+            except Exception as e:
+                available = False
+                logger.warning(f"{provider_name} provayderini tekshirishda xatolik: {str(e)}")
+            if not available:
+                breaker.record_failure("Mavjudlik tekshiruvi muvaffaqiyatsiz")
+                return False
+            logger.info(f"{provider_name} provayderi qayta sinab ko'rilmoqda")
+        return True
+    
+    def _cache_key(self, prompt: str, **kwargs) -> str:
+        """Provayderlar zanjiri va parametrlar bo'yicha kesh kaliti"""
+        models = ','.join(f"{name}:{getattr(p, 'model', 'unknown')}" for name, p in self.providers)
+        return make_cache_key(prompt, models, **kwargs)
     
     def generate_response(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """
-        Javob generatsiya qilish (failover bilan)
+        Javob generatsiya qilish (kesh va failover bilan)
+        
+        use_cache=False berilsa, kesh chetlab o'tiladi. caller - metrikalar uchun
+        chaqiruvchi nomi (masalan 'tender_analysis'). prompt_version - shablon
+        versiyasi; kesh kalitiga kiradi, shablon o'zgarsa eski javoblar ishlatilmaydi.
         """
         if not self.providers:
             raise ValueError("Hech qanday LLM provayderi mavjud emas")
         
+        caller = kwargs.pop('caller', None)
+        prompt_version = kwargs.pop('prompt_version', None)
+        use_cache = kwargs.pop('use_cache', True)
+        cache_key = None
+        if use_cache and self.cache.enabled:
+            cache_key = self._cache_key(prompt, prompt_version=prompt_version, **kwargs)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM javobi keshdan olindi ({cached.get('provider')})")
+                record_llm_call(caller, cached.get('provider'), cached.get('model'), True, cached=True)
+                return {**cached, 'cached': True}
+        
         last_error = None
+        failovers = 0
         
         for provider_name, provider in self.providers:
+            if not self._acquire_provider(provider_name, provider):
+                continue
+            
+            breaker = self._breaker(provider_name)
+            model = getattr(provider, 'model', 'unknown')
+            started = time.monotonic()
             try:
                 logger.info(f"{provider_name} provayderi orqali javob generatsiya qilinmoqda...")
-                response = provider.generate_response(prompt, **kwargs)
+                if hasattr(provider, 'generate_with_usage'):
+                    response, usage = provider.generate_with_usage(prompt, **kwargs)
+                else:
+                    response = provider.generate_response(prompt, **kwargs)
+                    usage = usage_from_text(prompt, response, kwargs.get('system_prompt', ''), model)
+                latency = time.monotonic() - started
+                breaker.record_success(latency)
+                record_llm_call(caller, provider_name, model, True, latency, failovers=failovers, **usage)
                 
-                return {
+                result = {
                     'success': True,
                     'response': response,
                     'provider': provider_name,
-                    'model': getattr(provider, 'model', 'unknown'),
+                    'model': model,
+                    'usage': {**usage, 'latency_ms': int(latency * 1000)},
+                    'prompt_version': prompt_version,
                 }
+                if cache_key:
+                    self.cache.set(cache_key, result)
+                return {**result, 'cached': False}
                 
             except Exception as e:
                 last_error = e
+                latency = time.monotonic() - started
+                breaker.record_failure(e, latency)
+                record_llm_call(caller, provider_name, model, False, latency)
+                failovers += 1
                 logger.warning(f"{provider_name} provayderi xatolik berdi: {str(e)}")
                 continue
         
         # Barcha provayderlar xatolik bersa
-        error_msg = f"Barcha LLM provayderlari xatolik berdi. Oxirgi xatolik: {str(last_error)}"
+        error_msg = self._all_failed_message(last_error)
         logger.error(error_msg)
+        if last_error is None:
+            record_llm_call(caller, None, None, False)
         
         return {
             'success': False,
@@ -190,6 +375,91 @@ class HybridLLMEngine:
             'response': None,
         }
     
+    def stream_response(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Javobni bo'laklab generatsiya qilish (kesh va failover bilan)
+        
+        Failover faqat birinchi bo'lak kelguncha ishlaydi - oqim boshlangandan
+        keyingi xatolik chaqiruvchiga uzatiladi. To'liq javob keshga yoziladi.
+        """
+        if not self.providers:
+            raise ValueError("Hech qanday LLM provayderi mavjud emas")
+        
+        caller = kwargs.pop('caller', None)
+        prompt_version = kwargs.pop('prompt_version', None)
+        use_cache = kwargs.pop('use_cache', True)
+        cache_key = None
+        if use_cache and self.cache.enabled:
+            cache_key = self._cache_key(prompt, prompt_version=prompt_version, **kwargs)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM javobi keshdan olindi ({cached.get('provider')})")
+                record_llm_call(caller, cached.get('provider'), cached.get('model'), True, cached=True)
+                yield cached['response']
+                return
+        
+        last_error = None
+        failovers = 0
+        
+        for provider_name, provider in self.providers:
+            if not self._acquire_provider(provider_name, provider):
+                continue
+            
+            breaker = self._breaker(provider_name)
+            model = getattr(provider, 'model', 'unknown')
+            started = time.monotonic()
+            chunks = []
+            finished = False
+            try:
+                logger.info(f"{provider_name} provayderi orqali oqimli javob generatsiya qilinmoqda...")
+                for chunk in provider.stream_response(prompt, **kwargs):
+                    chunks.append(chunk)
+                    yield chunk
+                finished = True
+            except Exception as e:
+                finished = True
+                latency = time.monotonic() - started
+                breaker.record_failure(e, latency)
+                record_llm_call(caller, provider_name, model, False, latency)
+                if chunks:
+                    raise
+                last_error = e
+                failovers += 1
+                logger.warning(f"{provider_name} provayderi xatolik berdi: {str(e)}")
+                continue
+            finally:
+                if not finished:
+                    # Oqim yopildi (mijoz uzildi) - half_open sinovi natijasiz bo'shatiladi
+                    breaker.release_trial()
+            
+            latency = time.monotonic() - started
+            response = ''.join(chunks).strip()
+            breaker.record_success(latency)
+            # Oqimda usage qaytmaydi - tokenlar matndan taxmin qilinadi
+            usage = usage_from_text(prompt, response, kwargs.get('system_prompt', ''), model)
+            record_llm_call(caller, provider_name, model, True, latency, failovers=failovers, **usage)
+            if cache_key:
+                self.cache.set(cache_key, {
+                    'success': True,
+                    'response': response,
+                    'provider': provider_name,
+                    'model': model,
+                    'usage': {**usage, 'latency_ms': int(latency * 1000)},
+                    'prompt_version': prompt_version,
+                })
+            return
+        
+        error_msg = self._all_failed_message(last_error)
+        logger.error(error_msg)
+        if last_error is None:
+            record_llm_call(caller, None, None, False)
+        raise ValueError(error_msg)
+    
+    def _all_failed_message(self, last_error: Optional[Exception]) -> str:
+        if last_error is None:
+            return "Barcha LLM provayderlari vaqtincha o'chirilgan (circuit breaker)"
+        return f"Barcha LLM provayderlari xatolik berdi. Oxirgi xatolik: {str(last_error)}"
+    
     def analyze_document(self, text: str, analysis_type: str = 'general') -> Dict[str, Any]:
         """
         Hujjatni tahlil qilish
@@ -273,7 +543,8 @@ class HybridLLMEngine:
         result = self.generate_response(
             prompt,
             temperature=0.3,  # Analiz uchun past temperatura
-            max_tokens=1500
+            max_tokens=1500,
+            caller='document_analysis'
         )
         
         if result['success']:
@@ -335,7 +606,8 @@ class HybridLLMEngine:
         result = self.generate_response(
             prompt,
             temperature=0.2,
-            max_tokens=1000
+            max_tokens=1000,
+            caller='document_compare'
         )
         
         if result['success']:
@@ -391,20 +663,23 @@ class HybridLLMEngine:
         result = self.generate_response(
             prompt,
             temperature=0.5,
-            max_tokens=2000
+            max_tokens=2000,
+            caller='evaluation_report'
         )
         
         return result
     
     def check_provider_status(self) -> Dict[str, Any]:
         """
-        Barcha provayderlarning statusini tekshirish
+        Barcha provayderlarning statusi
+        
+        Jonli so'rov yuborilmaydi - circuit breaker'dagi keshlangan holat qaytariladi.
         """
         status = {}
         
         for provider_name, provider in self.providers:
             status[provider_name] = {
-                'available': provider.is_available(),
+                **self._breaker(provider_name).snapshot(),
                 'model': getattr(provider, 'model', 'unknown'),
             }
         
@@ -412,8 +687,9 @@ class HybridLLMEngine:
             'total_providers': len(self.providers),
             'available_providers': len([p for p in status.values() if p['available']]),
             'providers': status,
+            'cache': self.cache.get_stats(),
         }
 
 
-# Global instance
-llm_engine = HybridLLMEngine()
+# Global instance - provayderlar (Ollama tekshiruvi) birinchi murojaatda ishga tushiriladi
+llm_engine = SimpleLazyObject(HybridLLMEngine)
@@ -0,0 +1,201 @@
+"""
+LLM chaqiruvlari metrikalari
+
+Har bir chaqiruv uchun chaqiruvchi (tender tahlili, ishtirokchi tahlili,
+solishtirish, fraud, yaroqlilik tekshiruvi), provayder, model, tokenlar,
+kechikish va failover soni yoziladi. Ma'lumotlar soatlik agregat jadvaliga
+(LLMUsageStat) qo'shiladi - shu sababli web va Celery jarayonlari umumiy
+hisobga ega bo'ladi. /api/metrics/ jadvalni Prometheus formatida qaytaradi.
+
+Kesh mosliklari har safar bazaga yozilmaydi: ular jarayon xotirasida sanaladi
+va keyingi haqiqiy chaqiruv, LLM_METRICS_CACHE_HIT_BATCH ga yetganda,
+LLM_METRICS_FLUSH_INTERVAL o'tganda, metrikalar o'qilganda yoki jarayon
+tugaganda bitta so'rov bilan qo'shiladi.
+"""
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .prompt_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALLER = 'other'
+
+
+def usage_from_text(prompt: str, response: str, system_prompt: str = '', model: Optional[str] = None) -> Dict[str, int]:
+    """Token sarfini matndan hisoblash (provayder usage qaytarmaganda)"""
+    return {
+        'prompt_tokens': count_tokens(prompt, model) + count_tokens(system_prompt, model),
+        'completion_tokens': count_tokens(response, model),
+    }
+
+
+def token_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Narx USD da. LLM_TOKEN_PRICES: {model: [kirish, chiqish]} - 1M token uchun"""
+    prices = getattr(settings, 'LLM_TOKEN_PRICES', {}).get(model)
+    if not prices:
+        return 0.0
+    input_price, output_price = prices
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def _period(now=None):
+    now = now or timezone.now()
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+_pending_lock = threading.Lock()
+_pending_hits: Dict[Tuple, int] = {}
+_last_flush = time.monotonic()
+
+
+def _add_usage(key: Dict, values: Dict, latency_ms: int = 0) -> None:
+    """Soatlik qatorga qiymatlarni atomar qo'shish"""
+    from apps.evaluations.models import LLMUsageStat
+
+    # Soat ichidagi birinchi chaqiruv qatorni yaratadi, keyingilari atomar qo'shadi
+    for _ in range(2):
+        updated = LLMUsageStat.objects.filter(**key).update(
+            max_latency_ms=Greatest(F('max_latency_ms'), latency_ms),
+            **{field: F(field) + value for field, value in values.items()},
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                LLMUsageStat.objects.create(**key, max_latency_ms=latency_ms, **values)
+            return
+        except IntegrityError:
+            # Parallel jarayon qatorni yaratib ulgurdi - yangilashni qaytarish
+            continue
+
+
+def flush_cache_hits() -> None:
+    """Xotirada to'plangan kesh mosliklarini bazaga yozish"""
+    global _last_flush
+    with _pending_lock:
+        pending = dict(_pending_hits)
+        _pending_hits.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    try:
+        for (period, caller, provider, model), hits in pending.items():
+            _add_usage(
+                {'period': period, 'caller': caller, 'provider': provider, 'model': model},
+                {'calls': hits, 'cache_hits': hits},
+            )
+    except Exception as e:
+        logger.warning(f"LLM kesh metrikalarini yozishda xatolik: {str(e)}")
+
+
+atexit.register(flush_cache_hits)
+
+
+def record_llm_call(
+    caller: Optional[str],
+    provider: Optional[str],
+    model: Optional[str],
+    success: bool,
+    latency: float = 0.0,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    failovers: int = 0,
+    cached: bool = False,
+) -> None:
+    """Bitta LLM chaqiruvini agregat jadvalga qo'shish (xatolik LLM javobiga ta'sir qilmaydi)"""
+    if not getattr(settings, 'LLM_METRICS_ENABLED', True):
+        return
+
+    key = {
+        'period': _period(),
+        'caller': caller or DEFAULT_CALLER,
+        'provider': provider or 'none',
+        'model': model or 'unknown',
+    }
+
+    if cached:
+        with _pending_lock:
+            pending_key = tuple(key.values())
+            _pending_hits[pending_key] = _pending_hits.get(pending_key, 0) + 1
+            due = (
+                sum(_pending_hits.values()) >= getattr(settings, 'LLM_METRICS_CACHE_HIT_BATCH', 50)
+                or time.monotonic() - _last_flush >= getattr(settings, 'LLM_METRICS_FLUSH_INTERVAL', 60)
+            )
+        if due:
+            flush_cache_hits()
+        return
+
+    latency_ms = int(latency * 1000)
+    values = {
+        'calls': 1,
+        'failures': 0 if success else 1,
+        'failovers': failovers,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_latency_ms': latency_ms,
+        'cost_usd': token_cost(key['model'], prompt_tokens, completion_tokens),
+    }
+
+    try:
+        _add_usage(key, values, latency_ms)
+    except Exception as e:
+        logger.warning(f"LLM metrikasini yozishda xatolik: {str(e)}")
+    flush_cache_hits()
+
+
+METRICS: Tuple[Tuple[str, str, str, str], ...] = (
+    ('llm_calls_total', 'counter', 'calls', "LLM chaqiruvlari soni"),
+    ('llm_failures_total', 'counter', 'failures', "Muvaffaqiyatsiz chaqiruvlar soni"),
+    ('llm_cache_hits_total', 'counter', 'cache_hits', "Keshdan qaytarilgan javoblar soni"),
+    ('llm_failovers_total', 'counter', 'failovers', "Zaxira provayderga o'tishlar soni"),
+    ('llm_prompt_tokens_total', 'counter', 'prompt_tokens', "Prompt tokenlari"),
+    ('llm_completion_tokens_total', 'counter', 'completion_tokens', "Javob tokenlari"),
+    ('llm_cost_usd_total', 'counter', 'cost_usd', "Taxminiy narx (USD)"),
+    ('llm_latency_seconds_sum', 'counter', 'total_latency_ms', "Umumiy kechikish (soniya)"),
+    ('llm_latency_seconds_max', 'gauge', 'max_latency_ms', "Maksimal kechikish (soniya)"),
+)
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus() -> str:
+    """Agregat jadvalni Prometheus matn formatida qaytarish"""
+    from apps.evaluations.models import LLMUsageStat
+
+    flush_cache_hits()
+
+    aggregates = {
+        field: (Max(field) if kind == 'gauge' else Sum(field))
+        for _, kind, field, _ in METRICS
+    }
+    rows = list(
+        LLMUsageStat.objects.values('caller', 'provider', 'model')
+        .annotate(**{f'agg_{field}': agg for field, agg in aggregates.items()})
+        .order_by('caller', 'provider', 'model')
+    )
+
+    lines = []
+    for name, kind, field, help_text in METRICS:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for row in rows:
+            value = row[f'agg_{field}'] or 0
+            if field.endswith('_ms'):
+                value = value / 1000
+            labels = ','.join(
+                f'{label}="{_label(row[label])}"' for label in ('caller', 'provider', 'model')
+            )
+            lines.append(f'{name}{{{labels}}} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,293 @@
+"""
+Tanlab OCR qilish
+
+Faqat matn qatlami bo'lmagan (skanerlangan) sahifalar OCR qilinadi. Sahifa
+poppler'ning pdftoppm dasturi bilan to'liq rasmga aylantiriladi (OCR_DPI) - shu
+tariqa vektor konturlar, niqoblar va bir nechta bo'lakdan iborat skanlar ham
+ko'rinadi. pdftoppm o'rnatilmagan bo'lsa (Docker obrazida poppler-utils bor),
+faqat sahifaga joylashtirilgan rasm obyektlari olinadi: bu zaxira yo'l vektor
+ko'rinishidagi yoki murakkab filtrli sahifalarni o'tkazib yuborishi mumkin.
+
+Tesseract alohida dastur sifatida oqimlar pulida ishlaydi va pytesseract uni
+OCR_PAGE_TIMEOUT dan keyin o'ldiradi; kutish muddati tugasa pul kutilmasdan
+yopiladi, navbatdagi sahifalar bekor qilinadi. Natija rasm baytlarining SHA-256
+xeshi bo'yicha keshlanadi - xuddi shu skan qayta yuklanganda OCR qilinmaydi.
+"""
+import hashlib
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from .pdf_pages import iter_pdf_pages, open_pdf_reader
+
+logger = logging.getLogger(__name__)
+
+# Tesseract o'z timeout'i bilan to'xtamasa, natija shuncha qo'shimcha soniya kutiladi
+OCR_TIMEOUT_GRACE = 5
+
+
+def page_needs_ocr(text: Optional[str]) -> bool:
+    """Sahifada matn qatlami yo'q (yoki deyarli yo'q)mi"""
+    return len((text or '').strip()) < getattr(settings, 'OCR_MIN_TEXT_CHARS', 20)
+
+
+def _ocr_page_images(images: Sequence[bytes], lang: str, timeout: int) -> str:
+    """Bitta sahifa rasmlarini OCR qilish (alohida jarayonda ishlaydi)"""
+    import pytesseract
+    from PIL import Image
+
+    texts = []
+    for data in images:
+        image = Image.open(io.BytesIO(data))
+        texts.append(pytesseract.image_to_string(image, lang=lang, timeout=timeout))
+    return '\n'.join(text.strip() for text in texts if text and text.strip())
+
+
+@lru_cache(maxsize=1)
+def tesseract_version() -> str:
+    """O'rnatilgan Tesseract versiyasi (topilmasa 'none')"""
+    try:
+        import pytesseract
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return 'none'
+
+
+def ocr_version() -> str:
+    """
+    OCR natijasiga ta'sir qiluvchi sozlamalar izi (kesh kalitlari uchun)
+
+    Tesseract versiyasi, tillar va sahifani rasmga aylantirish usuli (pdftoppm va
+    DPI yoki joylashtirilgan rasmlar) - ulardan biri o'zgarsa, kesh eskiradi.
+    """
+    if not getattr(settings, 'OCR_ENABLED', True):
+        return 'ocr-off'
+    lang = getattr(settings, 'OCR_LANGUAGES', 'uzb+rus+eng')
+    if shutil.which('pdftoppm'):
+        renderer = f"pdftoppm{getattr(settings, 'OCR_DPI', 300)}"
+    else:
+        renderer = 'xobject'
+    return f'tesseract{tesseract_version()}:{lang}:{renderer}'
+
+
+def _page_hash(images: Sequence[bytes], lang: str) -> str:
+    digest = hashlib.sha256(f'{tesseract_version()}:{lang}'.encode('utf-8'))
+    for data in images:
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+def _cache():
+    from django.core.cache import cache
+    return cache
+
+
+def ocr_images(pages: Dict[int, List[bytes]], lang: Optional[str] = None) -> Dict[int, str]:
+    """
+    Sahifalar rasmlarini OCR qilish
+
+    Args:
+        pages: {sahifa indeksi: [rasm baytlari, ...]}
+
+    Returns:
+        {sahifa indeksi: matn}. Vaqt chegarasidan oshgan yoki xato bergan sahifa bo'sh qaytadi
+    """
+    lang = lang or getattr(settings, 'OCR_LANGUAGES', 'uzb+rus+eng')
+    timeout = getattr(settings, 'OCR_PAGE_TIMEOUT', 60)
+    cache_ttl = getattr(settings, 'OCR_CACHE_TTL', 30 * 24 * 3600)
+    results: Dict[int, str] = {}
+
+    todo: Dict[int, str] = {}
+    for index, images in pages.items():
+        if not images:
+            results[index] = ''
+            continue
+        key = f'ocr:{_page_hash(images, lang)}'
+        try:
+            cached = _cache().get(key)
+        except Exception as e:
+            logger.warning(f"OCR keshidan o'qishda xatolik: {str(e)}")
+            cached = None
+        if cached is not None:
+            results[index] = cached
+        else:
+            todo[index] = key
+
+    if not todo:
+        return results
+
+    max_workers = max(1, min(getattr(settings, 'OCR_MAX_WORKERS', 2), len(todo)))
+    # Tesseract alohida dasturda ishlaydi - oqimlar parallellik beradi va
+    # Celery prefork worker'larida ham ishlaydi (u yerda jarayon ochib bo'lmaydi)
+    logger.info(f"OCR boshlandi: {len(todo)} ta sahifa, {max_workers} ta parallel")
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocr')
+    try:
+        futures = {
+            index: executor.submit(_ocr_page_images, pages[index], lang, timeout)
+            for index in todo
+        }
+        for index, future in futures.items():
+            try:
+                # Tesseract o'zi ham timeout bilan o'ldiriladi, bu - qo'shimcha himoya
+                text = future.result(timeout=timeout * len(pages[index]) + OCR_TIMEOUT_GRACE)
+            except FutureTimeoutError:
+                logger.error(f"OCR vaqt chegarasidan oshdi: {index + 1}-sahifa")
+                results[index] = ''
+                continue
+            except Exception as e:
+                logger.error(f"OCR da xatolik ({index + 1}-sahifa): {str(e)}")
+                results[index] = ''
+                continue
+
+            results[index] = text
+            try:
+                _cache().set(todo[index], text, timeout=cache_ttl)
+            except Exception as e:
+                logger.warning(f"OCR keshiga yozishda xatolik: {str(e)}")
+    finally:
+        # Osilib qolgan ish kutilmaydi: navbatdagilar bekor qilinadi
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def render_pdf_page(path: str, index: int, dpi: Optional[int] = None, timeout: Optional[int] = None) -> bytes:
+    """Sahifani pdftoppm bilan PNG rasmga aylantirish (muddat tugasa jarayon o'ldiriladi)"""
+    dpi = dpi or getattr(settings, 'OCR_DPI', 300)
+    timeout = timeout or getattr(settings, 'OCR_PAGE_TIMEOUT', 60)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_root = os.path.join(tmp_dir, 'page')
+        subprocess.run(
+            ['pdftoppm', '-png', '-r', str(dpi), '-f', str(index + 1), '-l', str(index + 1),
+             '-singlefile', path, output_root],
+            check=True, capture_output=True, timeout=timeout,
+        )
+        with open(f'{output_root}.png', 'rb') as image_file:
+            return image_file.read()
+
+
+def _image_xobject_bytes(x_object) -> Optional[bytes]:
+    """PDF rasm obyektini Pillow ochadigan baytlarga aylantirish"""
+    from PyPDF2.filters import _xobj_to_image
+
+    try:
+        extension, data = _xobj_to_image(x_object)
+        if extension is not None and data:
+            return data
+    except Exception:
+        pass
+
+    # Filtrlar zanjiri (masalan ASCII85 + Flate) - xom piksellardan PNG yasash
+    modes = {'/DeviceRGB': 'RGB', '/DeviceGray': 'L', '/DeviceCMYK': 'CMYK'}
+    mode = modes.get(x_object.get('/ColorSpace'))
+    if mode is None or x_object.get('/BitsPerComponent') != 8:
+        return None
+    try:
+        from PIL import Image
+
+        image = Image.frombytes(mode, (x_object['/Width'], x_object['/Height']), x_object.get_data())
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return buffer.getvalue()
+    except Exception as e:
+        logger.warning(f"PDF rasmini o'qishda xatolik: {str(e)}")
+        return None
+
+
+def _collect_xobject_images(resources, depth: int = 0) -> List[bytes]:
+    """Resurslardagi rasmlarni, ichma-ich Form XObject'lar bilan birga, yig'ish"""
+    images: List[bytes] = []
+    if resources is None or depth > 3:
+        return images
+    x_objects = resources.get_object().get('/XObject')
+    if x_objects is None:
+        return images
+
+    x_objects = x_objects.get_object()
+    for name in x_objects:
+        x_object = x_objects[name].get_object()
+        subtype = x_object.get('/Subtype')
+        if subtype == '/Image':
+            data = _image_xobject_bytes(x_object)
+            if data:
+                images.append(data)
+        elif subtype == '/Form':
+            images.extend(_collect_xobject_images(x_object.get('/Resources'), depth + 1))
+    return images
+
+
+def extract_page_images(path: str, page_indexes: Sequence[int]) -> Dict[int, List[bytes]]:
+    """
+    OCR uchun sahifa rasmlari
+
+    pdftoppm bo'lsa har bir sahifa to'liq rasmga aylantiriladi, aks holda
+    (yoki rasmga aylantirish muvaffaqiyatsiz bo'lsa) sahifadagi rasm obyektlari olinadi.
+    """
+    images: Dict[int, List[bytes]] = {}
+    if shutil.which('pdftoppm'):
+        for index in page_indexes:
+            try:
+                images[index] = [render_pdf_page(path, index)]
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.warning(f"Sahifani rasmga aylantirishda xatolik ({index + 1}): {str(e)}")
+        page_indexes = [index for index in page_indexes if index not in images]
+        if not page_indexes:
+            return images
+    else:
+        logger.warning("pdftoppm topilmadi - OCR faqat sahifaga joylashtirilgan rasmlar bilan ishlaydi")
+
+    with open(path, 'rb') as file_obj:
+        mapped, reader = open_pdf_reader(file_obj)
+        try:
+            for index in page_indexes:
+                try:
+                    images[index] = _collect_xobject_images(reader.pages[index].get('/Resources'))
+                except Exception as e:
+                    logger.warning(f"Sahifa rasmlarini olishda xatolik ({index + 1}): {str(e)}")
+                    images[index] = []
+        finally:
+            if mapped is not None:
+                mapped.close()
+    return images
+
+
+def iter_pdf_text_pages(path: str) -> Iterator[Tuple[int, str]]:
+    """
+    PDF sahifalari matni tartib bilan, skanerlangan sahifalar OCR qilingan holda
+
+    Matn qatlami bo'lmagan sahifalar OCR_MAX_WORKERS * 2 tadan guruhlanib OCR
+    qilinadi; guruh to'lguncha faqat shu oraliqdagi sahifalar xotirada turadi.
+    """
+    ocr_enabled = getattr(settings, 'OCR_ENABLED', True)
+    batch_size = max(1, getattr(settings, 'OCR_MAX_WORKERS', 2)) * 2
+    buffered: List[Tuple[int, str]] = []
+    missing: List[int] = []
+
+    def flush() -> Iterator[Tuple[int, str]]:
+        ocr_texts = ocr_images(extract_page_images(path, missing)) if missing else {}
+        for index, text in buffered:
+            ocr_text = ocr_texts.get(index, '')
+            yield index, ocr_text if ocr_text.strip() else text
+        buffered.clear()
+        missing.clear()
+
+    for index, text in iter_pdf_pages(path):
+        if ocr_enabled and page_needs_ocr(text):
+            missing.append(index)
+        if not missing:
+            yield index, text
+            continue
+        # OCR kutayotgan sahifadan keyingilari tartib saqlanishi uchun ushlab turiladi
+        buffered.append((index, text))
+        if len(missing) >= batch_size:
+            yield from flush()
+    yield from flush()
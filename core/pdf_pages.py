@@ -0,0 +1,164 @@
+"""
+PDF sahifalarini oqimli ajratish
+
+Sahifalar matni bitta katta satrga yig'ilmaydi - iterator orqali tartib bilan
+qaytariladi. Fayl xotiraga to'liq o'qilmaydi (mmap), katta hujjatlarda sahifalar
+guruhlari alohida jarayonlarda parallel parse qilinadi. Jarayonlar puli butun
+jarayon uchun bitta va forkserver/spawn kontekstida ochiladi: ko'p oqimli
+(gunicorn threads) jarayondan fork qilish qulflar holatini nusxalab osilib
+qolishi mumkin.
+"""
+import logging
+import mmap
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Tuple
+
+import PyPDF2
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def open_pdf_reader(file_obj) -> Tuple[Optional[mmap.mmap], PyPDF2.PdfReader]:
+    """Faylni mmap orqali ochib PdfReader yaratish"""
+    try:
+        mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        # Bo'sh yoki mmap qo'llab-quvvatlanmaydigan fayl
+        return None, PyPDF2.PdfReader(file_obj)
+    return mapped, PyPDF2.PdfReader(mapped)
+
+
+def count_pdf_pages(path: str) -> int:
+    """PDF sahifalari soni"""
+    with open(path, 'rb') as file_obj:
+        mapped, reader = open_pdf_reader(file_obj)
+        try:
+            return len(reader.pages)
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """Jarayon ichida [start, end) oralig'idagi sahifalar matnini ajratish"""
+    texts = []
+    with open(path, 'rb') as file_obj:
+        mapped, reader = open_pdf_reader(file_obj)
+        try:
+            for index in range(start, end):
+                try:
+                    texts.append(reader.pages[index].extract_text() or '')
+                except Exception as e:
+                    logger.warning(f"PDF sahifasini o'qishda xatolik ({index + 1}): {str(e)}")
+                    texts.append('')
+        finally:
+            if mapped is not None:
+                mapped.close()
+    return texts
+
+
+def can_use_processes() -> bool:
+    """Celery prefork worker'lari (daemon jarayonlar) bola jarayon ocha olmaydi"""
+    return not multiprocessing.current_process().daemon
+
+
+def process_context():
+    """Oqimlar bilan xavfsiz multiprocessing konteksti (forkserver, bo'lmasa spawn)"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def default_workers() -> int:
+    return getattr(settings, 'PDF_EXTRACTION_WORKERS', None) or min(4, os.cpu_count() or 1)
+
+
+def shared_process_pool() -> ProcessPoolExecutor:
+    """PDF ajratish uchun jarayon bo'yi umumiy pul (birinchi chaqiruvda ochiladi)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=default_workers(), mp_context=process_context())
+        return _pool
+
+
+def reset_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Buzilgan pulni tashlab yuborish - keyingi chaqiruv yangisini ochadi"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _iter_ranges_sequential(path: str, ranges) -> Iterator[Tuple[int, str]]:
+    for start, end in ranges:
+        for offset, text in enumerate(_extract_page_range(path, start, end)):
+            yield start + offset, text
+
+
+def iter_pdf_pages(
+    path: str,
+    max_workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    PDF sahifalari matnini tartib bilan qaytarish
+
+    Yields:
+        (sahifa indeksi, sahifa matni)
+    """
+    page_count = count_pdf_pages(path)
+    if not page_count:
+        return
+
+    max_workers = max_workers or default_workers()
+    pages_per_task = max(1, pages_per_task or getattr(settings, 'PDF_PAGES_PER_TASK', 16))
+    min_pages = getattr(settings, 'PDF_PARALLEL_MIN_PAGES', 32)
+
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+    if max_workers <= 1 or page_count < min_pages or not can_use_processes():
+        yield from _iter_ranges_sequential(path, ranges)
+        return
+
+    try:
+        executor = shared_process_pool()
+    except (OSError, ValueError, NotImplementedError) as e:
+        logger.warning(f"PDF uchun jarayonlar puli ochilmadi, ketma-ket o'qiladi: {str(e)}")
+        yield from _iter_ranges_sequential(path, ranges)
+        return
+
+    # Bir vaqtda faqat cheklangan miqdordagi guruhlar navbatda turadi -
+    # xotira sahifalar soniga qarab o'smaydi
+    pending = deque()
+    remaining = deque(ranges)
+    try:
+        while pending or remaining:
+            while remaining and len(pending) < max_workers * 2:
+                pending.append((remaining[0], executor.submit(_extract_page_range, path, *remaining[0])))
+                remaining.popleft()
+            (start, _), future = pending[0]
+            texts = future.result()
+            pending.popleft()
+            for offset, text in enumerate(texts):
+                yield start + offset, text
+    except BrokenProcessPool as e:
+        # Ishchi jarayon o'ldi - pul almashtiriladi, qolgan sahifalar ketma-ket o'qiladi
+        logger.error(f"PDF jarayonlar puli buzildi, ketma-ket davom etiladi: {str(e)}")
+        reset_process_pool(executor)
+        rest = [page_range for page_range, _ in pending] + list(remaining)
+        pending.clear()
+        yield from _iter_ranges_sequential(path, rest)
+    finally:
+        # Iterator oxirigacha o'qilmasa navbatdagi guruhlar bekor qilinadi
+        for _, future in pending:
+            future.cancel()
@@ -0,0 +1,158 @@
+"""
+Token byudjetiga mos prompt yig'ish
+
+Hujjat matni belgilar soni bo'yicha emas, model tokenizatori bo'yicha
+o'lchanadi: kirill va lotin matnlari tokenlarga juda turlicha bo'linadi.
+Prompt shabloni hujjat o'rniga DOCUMENT_SLOT bilan tuziladi, so'ng hujjat
+modelning kontekst oynasidan (ko'rsatmalar, system prompt va javob uchun
+ajratilgan max_tokens ayirilgandan keyin) qolgan joyga sig'diriladi.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Shablonda hujjat matni qo'yiladigan joy
+DOCUMENT_SLOT = '\x00HUJJAT\x00'
+
+# Har bir chat xabari uchun qo'shimcha xizmat tokenlari
+MESSAGE_OVERHEAD_TOKENS = 8
+
+CYRILLIC_RE = re.compile(r'[Ѐ-ӿ]')
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: Optional[str]):
+    """Model uchun tiktoken kodlovchisi (tiktoken o'rnatilmagan bo'lsa None)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model or '')
+    except KeyError:
+        # Ollama (llama3 va b.) modellari uchun ham yaqin ko'rsatkich beradi
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def _estimate_tokens(text: str) -> int:
+    """Tokenizatorsiz taxmin: kirill harflari lotinga qaraganda ko'proq token oladi"""
+    cyrillic = len(CYRILLIC_RE.findall(text))
+    return int(cyrillic / 2 + (len(text) - cyrillic) / 3.5) + 1
+
+
+def count_tokens(text: Optional[str], model: Optional[str] = None) -> int:
+    """Matndagi tokenlar soni"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return _estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: Optional[str], max_tokens: int, model: Optional[str] = None) -> str:
+    """Matnni max_tokens ga sig'adigan qilib qisqartirish (iloji bo'lsa so'z chegarasida)"""
+    text = text or ''
+    if max_tokens <= 0:
+        return ''
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    encoding = _encoding(model)
+    if encoding is not None:
+        truncated = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]).rstrip('�')
+    else:
+        # Sig'adigan eng uzun prefiksni ikkilik qidiruv bilan topish
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if _estimate_tokens(text[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        truncated = text[:low]
+
+    boundary = truncated.rfind(' ', max(0, len(truncated) - 100))
+    return truncated[:boundary] if boundary > 0 else truncated
+
+
+def context_window(model: Optional[str]) -> int:
+    """Modelning kontekst oynasi (tokenlarda)"""
+    windows = getattr(settings, 'LLM_CONTEXT_WINDOWS', {})
+    return windows.get(model) or getattr(settings, 'LLM_DEFAULT_CONTEXT_WINDOW', 8192)
+
+
+class PromptBudget:
+    """
+    Bitta so'rov uchun token byudjeti
+
+    Failover sababli so'rov bir nechta modeldan biriga tushishi mumkin -
+    byudjet eng kichik kontekst oynali model bo'yicha hisoblanadi.
+    """
+
+    def __init__(self, models: Optional[Iterable[Optional[str]]] = None, max_tokens: int = 1000):
+        models = [model for model in (models or []) if model] or [getattr(settings, 'OPENAI_MODEL', None)]
+        self.model = min(models, key=context_window)
+        self.context_window = context_window(self.model)
+        self.max_tokens = max_tokens
+        # Tokenizatorlar orasidagi farq uchun zaxira
+        self.safety_tokens = int(self.context_window * getattr(settings, 'LLM_PROMPT_SAFETY_RATIO', 0.05))
+
+    @classmethod
+    def for_engine(cls, max_tokens: int = 1000) -> 'PromptBudget':
+        """
+        Global LLM dvigateli bo'yicha byudjet
+
+        Sozlangan barcha provayderlar hisobga olinadi (circuit breaker holati emas):
+        bir xil hujjat uchun prompt provayderlar holatiga qarab o'zgarmaydi va LLM
+        kesh kalitlari barqaror qoladi.
+        """
+        from .llm_engine import llm_engine
+
+        return cls([getattr(provider, 'model', None) for _, provider in llm_engine.providers], max_tokens)
+
+    def count(self, text: Optional[str]) -> int:
+        return count_tokens(text, self.model)
+
+    def available(self, prompt: str, system_prompt: str = '') -> int:
+        """Shablon va system prompt'dan keyin hujjat uchun qolgan tokenlar"""
+        fixed = self.count(prompt.replace(DOCUMENT_SLOT, '')) + self.count(system_prompt)
+        reserved = self.max_tokens + self.safety_tokens + 2 * MESSAGE_OVERHEAD_TOKENS
+        return max(0, self.context_window - reserved - fixed)
+
+    def fill(
+        self,
+        prompt: str,
+        document: Optional[str],
+        system_prompt: str = '',
+        limit: Optional[int] = None,
+        selector: Optional[Callable[[str, int], str]] = None,
+    ) -> str:
+        """
+        Shablondagi DOCUMENT_SLOT o'rniga byudjetga sig'adigan hujjat matnini qo'yish
+
+        Args:
+            limit: Hujjat uchun qo'shimcha yuqori chegara (tokenlarda)
+            selector: (matn, token byudjeti) -> matn. Berilsa, qisqartirish o'rniga
+                      ishlatiladi (masalan talablarga mos parchalarni tanlash)
+        """
+        document = document or ''
+        budget = self.available(prompt, system_prompt)
+        if limit:
+            budget = min(budget, limit)
+
+        document_tokens = self.count(document)
+        if document_tokens > budget:
+            fitted = selector(document, budget) if selector else document
+            # Selektor natijasi ham byudjetdan oshmasligi kafolatlanadi
+            document = truncate_to_tokens(fitted, budget, self.model)
+            logger.info(
+                f"Hujjat token byudjetiga sig'dirildi: {document_tokens} -> {budget} token "
+                f"({self.model}, oyna {self.context_window})"
+            )
+        return prompt.replace(DOCUMENT_SLOT, document)
@@ -0,0 +1,545 @@
+"""
+Prompt shablonlari reestri
+
+Katta ko'rsatmalar bloklari modul yuklanganda bir marta tayyorlanadi va har doim
+promptning BOSHIDA baytma-bayt bir xil turadi, o'zgaruvchan qism (hujjat,
+talablar, ishtirokchilar) esa oxiriga qo'shiladi. Shunda provayder tomonidagi
+prefiks keshi (OpenAI cached input, Ollama KV kesh) ishlaydi. Har bir shablon
+versiyalanadi: versiya LLM kesh kalitiga va tahlil natijasiga yoziladi.
+Ko'rsatmalar matni o'zgartirilsa, versiya oshirilishi kerak.
+"""
+from dataclasses import dataclass
+from typing import Dict, NamedTuple, Union
+
+DEFAULT_LANGUAGE = 'uz_latn'
+
+LANGUAGE_INSTRUCTIONS = {
+    'ru': 'Ответь на русском языке.',
+    'uz_cyrl': 'Жавобни ўзбек тилида (кирилл) бер.',
+    'uz_latn': "Javobni o'zbek tilida (lotin) ber.",
+}
+
+
+class RenderedPrompt(NamedTuple):
+    prompt: str
+    system_prompt: str
+    version: str
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    Versiyalangan prompt shabloni
+
+    instructions - statik prefiks, body - o'zgaruvchan qism (str.format shabloni).
+    Ikkalasi ham bitta satr yoki {til: satr} lug'ati bo'lishi mumkin.
+    """
+    name: str
+    version: int
+    instructions: Union[str, Dict[str, str]]
+    body: Union[str, Dict[str, str]]
+    system_prompts: Union[str, Dict[str, str]] = ''
+
+    @property
+    def id(self) -> str:
+        return f'{self.name}:v{self.version}'
+
+    @staticmethod
+    def _pick(value: Union[str, Dict[str, str]], language: str) -> str:
+        if isinstance(value, dict):
+            return value.get(language) or value[DEFAULT_LANGUAGE]
+        return value
+
+    def prefix(self, language: str = DEFAULT_LANGUAGE) -> str:
+        """Statik qism - o'zgaruvchan ma'lumotlarsiz"""
+        return self._pick(self.instructions, language)
+
+    def render(self, language: str = DEFAULT_LANGUAGE, **values) -> RenderedPrompt:
+        """Statik prefiks + o'zgaruvchan qism"""
+        if language not in LANGUAGE_INSTRUCTIONS:
+            language = DEFAULT_LANGUAGE
+        body = self._pick(self.body, language).format(lang_instruction=LANGUAGE_INSTRUCTIONS[language], **values)
+        return RenderedPrompt(self.prefix(language) + body, self._pick(self.system_prompts, language), self.id)
+
+
+# nom -> amaldagi shablon
+TEMPLATES: Dict[str, PromptTemplate] = {}
+
+
+def register(template: PromptTemplate) -> PromptTemplate:
+    """Shablonni reestrga qo'shish (bir nom - bitta amaldagi versiya)"""
+    if template.name in TEMPLATES:
+        raise ValueError(f"Shablon allaqachon ro'yxatdan o'tgan: {template.name}")
+    TEMPLATES[template.name] = template
+    return template
+
+
+# --- Tender tahlili ---
+
+TENDER_ANALYSIS = register(PromptTemplate(
+    name='tender_analysis',
+    version=2,
+    instructions="""\
+Sen tender tahlili bo'yicha yuqori malakali ekspertsan.
+Quyidagi tender shartnomasini HAR TARAFLAMA CHUQUR tahlil qil.
+
+VAZIFA - QUYIDAGILARNI BATAFSIL ANIQLA:
+
+1. TENDER ASOSIY MA'LUMOTLARI:
+   - Tender maqsadi va mohiyati
+   - Tender turi va kategoriyasi
+   - Byudjet va moliyaviy shartlar
+   - Muddatlar va vaqt jadvali
+   - Loyiha joylashuvi (lokatsiya)
+
+2. BARCHA TALABLARNI ANIQLASH:
+   - Texnik talablar
+   - Moliyaviy talablar
+   - Huquqiy talablar
+   - Tajriba talablari
+   - Hujjat talablari
+   - Sifat talablari
+   - Xavfsizlik talablari
+   - Kadrlar talablari
+
+3. HAR BIR TALAB UCHUN:
+   - Majburiy yoki ixtiyoriy
+   - Vazn koeffitsienti (0.1-1.0)
+   - Baholash mezoni
+   - Minimal va maksimal qiymatlar
+
+4. MAXSUS SHARTLAR:
+   - Lokatsiya talablari
+   - Mahalliy ishtirok talablari
+   - Subpudratchi shartlari
+   - Kafolat talablari
+   - Sug'urta talablari
+
+JSON FORMAT (faqat JSON qaytar, boshqa matn yo'q):
+{
+    "tender_purpose": "Tender maqsadi batafsil",
+    "tender_type": "qurilish|xizmat|tovar|aralash",
+    "tender_category": "Tender kategoriyasi",
+    "project_location": "Loyiha joylashuvi",
+    "estimated_budget": "Taxminiy byudjet",
+    "budget_range": {
+        "min": "Minimal summa",
+        "max": "Maksimal summa"
+    },
+    "timeline": {
+        "submission_deadline": "Topshirish muddati",
+        "project_start": "Loyiha boshlanishi",
+        "project_end": "Loyiha tugashi",
+        "total_duration": "Umumiy muddat"
+    },
+    "requirements": [
+        {
+            "id": "REQ001",
+            "category": "technical|financial|legal|experience|document|quality|safety|personnel",
+            "title": "Talab nomi",
+            "description": "Batafsil tavsif",
+            "is_mandatory": true|false,
+            "weight": 0.1-1.0,
+            "min_value": "Minimal qiymat (agar mavjud)",
+            "evaluation_method": "Baholash usuli"
+        }
+    ],
+    "location_requirements": {
+        "project_region": "Loyiha mintaqasi",
+        "local_presence_required": true|false,
+        "proximity_preference": "Yaqinlik afzalligi",
+        "logistics_requirements": "Logistika talablari"
+    },
+    "experience_requirements": {
+        "min_years": "Minimal yillar",
+        "similar_projects": "O'xshash loyihalar soni",
+        "min_project_value": "Minimal loyiha qiymati",
+        "sector_experience": "Soha tajribasi"
+    },
+    "financial_requirements": {
+        "min_turnover": "Minimal aylanma",
+        "bank_guarantee": "Bank kafolati",
+        "insurance_required": true|false,
+        "payment_terms": "To'lov shartlari"
+    },
+    "evaluation_criteria": [
+        {
+            "name": "Baholash mezoni",
+            "weight": 0.1-1.0,
+            "description": "Mezon tavsifi",
+            "scoring_method": "Ballar berish usuli"
+        }
+    ],
+    "special_conditions": ["Maxsus shartlar"],
+    "key_conditions": ["Asosiy shartlar"],
+    "warnings": ["Diqqat talab qiladigan jihatlar"],
+    "hidden_requirements": ["Yashirin yoki bilvosita talablar"],
+    "disqualification_criteria": ["Rad etish mezonlari"]
+}
+""",
+    body="""
+TENDER SHARTNOMASI:
+{document}
+
+{lang_instruction}
+""",
+    system_prompts={
+        'ru': 'Ты эксперт по государственным закупкам. Анализируй тендерные документы глубоко и всесторонне. Возвращай только JSON.',
+        'uz_cyrl': "Сен Ўзбекистон давлат харидлари бўйича юқори малакали экспертсан. Тендер ҳужжатларини ҳар тарафлама чуқур таҳлил қиласан. Фақат JSON форматда жавоб бер.",
+        'uz_latn': "Sen O'zbekiston davlat xaridlari bo'yicha yuqori malakali ekspertsan. Tender hujjatlarini har taraflama chuqur tahlil qilasan. Faqat JSON formatida javob ber.",
+    },
+))
+
+TENDER_SECTION = register(PromptTemplate(
+    name='tender_section',
+    version=2,
+    instructions="""\
+Bu tender hujjatining bir qismi. Faqat SHU QISMDA keltirilgan talablarni ajrat.
+Talab bo'lmasa, bo'sh ro'yxat qaytar.
+
+JSON FORMAT (faqat JSON qaytar):
+{
+    "requirements": [
+        {
+            "id": "REQ001",
+            "category": "technical|financial|legal|experience|document|quality|safety|personnel",
+            "title": "Talab nomi",
+            "description": "Batafsil tavsif",
+            "is_mandatory": true|false,
+            "weight": 0.1-1.0,
+            "min_value": "Minimal qiymat (agar mavjud)",
+            "evaluation_method": "Baholash usuli"
+        }
+    ],
+    "warnings": ["Diqqat talab qiladigan jihatlar"],
+    "disqualification_criteria": ["Rad etish mezonlari"]
+}
+""",
+    body="""
+TENDER QISMI ({part}/{total}):
+{document}
+
+{lang_instruction}
+""",
+    system_prompts="Sen O'zbekiston davlat xaridlari bo'yicha ekspertsan. Tender hujjatidan talablarni aniq ajratasan. Faqat JSON formatida javob ber.",
+))
+
+TENDER_RETRY = register(PromptTemplate(
+    name='tender_retry',
+    version=2,
+    instructions="""\
+Quyidagi tender hujjatini tahlil qil. FAQAT ODDIY JSON qaytar.
+
+JSON:
+{
+    "tender_purpose": "maqsad",
+    "tender_type": "qurilish|xizmat|tovar",
+    "estimated_budget": "summa",
+    "deadline": "muddat",
+    "requirements": [
+        {"id": "REQ001", "category": "experience", "title": "talab", "description": "tavsif", "is_mandatory": true, "weight": 0.5}
+    ]
+}
+""",
+    body="""
+TENDER HUJJATI:
+{document}
+""",
+))
+
+# --- Ishtirokchi tahlili ---
+
+PARTICIPANT_ANALYSIS = register(PromptTemplate(
+    name='participant_analysis',
+    version=2,
+    instructions="""\
+Sen tender ishtirokchilarini HAR TARAFLAMA baholash bo'yicha ekspertsan.
+DIQQAT: Barcha jihatlarni CHUQUR tahlil qil, hech narsa e'tibordan chetda qolmasin!
+
+VAZIFA - QUYIDAGILARNI BATAFSIL TAHLIL QIL:
+
+1. TAJRIBA TAHLILI:
+   - Sohadagi umumiy tajriba (yillar)
+   - O'xshash loyihalar soni va hajmi
+   - Muvaffaqiyatli yakunlangan loyihalar
+   - Referenslar va tavsiyalar
+   - Xodimlar malakasi va tajribasi
+
+2. LOKATSIYA TAHLILI:
+   - Kompaniya joylashuvi
+   - Tender joyi bilan masofa
+   - Mintaqaviy tajriba
+   - Logistika imkoniyatlari
+   - Mahalliy bozor bilimi
+
+3. XIZMAT TAKLIFLARI TAHLILI:
+   - Taklif etilgan xizmatlar to'liq ro'yxati
+   - Qo'shimcha xizmatlar va bonuslar
+   - Kafolat shartlari
+   - Texnik yordam va support
+   - Vaqt jadvali va muddatlar
+   - Innovatsion yondashuvlar
+
+4. MOLIYAVIY TAHLIL:
+   - Taklif narxi batafsil
+   - Narx tarkibi va shaffoflik
+   - To'lov shartlari
+   - Moliyaviy barqarorlik
+   - Bozor narxi bilan solishtirish
+   - Yashirin xarajatlar tahlili
+
+5. TEXNIK IMKONIYATLAR:
+   - Uskunalar va texnika
+   - Sertifikatlar va litsenziyalar
+   - Sifat nazorati tizimlari
+   - Xavfsizlik standartlari
+   - Ekologik muvofiqlik
+
+6. RISKLAR TAHLILI:
+   - Moliyaviy risklar
+   - Operatsion risklar
+   - Muddatlarni buzish xavfi
+   - Sifat risklari
+   - Huquqiy risklar
+
+JSON FORMAT (faqat JSON qaytar):
+{
+    "participant_name": "Ishtirokchi nomi",
+    "overall_match_percentage": 0-100 orasida foiz,
+    "scores": [
+        {
+            "requirement_id": "REQ001",
+            "score": 0-100,
+            "matches": true|false,
+            "reason": "Baholash sababi",
+            "details": "Batafsil tushuntirish"
+        }
+    ],
+    "experience_analysis": {
+        "years_in_business": "Yillar soni",
+        "similar_projects_count": "O'xshash loyihalar soni",
+        "successful_projects": "Muvaffaqiyatli loyihalar",
+        "team_qualification": "Jamoa malakasi",
+        "references_quality": "Referenslar sifati (past/o'rta/yuqori)",
+        "experience_score": 0-100
+    },
+    "location_analysis": {
+        "company_location": "Kompaniya joylashuvi",
+        "distance_to_project": "Loyiha joyigacha masofa",
+        "regional_experience": "Mintaqaviy tajriba",
+        "logistics_capability": "Logistika imkoniyati",
+        "local_market_knowledge": "Mahalliy bozor bilimi",
+        "location_score": 0-100
+    },
+    "service_offer_analysis": {
+        "main_services": ["Asosiy xizmatlar"],
+        "additional_services": ["Qo'shimcha xizmatlar"],
+        "warranty_terms": "Kafolat shartlari",
+        "support_quality": "Texnik yordam sifati",
+        "timeline_feasibility": "Muddat realligi",
+        "innovation_level": "Innovatsiya darajasi",
+        "service_score": 0-100
+    },
+    "financial_analysis": {
+        "proposed_price": "Taklif etilgan narx",
+        "price_breakdown": "Narx tarkibi",
+        "payment_terms": "To'lov shartlari",
+        "financial_stability": "Moliyaviy barqarorlik",
+        "market_comparison": "Bozor bilan solishtirish",
+        "hidden_costs_risk": "Yashirin xarajatlar xavfi",
+        "price_adequacy": "past|mos|yuqori",
+        "price_score": 0-100
+    },
+    "technical_capabilities": {
+        "equipment_quality": "Uskunalar sifati",
+        "certifications": ["Sertifikatlar ro'yxati"],
+        "quality_systems": ["Sifat tizimlari"],
+        "safety_standards": "Xavfsizlik standartlari",
+        "environmental_compliance": "Ekologik muvofiqlik",
+        "technical_score": 0-100
+    },
+    "risk_assessment": {
+        "financial_risk": "past|o'rta|yuqori",
+        "operational_risk": "past|o'rta|yuqori",
+        "timeline_risk": "past|o'rta|yuqori",
+        "quality_risk": "past|o'rta|yuqori",
+        "legal_risk": "past|o'rta|yuqori",
+        "overall_risk": "low|medium|high",
+        "risk_mitigation": ["Risk kamaytirish choralari"]
+    },
+    "strengths": ["Har bir ustunlik batafsil"],
+    "weaknesses": ["Har bir kamchilik batafsil"],
+    "minor_advantages": ["Kichik ustunliklar"],
+    "minor_disadvantages": ["Kichik kamchiliklar"],
+    "recommendation": "Batafsil tavsiya",
+    "final_verdict": "Tender uchun tavsiya etiladi/Shartli tavsiya/Tavsiya etilmaydi",
+    "improvement_suggestions": ["Yaxshilash uchun tavsiyalar"],
+    "disqualification_reasons": ["Agar bo'lsa, rad etish sabablari"]
+}
+""",
+    body="""
+TENDER TALABLARI:
+{requirements}
+
+TENDER MAQSADI:
+{tender_purpose}
+
+ISHTIROKCHI: {participant_name}
+ISHTIROKCHI HUJJATLARI (talablarga tegishli qismlar):
+{document}
+
+{lang_instruction}
+""",
+    system_prompts={
+        'ru': 'Ты эксперт по государственным закупкам. Оценивай участников справедливо и детально. Возвращай только JSON.',
+        'uz_cyrl': "Сен Ўзбекистон давлат харидлари бўйича экспертсан. Иштирокчиларни адолатли баҳолайсан. Фақат JSON форматда жавоб бер.",
+        'uz_latn': "Sen O'zbekiston davlat xaridlari bo'yicha ekspertsan. Ishtirokchilarni adolatli baholaysan. Faqat JSON formatida javob ber.",
+    },
+))
+
+PARTICIPANT_RETRY = register(PromptTemplate(
+    name='participant_retry',
+    version=2,
+    instructions="""\
+ODDIY JSON qaytar:
+{
+    "participant_name": "Ishtirokchi nomi",
+    "overall_match_percentage": 0-100,
+    "experience_score": 0-100,
+    "location_score": 0-100,
+    "service_score": 0-100,
+    "price_score": 0-100,
+    "technical_score": 0-100,
+    "risk_level": "low|medium|high",
+    "strengths": ["ustunlik1"],
+    "weaknesses": ["kamchilik1"],
+    "recommendation": "tavsiya",
+    "final_verdict": "tavsiya etiladi|shartli|tavsiya etilmaydi"
+}
+""",
+    body="""
+Ishtirokchi: {participant_name}
+Ma'lumotlar: {document}
+""",
+))
+
+# --- Ishtirokchilarni solishtirish ---
+
+COMPARE_SUMMARY = register(PromptTemplate(
+    name='compare_summary',
+    version=2,
+    instructions={
+        'ru': """\
+Ты эксперт и арбитр по тендерам. Сравни следующих участников ВСЕСТОРОННЕ и напиши ПОДРОБНОЕ заключение.
+
+НАПИШИ ПОДРОБНОЕ ЗАКЛЮЧЕНИЕ:
+
+1. ОСНОВАНИЯ ОБЩЕГО РЕЙТИНГА:
+   - Почему именно такой порядок
+   - Основные различия каждого участника
+
+2. АНАЛИЗ ПОБЕДИТЕЛЯ:
+   - Почему на первом месте
+   - Его основные преимущества
+   - Потенциальные риски
+
+3. ДРУГИЕ УЧАСТНИКИ:
+   - Сильные стороны каждого
+   - Слабые стороны каждого
+   - Возможности для улучшения
+
+4. СРАВНЕНИЕ:
+   - По опыту
+   - По цене
+   - По качеству
+   - По местоположению
+
+5. ИТОГОВАЯ РЕКОМЕНДАЦИЯ:
+   - Кого следует выбрать
+   - На каких условиях
+   - С какими предупреждениями
+
+6. АЛЬТЕРНАТИВНЫЙ ВАРИАНТ:
+   - Если победитель откажется, кто следующий
+   - Почему
+""",
+        'uz_cyrl': """\
+Сен тендер эксперти ва ҳаккамсан. Қуйидаги иштирокчиларни ҲАР ТАРАФЛАМА солиштир ва БАТАФСИЛ хулоса ёз.
+
+БАТАФСИЛ ХУЛОСА ЁЗ:
+
+1. УМУМИЙ РЕЙТИНГ АСОСЛАРИ:
+   - Нима учун айнан шу тартибда жойлаштирилди
+   - Ҳар бир иштирокчининг асосий фарқлари
+
+2. ҒОЛИБ ТАҲЛИЛИ:
+   - Нима учун биринчи ўринда
+   - Унинг асосий устунликлари
+   - Потенциал рисклари
+
+3. БОШҚА ИШТИРОКЧИЛАР:
+   - Ҳар бирининг кучли томонлари
+   - Ҳар бирининг заиф томонлари
+   - Яхшилаш имкониятлари
+
+4. ТАҚҚОСЛАШ:
+   - Таҗриба бўйича солиштириш
+   - Нарҳ бўйича солиштириш
+   - Сифат бўйича солиштириш
+   - Локация бўйича солиштириш
+
+5. ЯКУНИЙ ТАВСИЯ:
+   - Ким танланиши керак
+   - Қандай шартлар билан
+   - Қандай огоҳлантиришлар билан
+
+6. АЛТЕРНАТИВ ВАРИАНТ:
+   - Агар ғолиб рад этса, ким кейинги
+   - Нима учун
+""",
+        'uz_latn': """\
+Sen tender eksperti va hakamsan. Quyidagi ishtirokchilarni HAR TARAFLAMA solishtir va BATAFSIL xulosa yoz.
+
+BATAFSIL XULOSA YOZ:
+
+1. UMUMIY REYTING ASOSLARI:
+   - Nima uchun aynan shu tartibda joylashtirildi
+   - Har bir ishtirokchining asosiy farqlari
+
+2. G'OLIB TAHLILI:
+   - Nima uchun birinchi o'rinda
+   - Uning asosiy ustunliklari
+   - Potentsial risklari
+
+3. BOSHQA ISHTIROKCHILAR:
+   - Har birining kuchli tomonlari
+   - Har birining zaif tomonlari
+   - Yaxshilash imkoniyatlari
+
+4. TAQQOSLASH:
+   - Tajriba bo'yicha solishtirish
+   - Narx bo'yicha solishtirish
+   - Sifat bo'yicha solishtirish
+   - Lokatsiya bo'yicha solishtirish
+
+5. YAKUNIY TAVSIYA:
+   - Kim tanlanishi kerak
+   - Qanday shartlar bilan
+   - Qanday ogohlantirishlar bilan
+
+6. ALTERNATIV VARIANT:
+   - Agar g'olib rad etsa, kim keyingi
+   - Nima uchun
+""",
+    },
+    body={
+        'ru': "\nАНАЛИЗ УЧАСТНИКОВ:\n{participants}\n",
+        'uz_cyrl': "\nИШТИРОКЧИЛАР ТАҲЛИЛИ:\n{participants}\n",
+        'uz_latn': "\nISHTIROKCHILAR TAHLILI:\n{participants}\n",
+    },
+    system_prompts={
+        'ru': "Ты высококвалифицированный эксперт и арбитр по государственным закупкам. Пиши всестороннее, справедливое и подробное заключение на русском языке.",
+        'uz_cyrl': "Сен Ўзбекистон давлат харидлари бўйича юқори малакали эксперт ва ҳакамсан. Ҳар тарафлама, адолатли ва батафсил хулоса ёз (ўзбек кирилл).",
+        'uz_latn': "Sen O'zbekiston davlat xaridlari bo'yicha yuqori malakali ekspert va hakamsan. Har taraflama, adolatli va batafsil xulosa yoz.",
+    },
+))
@@ -0,0 +1,163 @@
+"""
+Hujjatdan tegishli parchalarni tanlash (retrieval)
+
+Uzun hujjat belgilangan uzunlikda kesib tashlanmaydi: matn parchalarga
+bo'linadi, BM25 indeksi quriladi va har bir so'rov (masalan tender talabi)
+uchun eng mos parchalar tanlanadi. Natijada prompt qisqaroq, lekin
+hujjatning barcha tegishli qismlarini qamrab oladi.
+"""
+import math
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Qo'shimchalarni (tajribasi/tajribaga, опыта/опыт) tashlab yuborish uchun
+# so'z boshidan olinadigan belgilar soni
+STEM_LENGTH = 6
+
+# Tanlangan parchalar orasidagi ajratgich
+GAP_MARKER = '\n[...]\n'
+
+
+def tokenize(text: str) -> List[str]:
+    """Matnni kichik harfli, qisqartirilgan o'zaklarga ajratish"""
+    return [
+        token[:STEM_LENGTH]
+        for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) > 1 and not token.isdigit()
+    ]
+
+
+def split_passages(text: str, passage_chars: int = 800, overlap: int = 150) -> List[str]:
+    """Matnni xatboshilar bo'yicha taxminan teng parchalarga bo'lish"""
+    passages: List[str] = []
+    current = ''
+
+    for paragraph in re.split(r'\n\s*\n|\n', text or ''):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        # Juda uzun xatboshi ustma-ust tushadigan oynalarga bo'linadi
+        if len(paragraph) > passage_chars:
+            if current:
+                passages.append(current)
+                current = ''
+            step = max(1, passage_chars - overlap)
+            for start in range(0, len(paragraph), step):
+                passages.append(paragraph[start:start + passage_chars])
+                if start + passage_chars >= len(paragraph):
+                    break
+            continue
+
+        if current and len(current) + len(paragraph) + 1 > passage_chars:
+            passages.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n{paragraph}" if current else paragraph
+
+    if current:
+        passages.append(current)
+    return passages
+
+
+class PassageIndex:
+    """Parchalar ustidagi BM25 indeksi"""
+
+    def __init__(self, passages: List[str], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(passage)) for passage in passages]
+        self._lengths = [sum(freqs.values()) for freqs in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+        self._postings: Dict[str, List[int]] = {}
+        for index, freqs in enumerate(self._term_freqs):
+            for term in freqs:
+                self._postings.setdefault(term, []).append(index)
+
+        count = len(passages)
+        self._idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self._postings.items()
+        }
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[int, float]]:
+        """So'rovga eng mos parchalar: [(parcha indeksi, ball), ...]"""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for index in self._postings[term]:
+                freq = self._term_freqs[index][term]
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / (self._avg_length or 1))
+                scores[index] = scores.get(index, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+
+
+def select_relevant_passages(
+    text: str,
+    queries: List[str],
+    max_chars: int = 6000,
+    top_k: int = 3,
+    passage_chars: int = 800,
+    keep_intro: bool = True,
+    measure: Callable[[str], int] = len,
+) -> str:
+    """
+    Hujjatdan so'rovlarga eng mos parchalarni tanlab, hujjat tartibida qaytarish
+
+    Args:
+        text: To'liq hujjat matni
+        queries: So'rovlar (masalan har bir tender talabi matni)
+        max_chars: Natija uchun byudjet (measure birliklarida, standart - belgilar)
+        top_k: Har bir so'rov uchun olinadigan parchalar soni
+        keep_intro: Birinchi parcha (odatda kompaniya rekvizitlari) doim qo'shiladi
+        measure: Matn hajmini o'lchash funksiyasi (masalan tokenlar soni)
+
+    Returns:
+        Qisqartirilgan kontekst. Hujjat byudjetga sig'sa - o'zgarishsiz matn
+    """
+    if measure(text or '') <= max_chars:
+        return text or ''
+
+    passages = split_passages(text, passage_chars=passage_chars)
+    index = PassageIndex(passages)
+
+    # Har bir so'rovning 1-o'rindagi parchalari, keyin 2-o'rindagilari va h.k. -
+    # byudjet barcha talablar orasida teng taqsimlanadi
+    ranked = [index.search(query, top_k) for query in queries if query]
+    order: List[int] = [0] if keep_intro and passages else []
+    for rank in range(top_k):
+        for hits in ranked:
+            if rank < len(hits):
+                order.append(hits[rank][0])
+    # Bo'sh qolgan byudjet hujjat boshidagi parchalar bilan to'ldiriladi
+    order.extend(range(len(passages)))
+
+    selected: List[int] = []
+    used = 0
+    seen = set()
+    for passage_index in order:
+        if passage_index in seen:
+            continue
+        seen.add(passage_index)
+        cost = measure(passages[passage_index]) + measure(GAP_MARKER)
+        if used + cost > max_chars:
+            continue
+        selected.append(passage_index)
+        used += cost
+
+    parts: List[str] = []
+    previous: Optional[int] = None
+    for passage_index in sorted(selected):
+        if previous is not None:
+            parts.append(GAP_MARKER if passage_index != previous + 1 else '\n')
+        parts.append(passages[passage_index])
+        previous = passage_index
+    return ''.join(parts)
@@ -1,20 +1,33 @@
+import io
 import os
 import logging
-import magic
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from pathlib import Path
 import PyPDF2
-import pandas as pd
-from unstructured.partition.auto import partition
-from unstructured.documents.elements import Element
-import openpyxl
-from PIL import Image
-import pytesseract
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
+import time
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from .ocr import iter_pdf_text_pages, ocr_images, ocr_version
 
 logger = logging.getLogger(__name__)
 
+# Matn ajratish mantiqi o'zgarganda oshiriladi - saqlangan matnlar qayta ajratiladi
+EXTRACTOR_VERSION = 2
+
+# Vektorlashtiriladigan matn bo'lagi hajmi (belgilarda)
+CONTENT_CHUNK_CHARS = 1000
+
+
+def extraction_version(file_type: str) -> str:
+    """Ajratilgan matn keshi uchun versiya: PDF uchun OCR sozlamalari ham qo'shiladi"""
+    version = f'v{EXTRACTOR_VERSION}'
+    if file_type == '.pdf':
+        version = f'{version}+{ocr_version()}'
+    return version
+
 
 class DocumentProcessor:
     """Smart Ingest Moduli - Hujjatlarni qayta ishlash xizmati"""
@@ -22,10 +35,22 @@ class DocumentProcessor:
     def __init__(self):
         self.supported_formats = ['pdf', 'xlsx', 'xls', 'docx', 'txt', 'jpg', 'jpeg', 'png', 'tiff']
     
-    def process_document(self, file_path: str, document_type: str = 'auto') -> Dict[str, Any]:
+    def process_document(
+        self,
+        file_path: str,
+        document_type: str = 'auto',
+        on_chunks: Optional[Callable[[List[str]], None]] = None,
+    ) -> Dict[str, Any]:
         """
         Hujjatni qayta ishlash
+        
+        Matn sahifama-sahifa o'qiladi: strukturalash va bo'laklarga ajratish
+        sahifalar kelishi bilan bajariladi. on_chunks berilsa, tayyor bo'laklar
+        paket-paket (EMBEDDING_BATCH_SIZE * EMBEDDING_MAX_WORKERS tadan) unga
+        uzatiladi va vector_data['content_chunks'] da yig'ilmaydi. on_chunks
+        xatoliklari chaqiruvchiga uzatiladi.
         """
+        sink_error = None
         try:
             file_path = Path(file_path)
             
@@ -42,14 +67,61 @@ class DocumentProcessor:
             # Metadata olish
             metadata = self._extract_metadata(file_path, file_type)
             
-            # Matnni ajratish
-            text_content = self._extract_text(file_path, file_type)
+            structured_data = {
+                'document_type': document_type,
+                'sections': [],
+                'tables': [],
+                'key_information': {},
+                'entities': [],
+            }
+            text_buffer = io.StringIO()
+            
+            def _pages() -> Iterator[str]:
+                # Matn bitta buferga yoziladi, kalit ma'lumotlar sahifa bo'yicha yig'iladi
+                for page in self._iter_text_pages(file_path, file_type):
+                    text_buffer.write(page)
+                    for key, values in self._extract_key_information(page).items():
+                        structured_data['key_information'].setdefault(key, []).extend(values)
+                    yield page
             
-            # Strukturalash
-            structured_data = self._structure_content(text_content, document_type)
+            def _sections() -> Iterator[Dict[str, Any]]:
+                for section in self.iter_sections(_pages()):
+                    structured_data['sections'].append(section)
+                    yield section
+            
+            def _emit(chunks: List[str]) -> None:
+                nonlocal sink_error
+                try:
+                    on_chunks(chunks)
+                except Exception as e:
+                    sink_error = e
+                    raise
+            
+            # Strukturalash va bo'laklarga ajratish (sahifalar oqimi bo'yicha)
+            content_chunks: List[str] = []
+            batch: List[str] = []
+            batch_size = max(1, getattr(settings, 'EMBEDDING_BATCH_SIZE', 256) * getattr(settings, 'EMBEDDING_MAX_WORKERS', 4))
+            chunk_count = 0
+            for chunk in self.iter_content_chunks(_sections()):
+                chunk_count += 1
+                if on_chunks is None:
+                    content_chunks.append(chunk)
+                    continue
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    _emit(batch)
+                    batch = []
+            if batch:
+                _emit(batch)
+            
+            text_content = text_buffer.getvalue()
             
             # Vektorlashtirish uchun ma'lumotlar
-            vector_data = self._prepare_vector_data(structured_data, metadata)
+            vector_data = {
+                'content_chunks': content_chunks,
+                'content_chunk_count': chunk_count,
+                'metadata_chunks': [self._metadata_chunk(metadata)],
+            }
             
             result = {
                 'file_path': str(file_path),
@@ -66,6 +138,8 @@ class DocumentProcessor:
             return result
             
         except Exception as e:
+            if sink_error is not None:
+                raise
             logger.error(f"Hujjatni qayta ishlashda xatolik: {str(e)}")
             return {
                 'file_path': str(file_path),
@@ -74,8 +148,21 @@ class DocumentProcessor:
                 'processed_at': datetime.now().isoformat(),
             }
     
+    def _iter_text_pages(self, file_path: Path, file_type: str) -> Iterator[str]:
+        """Hujjat matni bo'laklari: PDF sahifama-sahifa, boshqa turlar bir bo'lakda"""
+        if file_type != 'pdf':
+            yield self._extract_text(file_path, file_type)
+            return
+        try:
+            for text in self.iter_pdf_pages(file_path):
+                yield text + '\n'
+        except Exception as e:
+            logger.error(f"PDF matn ajratishda xatolik: {str(e)}")
+    
     def _detect_file_type(self, file_path: Path) -> str:
         """Fayl turini aniqlash"""
+        import magic
+        
         mime_type = magic.from_file(str(file_path), mime=True)
         
         if mime_type == 'application/pdf':
@@ -145,6 +232,7 @@ class DocumentProcessor:
         """Excel metadata ajratish"""
         metadata = {}
         try:
+            import openpyxl
             workbook = openpyxl.load_workbook(file_path, read_only=True)
             
             metadata.update({
@@ -216,6 +304,7 @@ class DocumentProcessor:
                 return self._extract_image_text(file_path)
             else:
                 # Unstructured.io dan foydalanish
+                from unstructured.partition.auto import partition
                 elements = partition(filename=str(file_path))
                 return '\n'.join([str(element) for element in elements])
         
@@ -225,27 +314,43 @@ class DocumentProcessor:
     
     def _extract_pdf_text(self, file_path: Path) -> str:
         """PDF dan matn ajratish"""
-        text = ""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+            return self.read_pdf_text(file_path)[0]
         except Exception as e:
             logger.error(f"PDF matn ajratishda xatolik: {str(e)}")
+            return ""
+    
+    def iter_pdf_pages(self, file_path: Path) -> Iterator[str]:
+        """PDF sahifalari matnini birma-bir qaytarish (skanerlangan sahifalar OCR qilinadi)"""
+        for _, text in iter_pdf_text_pages(str(file_path)):
+            yield text
+    
+    def read_pdf_text(self, file_path: Path) -> Tuple[str, int]:
+        """
+        PDF matni va sahifalar soni
         
-        return text
+        Sahifalar ro'yxatga yig'ilmaydi - oqim bitta buferga yoziladi.
+        """
+        buffer = io.StringIO()
+        page_count = 0
+        for text in self.iter_pdf_pages(file_path):
+            buffer.write(text)
+            buffer.write('\n')
+            page_count += 1
+        return buffer.getvalue(), page_count
     
     def _extract_excel_text(self, file_path: Path) -> str:
         """Excel dan matn ajratish"""
         text = ""
         try:
             # Unstructured.io dan foydalanish
+            from unstructured.partition.auto import partition
             elements = partition(filename=str(file_path))
             text = '\n'.join([str(element) for element in elements])
             
             # Agar unstructured ishlamasa
             if not text.strip():
+                import pandas as pd
                 df = pd.read_excel(file_path, sheet_name=None)
                 for sheet_name, sheet_df in df.items():
                     text += f"\n\n=== {sheet_name} ===\n"
@@ -295,8 +400,8 @@ class DocumentProcessor:
         """Rasmdan matn ajratish (OCR)"""
         text = ""
         try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image, lang='uzb+rus+eng')
+            with open(file_path, 'rb') as file:
+                text = ocr_images({0: [file.read()]})[0]
         except Exception as e:
             logger.error(f"OCR da xatolik: {str(e)}")
         
@@ -313,40 +418,9 @@ class DocumentProcessor:
         }
         
         try:
-            # Unstructured.io elementlari
             if text_content:
                 # Bo'limlarga ajratish
-                lines = text_content.split('\n')
-                current_section = None
-                
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # Sarlavhalarni aniqlash
-                    if self._is_heading(line):
-                        if current_section:
-                            structured['sections'].append(current_section)
-                        current_section = {
-                            'title': line,
-                            'content': [],
-                            'level': self._get_heading_level(line),
-                        }
-                    elif current_section:
-                        current_section['content'].append(line)
-                    else:
-                        if not structured['sections']:
-                            structured['sections'].append({
-                                'title': 'Kirish',
-                                'content': [line],
-                                'level': 1,
-                            })
-                        else:
-                            structured['sections'][0]['content'].append(line)
-                
-                if current_section:
-                    structured['sections'].append(current_section)
+                structured['sections'] = list(self.iter_sections([text_content]))
                 
                 # Kalit so'zlarni ajratish
                 structured['key_information'] = self._extract_key_information(text_content)
@@ -356,6 +430,63 @@ class DocumentProcessor:
         
         return structured
     
+    def iter_sections(self, pages: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Matnni bo'limlarga ajratish (sahifalar oqimi bo'yicha)
+        
+        Bo'lim keyingi sarlavha kelganda tayyor bo'ladi va darhol qaytariladi -
+        faqat joriy sahifa satrlari xotirada turadi. Birinchi sarlavhagacha
+        bo'lgan satrlar 'Kirish' bo'limiga yig'iladi.
+        """
+        intro = None
+        current_section = None
+        for page in pages:
+            for line in page.split('\n'):
+                line = line.strip()
+                if not line:
+                    continue
+                
+                # Sarlavhalarni aniqlash
+                if self._is_heading(line):
+                    if intro is not None:
+                        yield intro
+                        intro = None
+                    if current_section:
+                        yield current_section
+                    current_section = {
+                        'title': line,
+                        'content': [],
+                        'level': self._get_heading_level(line),
+                    }
+                elif current_section:
+                    current_section['content'].append(line)
+                elif intro is None:
+                    intro = {
+                        'title': 'Kirish',
+                        'content': [line],
+                        'level': 1,
+                    }
+                else:
+                    intro['content'].append(line)
+        
+        if intro is not None:
+            yield intro
+        if current_section:
+            yield current_section
+    
+    def iter_content_chunks(self, sections: Iterable[Dict[str, Any]], chunk_size: int = CONTENT_CHUNK_CHARS) -> Iterator[str]:
+        """Bo'limlar matnini chunk_size belgili bo'laklarga ajratish (bo'limlar kelishi bilan)"""
+        buffer = ''
+        for section in sections:
+            buffer += f"{section['title']}\n{' '.join(section['content'])}\n\n"
+            start = 0
+            while len(buffer) - start >= chunk_size:
+                yield buffer[start:start + chunk_size]
+                start += chunk_size
+            buffer = buffer[start:]
+        if buffer:
+            yield buffer
+    
     def _is_heading(self, line: str) -> bool:
         """Sarlavha ekanligini tekshirish"""
         # Oddiy qoidalar
@@ -408,42 +539,19 @@ class DocumentProcessor:
         
         return info
     
-    def _prepare_vector_data(self, structured_data: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Vektorlashtirish uchun ma'lumotlarni tayyorlash"""
-        vector_data = {
-            'content_chunks': [],
-            'metadata_chunks': [],
-        }
+    def _metadata_chunk(self, metadata: Dict[str, Any]) -> str:
+        """Metadata matni (alohida vektor bo'lagi)"""
+        metadata_text = f"File: {metadata.get('file_name', '')}\n"
+        metadata_text += f"Type: {metadata.get('file_type', '')}\n"
+        metadata_text += f"Size: {metadata.get('file_size', 0)} bytes\n"
+        metadata_text += f"Created: {metadata.get('creation_date', '')}\n"
         
-        try:
-            # Matn bo'laklariga ajratish
-            all_text = ""
-            for section in structured_data.get('sections', []):
-                section_text = f"{section['title']}\n{' '.join(section['content'])}"
-                all_text += section_text + "\n\n"
-            
-            # Bo'laklarga ajratish (chunking)
-            chunk_size = 1000  # har bir bo'lak 1000 ta belgi
-            chunks = [all_text[i:i+chunk_size] for i in range(0, len(all_text), chunk_size)]
-            vector_data['content_chunks'] = chunks
-            
-            # Metadatani qo'shish
-            metadata_text = f"File: {metadata.get('file_name', '')}\n"
-            metadata_text += f"Type: {metadata.get('file_type', '')}\n"
-            metadata_text += f"Size: {metadata.get('file_size', 0)} bytes\n"
-            metadata_text += f"Created: {metadata.get('creation_date', '')}\n"
-            
-            if metadata.get('author'):
-                metadata_text += f"Author: {metadata['author']}\n"
-            if metadata.get('creator'):
-                metadata_text += f"Creator: {metadata['creator']}\n"
-            
-            vector_data['metadata_chunks'] = [metadata_text]
-            
-        except Exception as e:
-            logger.error(f"Vektor ma'lumotlarini tayyorlashda xatolik: {str(e)}")
+        if metadata.get('author'):
+            metadata_text += f"Author: {metadata['author']}\n"
+        if metadata.get('creator'):
+            metadata_text += f"Creator: {metadata['creator']}\n"
         
-        return vector_data
+        return metadata_text
 
 
 class VectorEmbeddingService:
@@ -451,23 +559,25 @@ class VectorEmbeddingService:
     
     def __init__(self):
         self.embedding_model = None
+        self.model_name = None
         self._initialize_model()
     
     def _initialize_model(self):
         """Embedding modelini ishga tushirish"""
         try:
             # OpenAI embedding modeli
-            from openai import OpenAI
-            import os
+            from .http_clients import get_openai_client
             
             if os.getenv('OPENAI_API_KEY'):
-                self.client = OpenAI()
+                self.client = get_openai_client(os.getenv('OPENAI_API_KEY'))
                 self.model_type = 'openai'
+                self.model_name = 'text-embedding-3-small'
             else:
                 # Local model (Sentence Transformers)
                 from sentence_transformers import SentenceTransformer
                 self.model = SentenceTransformer('all-MiniLM-L6-v2')
                 self.model_type = 'local'
+                self.model_name = 'all-MiniLM-L6-v2'
         
         except Exception as e:
             logger.error(f"Embedding modelini ishga tushirishda xatolik: {str(e)}")
@@ -489,21 +599,81 @@ class VectorEmbeddingService:
             raise
     
     def _create_openai_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """OpenAI embeddinglari"""
-        embeddings = []
-        for text in texts:
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
-            )
-            embeddings.append(response.data[0].embedding)
-        return embeddings
-    
+        """OpenAI embeddinglari - paketlab (batch) va parallel yuboriladi"""
+        if not texts:
+            return []
+
+        batches = self._make_batches(texts)
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        max_workers = max(1, min(getattr(settings, 'EMBEDDING_MAX_WORKERS', 4), len(batches)))
+        attempts = max(1, getattr(settings, 'EMBEDDING_BATCH_RETRIES', 3))
+
+        pending = batches
+        for attempt in range(attempts):
+            if attempt:
+                # Faqat muvaffaqiyatsiz paketlar qayta yuboriladi
+                time.sleep(min(2 ** attempt, 10))
+                logger.warning(f"Embedding paketlari qayta yuborilmoqda: {len(pending)} ta (urinish {attempt + 1})")
+
+            failed = []
+            errors = []
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+                futures = [(batch, executor.submit(self._embed_openai_batch, [texts[i] for i in batch]))
+                           for batch in pending]
+                for batch, future in futures:
+                    try:
+                        vectors = future.result()
+                        for index, vector in zip(batch, vectors):
+                            embeddings[index] = vector
+                    except Exception as e:
+                        failed.append(batch)
+                        errors.append(str(e))
+
+            if not failed:
+                return embeddings
+            pending = failed
+
+        raise RuntimeError(f"Embedding paketlari yaratilmadi ({len(pending)} ta): {errors[-1]}")
+
+    def _embed_openai_batch(self, batch_texts: List[str]) -> List[List[float]]:
+        """Bitta paket uchun OpenAI embeddings so'rovi"""
+        response = self.client.embeddings.create(
+            model=self.model_name or "text-embedding-3-small",
+            # Bo'sh satrlar API tomonidan rad etiladi
+            input=[text if text.strip() else ' ' for text in batch_texts]
+        )
+        # Javob elementlari index bo'yicha tartiblanadi
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def _make_batches(self, texts: List[str]) -> List[List[int]]:
+        """Matn indekslarini element soni va token limitiga mos paketlarga ajratish"""
+        max_items = getattr(settings, 'EMBEDDING_BATCH_SIZE', 256)
+        max_tokens = getattr(settings, 'EMBEDDING_BATCH_MAX_TOKENS', 250000)
+
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for index, text in enumerate(texts):
+            tokens = self._estimate_tokens(text)
+            if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Tokenlar sonini taxminiy hisoblash (kirill/lotin matn uchun ~3 belgi = 1 token)"""
+        return len(text or '') // 3 + 1
+
     def _create_local_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Local embeddinglar"""
         return self.model.encode(texts).tolist()
 
 
-# Global xizmatlar
+# Global xizmatlar - og'ir kutubxonalar va embedding modeli birinchi murojaatda yuklanadi
 document_processor = DocumentProcessor()
-embedding_service = VectorEmbeddingService()
+embedding_service = SimpleLazyObject(VectorEmbeddingService)
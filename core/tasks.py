@@ -4,6 +4,7 @@ from django.utils import timezone
 import logging
 from typing import Dict, Any
 from .services import document_processor, embedding_service
+from .vector_store import vector_store
 from apps.tenders.models import Tender, TenderDocument, TenderRequirement
 from apps.participants.models import TenderParticipant, ParticipantDocument
 
@@ -19,8 +20,27 @@ def process_tender_document(self, document_id: int) -> Dict[str, Any]:
         document = TenderDocument.objects.get(id=document_id)
         logger.info(f"Tender hujjatini qayta ishlash boshlandi: {document.id}")
         
+        # Bo'laklar hujjat o'qilishi bilan paket-paket embedding qilinadi va saqlanadi
+        writer = None
+        if embedding_service.model_type:
+            writer = vector_store.chunk_writer(
+                tender_id=document.tender_id,
+                source='tender',
+                embed=embedding_service.create_embeddings,
+                embedding_model=embedding_service.model_name,
+                tender_document=document,
+            )
+        
         # Hujjatni qayta ishlash
-        result = document_processor.process_document(document.file.path)
+        try:
+            result = document_processor.process_document(
+                document.file.path,
+                on_chunks=writer.add if writer else None,
+            )
+            if writer and result['processing_status'] == 'success':
+                writer.add(result['vector_data']['metadata_chunks'])
+        finally:
+            chunks_created = writer.close() if writer else 0
         
         if result['processing_status'] == 'success':
             # Matnni saqlash
@@ -35,17 +55,8 @@ def process_tender_document(self, document_id: int) -> Dict[str, Any]:
             
             document.save()
             
-            # Vektor embeddinglar yaratish
-            if embedding_service.model_type:
-                content_chunks = result['vector_data']['content_chunks']
-                metadata_chunks = result['vector_data']['metadata_chunks']
-                all_chunks = content_chunks + metadata_chunks
-                
-                embeddings = embedding_service.create_embeddings(all_chunks)
-                
-                # Vektorlarni saqlash (bu yerda vektor ma'lumotlar bazasiga yoziladi)
-                # Hozircha faqat log qilamiz
-                logger.info(f"Vektorlar yaratildi: {len(embeddings)} ta")
+            if writer:
+                logger.info(f"Vektorlar yaratildi: {chunks_created} ta")
             
             # Tender talablarini avtomatik ajratish
             if document.document_type == 'requirements':
@@ -56,7 +67,7 @@ def process_tender_document(self, document_id: int) -> Dict[str, Any]:
                 'status': 'success',
                 'document_id': document_id,
                 'processed_text_length': len(result['text_content']),
-                'chunks_created': len(all_chunks) if embedding_service.model_type else 0,
+                'chunks_created': chunks_created,
             }
         
         else:
@@ -96,8 +107,27 @@ def process_participant_document(self, document_id: int) -> Dict[str, Any]:
         document = ParticipantDocument.objects.get(id=document_id)
         logger.info(f"Ishtirokchi hujjatini qayta ishlash boshlandi: {document.id}")
         
+        # Bo'laklar hujjat o'qilishi bilan paket-paket embedding qilinadi va saqlanadi
+        writer = None
+        if embedding_service.model_type:
+            writer = vector_store.chunk_writer(
+                tender_id=document.tender_participant.tender_id,
+                source='participant',
+                embed=embedding_service.create_embeddings,
+                embedding_model=embedding_service.model_name,
+                participant_document=document,
+            )
+        
         # Hujjatni qayta ishlash
-        result = document_processor.process_document(document.file.path)
+        try:
+            result = document_processor.process_document(
+                document.file.path,
+                on_chunks=writer.add if writer else None,
+            )
+            if writer and result['processing_status'] == 'success':
+                writer.add(result['vector_data']['metadata_chunks'])
+        finally:
+            chunks_created = writer.close() if writer else 0
         
         if result['processing_status'] == 'success':
             # Matnni saqlash
@@ -122,21 +152,15 @@ def process_participant_document(self, document_id: int) -> Dict[str, Any]:
             
             document.save()
             
-            # Vektor embeddinglar yaratish
-            if embedding_service.model_type:
-                content_chunks = result['vector_data']['content_chunks']
-                metadata_chunks = result['vector_data']['metadata_chunks']
-                all_chunks = content_chunks + metadata_chunks
-                
-                embeddings = embedding_service.create_embeddings(all_chunks)
-                logger.info(f"Vektorlar yaratildi: {len(embeddings)} ta")
+            if writer:
+                logger.info(f"Vektorlar yaratildi: {chunks_created} ta")
             
             logger.info(f"Ishtirokchi hujjati muvaffaqiyatli qayta ishlindi: {document.id}")
             return {
                 'status': 'success',
                 'document_id': document_id,
                 'processed_text_length': len(result['text_content']),
-                'chunks_created': len(all_chunks) if embedding_service.model_type else 0,
+                'chunks_created': chunks_created,
             }
         
         else:
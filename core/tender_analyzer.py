@@ -5,13 +5,28 @@ Bu modul tender shartnomasini tahlil qiladi va ishtirokchilarni
 tender talablariga mosligini baholaydi.
 """
 
+import hashlib
 import logging
 import json
 import re
-from typing import Dict, List, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from decimal import Decimal
+from django.conf import settings
 from .llm_engine import llm_engine
+from .prompt_budget import DOCUMENT_SLOT, PromptBudget, count_tokens
+from .prompt_templates import (
+    COMPARE_SUMMARY,
+    PARTICIPANT_ANALYSIS,
+    PARTICIPANT_RETRY,
+    TENDER_ANALYSIS,
+    TENDER_RETRY,
+    TENDER_SECTION,
+)
+from .json_stream import IncrementalJSONAssembler
+from .retrieval import select_relevant_passages, split_passages, tokenize
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +46,43 @@ def _is_uzbek(lang: str) -> bool:
     return _normalize_language(lang).startswith('uz')
 
 
+TENDER_STORE_PREFIX = 'tender_analysis:'
+
+# JSON xato bo'lganda qayta so'rovdagi soddalashtirilgan prompt uchun hujjat hajmi (tokenlarda)
+RETRY_DOCUMENT_TOKENS = 1500
+
+
+def make_tender_key(tender_text: str, language: str = '') -> str:
+    """Tender matni va tilidan barqaror kalit (SHA-256) yaratish"""
+    raw = f"{_normalize_language(language)}\n{tender_text or ''}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def save_tender_analysis(tender_key: str, analysis: Dict[str, Any]) -> None:
+    """Tender tahlilini umumiy keshga (barcha worker'lar uchun) saqlash"""
+    from django.core.cache import cache
+    try:
+        cache.set(
+            f'{TENDER_STORE_PREFIX}{tender_key}',
+            analysis,
+            timeout=getattr(settings, 'TENDER_ANALYSIS_STORE_TTL', 24 * 3600),
+        )
+    except Exception as e:
+        logger.warning(f"Tender tahlilini saqlashda xatolik: {str(e)}")
+
+
+def load_tender_analysis(tender_key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Saqlangan tender tahlilini kalit bo'yicha olish"""
+    if not tender_key:
+        return None
+    from django.core.cache import cache
+    try:
+        return cache.get(f'{TENDER_STORE_PREFIX}{tender_key}')
+    except Exception as e:
+        logger.warning(f"Tender tahlilini o'qishda xatolik: {str(e)}")
+        return None
+
+
 @dataclass
 class TenderRequirement:
     """Tender talabi"""
@@ -75,6 +127,22 @@ class TenderAnalyzer:
         self.tender_requirements: List[TenderRequirement] = []
         self.tender_info: Dict[str, Any] = {}
     
+    @classmethod
+    def from_tender_data(cls, tender_data: Optional[Dict[str, Any]]) -> 'TenderAnalyzer':
+        """
+        Tayyor tender tahlilidan yangi (so'rovga xos) analyzer yaratish
+        
+        Args:
+            tender_data: Tender tahlili (analyze_tender_document natijasi yoki frontend'dan)
+        
+        Returns:
+            Talablari tiklangan TenderAnalyzer
+        """
+        analyzer = cls()
+        if tender_data:
+            analyzer.restore_tender_analysis(tender_data)
+        return analyzer
+    
     def restore_tender_analysis(self, tender_data: Dict[str, Any]) -> bool:
         """
         Frontend'dan kelgan tender tahlilini tiklash
@@ -130,202 +198,28 @@ class TenderAnalyzer:
         """
         try:
             logger.info("Tender shartnomasini tahlil qilish boshlandi")
-
-            lang = _normalize_language((tender_metadata or {}).get('language'))
-            if lang == 'ru':
-                lang_instruction = 'Ответь на русском языке. '
-                system_prompt = 'Ты эксперт по государственным закупкам. Анализируй тендерные документы глубоко и всесторонне. Возвращай только JSON.'
-            elif lang == 'uz_cyrl':
-                lang_instruction = 'Жавобни ўзбек тилида (кирилл) бер. '
-                system_prompt = "Сен Ўзбекистон давлат харидлари бўйича юқори малакали экспертсан. Тендер ҳужжатларини ҳар тарафлама чуқур таҳлил қиласан. Фақат JSON форматда жавоб бер."
-            else:
-                lang_instruction = "Javobni o'zbek tilida (lotin) ber. "
-                system_prompt = "Sen O'zbekiston davlat xaridlari bo'yicha yuqori malakali ekspertsan. Tender hujjatlarini har taraflama chuqur tahlil qilasan. Faqat JSON formatida javob ber."
+            if self._needs_map_reduce(tender_text, tender_metadata):
+                return {
+                    'success': True,
+                    'analysis': self._analyze_tender_map_reduce(tender_text, tender_metadata)
+                }
             
-            # LLM orqali tender tahlili
-            analysis_prompt = f"""
-{lang_instruction}
-Sen tender tahlili bo'yicha yuqori malakali ekspertsan. 
-Quyidagi tender shartnomasini HAR TARAFLAMA CHUQUR tahlil qil.
-
-TENDER SHARTNOMASI:
-{tender_text[:10000]}
-
-VAZIFA - QUYIDAGILARNI BATAFSIL ANIQLA:
-
-1. TENDER ASOSIY MA'LUMOTLARI:
-   - Tender maqsadi va mohiyati
-   - Tender turi va kategoriyasi
-   - Byudjet va moliyaviy shartlar
-   - Muddatlar va vaqt jadvali
-   - Loyiha joylashuvi (lokatsiya)
-
-2. BARCHA TALABLARNI ANIQLASH:
-   - Texnik talablar
-   - Moliyaviy talablar
-   - Huquqiy talablar
-   - Tajriba talablari
-   - Hujjat talablari
-   - Sifat talablari
-   - Xavfsizlik talablari
-   - Kadrlar talablari
-
-3. HAR BIR TALAB UCHUN:
-   - Majburiy yoki ixtiyoriy
-   - Vazn koeffitsienti (0.1-1.0)
-   - Baholash mezoni
-   - Minimal va maksimal qiymatlar
-
-4. MAXSUS SHARTLAR:
-   - Lokatsiya talablari
-   - Mahalliy ishtirok talablari
-   - Subpudratchi shartlari
-   - Kafolat talablari
-   - Sug'urta talablari
-
-JSON FORMAT (faqat JSON qaytar, boshqa matn yo'q):
-{{
-    "tender_purpose": "Tender maqsadi batafsil",
-    "tender_type": "qurilish|xizmat|tovar|aralash",
-    "tender_category": "Tender kategoriyasi",
-    "project_location": "Loyiha joylashuvi",
-    "estimated_budget": "Taxminiy byudjet",
-    "budget_range": {{
-        "min": "Minimal summa",
-        "max": "Maksimal summa"
-    }},
-    "timeline": {{
-        "submission_deadline": "Topshirish muddati",
-        "project_start": "Loyiha boshlanishi",
-        "project_end": "Loyiha tugashi",
-        "total_duration": "Umumiy muddat"
-    }},
-    "requirements": [
-        {{
-            "id": "REQ001",
-            "category": "technical|financial|legal|experience|document|quality|safety|personnel",
-            "title": "Talab nomi",
-            "description": "Batafsil tavsif",
-            "is_mandatory": true|false,
-            "weight": 0.1-1.0,
-            "min_value": "Minimal qiymat (agar mavjud)",
-            "evaluation_method": "Baholash usuli"
-        }}
-    ],
-    "location_requirements": {{
-        "project_region": "Loyiha mintaqasi",
-        "local_presence_required": true|false,
-        "proximity_preference": "Yaqinlik afzalligi",
-        "logistics_requirements": "Logistika talablari"
-    }},
-    "experience_requirements": {{
-        "min_years": "Minimal yillar",
-        "similar_projects": "O'xshash loyihalar soni",
-        "min_project_value": "Minimal loyiha qiymati",
-        "sector_experience": "Soha tajribasi"
-    }},
-    "financial_requirements": {{
-        "min_turnover": "Minimal aylanma",
-        "bank_guarantee": "Bank kafolati",
-        "insurance_required": true|false,
-        "payment_terms": "To'lov shartlari"
-    }},
-    "evaluation_criteria": [
-        {{
-            "name": "Baholash mezoni",
-            "weight": 0.1-1.0,
-            "description": "Mezon tavsifi",
-            "scoring_method": "Ballar berish usuli"
-        }}
-    ],
-    "special_conditions": ["Maxsus shartlar"],
-    "key_conditions": ["Asosiy shartlar"],
-    "warnings": ["Diqqat talab qiladigan jihatlar"],
-    "hidden_requirements": ["Yashirin yoki bilvosita talablar"],
-    "disqualification_criteria": ["Rad etish mezonlari"]
-}}
-"""
+            analysis_prompt, system_prompt = self._build_tender_prompt(tender_text, tender_metadata)
             
             llm_result = llm_engine.generate_response(
                 analysis_prompt,
                 system_prompt=system_prompt,
                 temperature=0.2,
-                max_tokens=3000  # Tender tahlili uchun yetarli token
+                max_tokens=3000,  # Tender tahlili uchun yetarli token
+                caller='tender_analysis',
+                prompt_version=TENDER_ANALYSIS.id
             )
             
             # LLM natijasini tekshirish
             if not llm_result.get('success'):
                 raise ValueError(llm_result.get('error', 'LLM xatolik berdi'))
             
-            result = llm_result.get('response', '')
-            
-            # JSON ni parse qilish - yaxshilangan
-            try:
-                # JSON ni topish
-                json_match = re.search(r'\{[\s\S]*\}', result)
-                if json_match:
-                    json_str = json_match.group()
-                    # JSON ni tozalash
-                    json_str = re.sub(r',\s*}', '}', json_str)  # Trailing comma
-                    json_str = re.sub(r',\s*]', ']', json_str)  # Trailing comma in array
-                    json_str = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', json_str)  # Control characters
-                    analysis = json.loads(json_str)
-                else:
-                    raise ValueError("JSON topilmadi")
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON parse xatosi: {e}")
-                # Qayta urinish - soddalashtirilgan prompt bilan
-                retry_prompt = f"""
-Quyidagi tender hujjatini tahlil qil. FAQAT ODDIY JSON qaytar:
-
-{tender_text[:5000]}
-
-JSON:
-{{
-    "tender_purpose": "maqsad",
-    "tender_type": "qurilish|xizmat|tovar",
-    "estimated_budget": "summa",
-    "deadline": "muddat",
-    "requirements": [
-        {{"id": "REQ001", "category": "experience", "title": "talab", "description": "tavsif", "is_mandatory": true, "weight": 0.5}}
-    ]
-}}
-"""
-                retry_result = llm_engine.generate_response(retry_prompt, temperature=0.1, max_tokens=2000)
-                if retry_result.get('success'):
-                    try:
-                        retry_json = re.search(r'\{[\s\S]*\}', retry_result.get('response', ''))
-                        if retry_json:
-                            analysis = json.loads(retry_json.group())
-                        else:
-                            analysis = self._fallback_tender_analysis(tender_text)
-                    except:
-                        analysis = self._fallback_tender_analysis(tender_text)
-                else:
-                    analysis = self._fallback_tender_analysis(tender_text)
-            
-            # Talablarni saqlash
-            self.tender_requirements = []
-            for req in analysis.get('requirements', []):
-                self.tender_requirements.append(TenderRequirement(
-                    id=req.get('id', f"REQ{len(self.tender_requirements)+1:03d}"),
-                    category=req.get('category', 'other'),
-                    title=req.get('title', ''),
-                    description=req.get('description', ''),
-                    is_mandatory=req.get('is_mandatory', False),
-                    weight=float(req.get('weight', 0.5))
-                ))
-            
-            # Metadata qo'shish
-            if tender_metadata:
-                analysis['metadata'] = tender_metadata
-            
-            analysis['requirements_count'] = len(self.tender_requirements)
-            analysis['mandatory_count'] = sum(1 for r in self.tender_requirements if r.is_mandatory)
-            
-            self.tender_info = analysis
-            
-            logger.info(f"Tender tahlili yakunlandi. {len(self.tender_requirements)} ta talab aniqlandi.")
+            analysis = self._finalize_tender_analysis(llm_result.get('response', ''), tender_text, tender_metadata)
             
             return {
                 'success': True,
@@ -339,6 +233,235 @@ JSON:
                 'error': str(e)
             }
     
+    def stream_tender_analysis(self, tender_text: str, tender_metadata: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Tender shartnomasini oqimli tahlil qilish
+        
+        Talablar LLM javobi tugashini kutmasdan, har biri tayyor bo'lishi bilan qaytariladi.
+        
+        Yields:
+            {'type': 'requirement', 'requirement': {...}} - tayyor bo'lgan talab
+            {'type': 'done', 'success': True, 'analysis': {...}} - yakuniy tahlil
+            {'type': 'error', 'success': False, 'error': '...'} - xatolik
+        """
+        try:
+            logger.info("Tender shartnomasini oqimli tahlil qilish boshlandi")
+            if self._needs_map_reduce(tender_text, tender_metadata):
+                # Uzun hujjat bo'limlar bo'yicha parallel tahlil qilinadi
+                analysis = self._analyze_tender_map_reduce(tender_text, tender_metadata)
+                for req in analysis.get('requirements', []):
+                    yield {'type': 'requirement', 'requirement': req}
+                yield {'type': 'done', 'success': True, 'analysis': analysis}
+                return
+            
+            analysis_prompt, system_prompt = self._build_tender_prompt(tender_text, tender_metadata)
+            
+            assembler = IncrementalJSONAssembler()
+            for chunk in llm_engine.stream_response(
+                analysis_prompt,
+                system_prompt=system_prompt,
+                temperature=0.2,
+                max_tokens=3000,
+                caller='tender_analysis',
+                prompt_version=TENDER_ANALYSIS.id
+            ):
+                for key, item in assembler.feed(chunk):
+                    if key == 'requirements':
+                        yield {'type': 'requirement', 'requirement': item}
+            
+            analysis = self._finalize_tender_analysis(assembler.text, tender_text, tender_metadata)
+            yield {'type': 'done', 'success': True, 'analysis': analysis}
+            
+        except Exception as e:
+            logger.error(f"Tender oqimli tahlilida xatolik: {str(e)}")
+            yield {'type': 'error', 'success': False, 'error': str(e)}
+    
+    def _build_tender_prompt(self, tender_text: str, tender_metadata: Dict[str, Any] = None, max_tokens: int = 3000) -> Tuple[str, str]:
+        """Tender tahlili uchun prompt va system prompt (statik ko'rsatmalar boshida, hujjat oxirida)"""
+        lang = _normalize_language((tender_metadata or {}).get('language'))
+        prompt, system_prompt, _ = TENDER_ANALYSIS.render(lang, document=DOCUMENT_SLOT)
+        prompt = PromptBudget.for_engine(max_tokens).fill(prompt, tender_text, system_prompt)
+        return prompt, system_prompt
+    
+    def _finalize_tender_analysis(self, result: str, tender_text: str, tender_metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """LLM javobidan tender tahlilini yig'ish va talablarni saqlash"""
+        # JSON ni parse qilish - yaxshilangan
+        try:
+            # JSON ni topish
+            json_match = re.search(r'\{[\s\S]*\}', result)
+            if json_match:
+                json_str = json_match.group()
+                # JSON ni tozalash
+                json_str = re.sub(r',\s*}', '}', json_str)  # Trailing comma
+                json_str = re.sub(r',\s*]', ']', json_str)  # Trailing comma in array
+                json_str = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', json_str)  # Control characters
+                analysis = json.loads(json_str)
+            else:
+                raise ValueError("JSON topilmadi")
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parse xatosi: {e}")
+            # Qayta urinish - soddalashtirilgan prompt bilan
+            retry_prompt = TENDER_RETRY.render(document=DOCUMENT_SLOT).prompt
+            retry_prompt = PromptBudget.for_engine(2000).fill(retry_prompt, tender_text, limit=RETRY_DOCUMENT_TOKENS)
+            retry_result = llm_engine.generate_response(
+                retry_prompt, temperature=0.1, max_tokens=2000, caller='tender_analysis', prompt_version=TENDER_RETRY.id
+            )
+            if retry_result.get('success'):
+                try:
+                    retry_json = re.search(r'\{[\s\S]*\}', retry_result.get('response', ''))
+                    if retry_json:
+                        analysis = json.loads(retry_json.group())
+                    else:
+                        analysis = self._fallback_tender_analysis(tender_text)
+                except:
+                    analysis = self._fallback_tender_analysis(tender_text)
+            else:
+                analysis = self._fallback_tender_analysis(tender_text)
+            analysis['prompt_version'] = TENDER_RETRY.id
+        
+        analysis.setdefault('prompt_version', TENDER_ANALYSIS.id)
+        return self._apply_tender_analysis(analysis, tender_metadata)
+    
+    def _apply_tender_analysis(self, analysis: Dict[str, Any], tender_metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Tahlil natijasidan talablarni va tender ma'lumotlarini saqlash"""
+        # Talablarni saqlash
+        self.tender_requirements = []
+        for req in analysis.get('requirements', []):
+            self.tender_requirements.append(TenderRequirement(
+                id=req.get('id', f"REQ{len(self.tender_requirements)+1:03d}"),
+                category=req.get('category', 'other'),
+                title=req.get('title', ''),
+                description=req.get('description', ''),
+                is_mandatory=req.get('is_mandatory', False),
+                weight=float(req.get('weight', 0.5))
+            ))
+        
+        # Metadata qo'shish
+        if tender_metadata:
+            analysis['metadata'] = tender_metadata
+        
+        analysis['requirements_count'] = len(self.tender_requirements)
+        analysis['mandatory_count'] = sum(1 for r in self.tender_requirements if r.is_mandatory)
+        
+        self.tender_info = analysis
+        
+        logger.info(f"Tender tahlili yakunlandi. {len(self.tender_requirements)} ta talab aniqlandi.")
+        
+        return analysis
+    
+    def _needs_map_reduce(self, tender_text: str, tender_metadata: Dict[str, Any] = None) -> bool:
+        """
+        Hujjat bitta tender tahlili promptiga sig'maydimi
+
+        Chegara - TENDER_MAP_REDUCE_TOKENS, lekin sozlangan eng kichik modelning
+        token byudjetidan oshmaydi.
+        """
+        lang = _normalize_language((tender_metadata or {}).get('language'))
+        prompt, system_prompt, _ = TENDER_ANALYSIS.render(lang, document=DOCUMENT_SLOT)
+        budget = PromptBudget.for_engine(3000)
+        threshold = min(
+            getattr(settings, 'TENDER_MAP_REDUCE_TOKENS', 24000),
+            budget.available(prompt, system_prompt),
+        )
+        return budget.count(tender_text) > threshold
+    
+    def _split_tender_sections(self, tender_text: str, chunk_chars: int) -> List[str]:
+        """Tender matnini bo'limlar bo'yicha chunk_chars dan oshmaydigan qismlarga bo'lish"""
+        from .services import document_processor
+        
+        structured = document_processor._structure_content(tender_text, 'tender')
+        sections = [
+            f"{section['title']}\n" + '\n'.join(section['content'])
+            for section in structured.get('sections', [])
+        ] or [tender_text]
+        
+        chunks: List[str] = []
+        current = ''
+        for section in sections:
+            # Juda katta bo'lim xatboshilar bo'yicha bo'linadi
+            parts = split_passages(section, passage_chars=chunk_chars) if len(section) > chunk_chars else [section]
+            for part in parts:
+                if current and len(current) + len(part) + 2 > chunk_chars:
+                    chunks.append(current)
+                    current = part
+                else:
+                    current = f"{current}\n\n{part}" if current else part
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _build_section_prompt(self, section_text: str, part: int, total: int, tender_metadata: Dict[str, Any] = None) -> Tuple[str, str]:
+        """Tender bo'limidan faqat talablarni ajratish uchun prompt"""
+        lang = _normalize_language((tender_metadata or {}).get('language'))
+        prompt, system_prompt, _ = TENDER_SECTION.render(lang, part=part, total=total, document=DOCUMENT_SLOT)
+        prompt = PromptBudget.for_engine(2000).fill(prompt, section_text, system_prompt)
+        return prompt, system_prompt
+    
+    def _map_tender_section(self, index: int, section_text: str, total: int, tender_metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Map bosqichi: bitta bo'limni tahlil qilish"""
+        if index == 0:
+            # Birinchi qism - umumiy ma'lumotlar (maqsad, byudjet, muddatlar) ham olinadi
+            prompt, system_prompt = self._build_tender_prompt(section_text, tender_metadata)
+            max_tokens, template = 3000, TENDER_ANALYSIS
+        else:
+            prompt, system_prompt = self._build_section_prompt(section_text, index + 1, total, tender_metadata)
+            max_tokens, template = 2000, TENDER_SECTION
+        
+        llm_result = llm_engine.generate_response(
+            prompt, system_prompt=system_prompt, temperature=0.2, max_tokens=max_tokens,
+            caller='tender_analysis', prompt_version=template.id
+        )
+        if not llm_result.get('success'):
+            raise ValueError(llm_result.get('error', 'LLM xatolik berdi'))
+        return _parse_llm_json(llm_result.get('response', ''))
+    
+    def _analyze_tender_map_reduce(self, tender_text: str, tender_metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Uzun tender hujjatini map-reduce usulida tahlil qilish
+        
+        Hujjat bo'limlarga bo'linadi, har bir bo'limdan talablar parallel ajratiladi,
+        so'ng talablar birlashtirilib takrorlanganlari olib tashlanadi.
+        """
+        chunk_chars = getattr(settings, 'TENDER_MAP_CHUNK_CHARS', 8000)
+        max_workers = getattr(settings, 'TENDER_MAP_MAX_WORKERS', 4)
+        sections = self._split_tender_sections(tender_text, chunk_chars)
+        logger.info(f"Tender map-reduce tahlili: {len(sections)} ta qism, {max_workers} ta parallel")
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(sections)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sections)))) as executor:
+            futures = {
+                executor.submit(self._map_tender_section, index, section, len(sections), tender_metadata): index
+                for index, section in enumerate(sections)
+            }
+            for future, index in futures.items():
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    logger.error(f"Tender qismi tahlilida xatolik ({index + 1}/{len(sections)}): {str(e)}")
+        
+        if all(result is None for result in results):
+            raise ValueError("Tender qismlarining hech biri tahlil qilinmadi")
+        
+        # Reduce: umumiy ma'lumotlar birinchi qismdan, talablar barcha qismlardan
+        analysis = dict(results[0] or {})
+        analysis['requirements'] = _merge_requirements([
+            result.get('requirements', []) for result in results if result
+        ])
+        for field in ('warnings', 'disqualification_criteria'):
+            merged: List[Any] = []
+            for result in results:
+                for item in (result or {}).get(field, []) or []:
+                    if item not in merged:
+                        merged.append(item)
+            analysis[field] = merged
+        analysis['map_reduce'] = {
+            'sections': len(sections),
+            'failed_sections': sum(1 for result in results if result is None),
+        }
+        analysis['prompt_version'] = f"{TENDER_ANALYSIS.id}+{TENDER_SECTION.id}"
+        
+        return self._apply_tender_analysis(analysis, tender_metadata)
+    
     def analyze_participant(
         self, 
         participant_name: str,
@@ -360,15 +483,6 @@ JSON:
             logger.info(f"Ishtirokchi tahlili boshlandi: {participant_name}")
 
             lang = _normalize_language((participant_metadata or {}).get('language'))
-            if lang == 'ru':
-                lang_instruction = 'Ответь на русском языке. '
-                system_prompt = 'Ты эксперт по государственным закупкам. Оценивай участников справедливо и детально. Возвращай только JSON.'
-            elif lang == 'uz_cyrl':
-                lang_instruction = 'Жавобни ўзбек тилида (кирилл) бер. '
-                system_prompt = "Сен Ўзбекистон давлат харидлари бўйича экспертсан. Иштирокчиларни адолатли баҳолайсан. Фақат JSON форматда жавоб бер."
-            else:
-                lang_instruction = "Javobni o'zbek tilida (lotin) ber. "
-                system_prompt = "Sen O'zbekiston davlat xaridlari bo'yicha ekspertsan. Ishtirokchilarni adolatli baholaysan. Faqat JSON formatida javob ber."
             
             if not self.tender_requirements:
                 return {
@@ -382,149 +496,25 @@ JSON:
                 for req in self.tender_requirements
             ])
             
-            # LLM orqali tahlil
+            # LLM orqali tahlil: statik ko'rsatmalar boshida, tender va ishtirokchi ma'lumotlari oxirida
             default_purpose = "Nomalum"
-            analysis_prompt = f"""
-{lang_instruction}
-Sen tender ishtirokchilarini HAR TARAFLAMA baholash bo'yicha ekspertsan. 
-DIQQAT: Barcha jihatlarni CHUQUR tahlil qil, hech narsa e'tibordan chetda qolmasin!
-
-TENDER TALABLARI:
-{requirements_text}
-
-TENDER MAQSADI:
-{self.tender_info.get('tender_purpose', default_purpose)}
-
-ISHTIROKCHI HUJJATLARI:
-{participant_text[:8000]}
-
-VAZIFA - QUYIDAGILARNI BATAFSIL TAHLIL QIL:
-
-1. TAJRIBA TAHLILI:
-   - Sohadagi umumiy tajriba (yillar)
-   - O'xshash loyihalar soni va hajmi
-   - Muvaffaqiyatli yakunlangan loyihalar
-   - Referenslar va tavsiyalar
-   - Xodimlar malakasi va tajribasi
-
-2. LOKATSIYA TAHLILI:
-   - Kompaniya joylashuvi
-   - Tender joyi bilan masofa
-   - Mintaqaviy tajriba
-   - Logistika imkoniyatlari
-   - Mahalliy bozor bilimi
-
-3. XIZMAT TAKLIFLARI TAHLILI:
-   - Taklif etilgan xizmatlar to'liq ro'yxati
-   - Qo'shimcha xizmatlar va bonuslar
-   - Kafolat shartlari
-   - Texnik yordam va support
-   - Vaqt jadvali va muddatlar
-   - Innovatsion yondashuvlar
-
-4. MOLIYAVIY TAHLIL:
-   - Taklif narxi batafsil
-   - Narx tarkibi va shaffoflik
-   - To'lov shartlari
-   - Moliyaviy barqarorlik
-   - Bozor narxi bilan solishtirish
-   - Yashirin xarajatlar tahlili
-
-5. TEXNIK IMKONIYATLAR:
-   - Uskunalar va texnika
-   - Sertifikatlar va litsenziyalar
-   - Sifat nazorati tizimlari
-   - Xavfsizlik standartlari
-   - Ekologik muvofiqlik
-
-6. RISKLAR TAHLILI:
-   - Moliyaviy risklar
-   - Operatsion risklar
-   - Muddatlarni buzish xavfi
-   - Sifat risklari
-   - Huquqiy risklar
-
-JSON FORMAT (faqat JSON qaytar):
-{{
-    "participant_name": "{participant_name}",
-    "overall_match_percentage": 0-100 orasida foiz,
-    "scores": [
-        {{
-            "requirement_id": "REQ001",
-            "score": 0-100,
-            "matches": true|false,
-            "reason": "Baholash sababi",
-            "details": "Batafsil tushuntirish"
-        }}
-    ],
-    "experience_analysis": {{
-        "years_in_business": "Yillar soni",
-        "similar_projects_count": "O'xshash loyihalar soni",
-        "successful_projects": "Muvaffaqiyatli loyihalar",
-        "team_qualification": "Jamoa malakasi",
-        "references_quality": "Referenslar sifati (past/o'rta/yuqori)",
-        "experience_score": 0-100
-    }},
-    "location_analysis": {{
-        "company_location": "Kompaniya joylashuvi",
-        "distance_to_project": "Loyiha joyigacha masofa",
-        "regional_experience": "Mintaqaviy tajriba",
-        "logistics_capability": "Logistika imkoniyati",
-        "local_market_knowledge": "Mahalliy bozor bilimi",
-        "location_score": 0-100
-    }},
-    "service_offer_analysis": {{
-        "main_services": ["Asosiy xizmatlar"],
-        "additional_services": ["Qo'shimcha xizmatlar"],
-        "warranty_terms": "Kafolat shartlari",
-        "support_quality": "Texnik yordam sifati",
-        "timeline_feasibility": "Muddat realligi",
-        "innovation_level": "Innovatsiya darajasi",
-        "service_score": 0-100
-    }},
-    "financial_analysis": {{
-        "proposed_price": "Taklif etilgan narx",
-        "price_breakdown": "Narx tarkibi",
-        "payment_terms": "To'lov shartlari",
-        "financial_stability": "Moliyaviy barqarorlik",
-        "market_comparison": "Bozor bilan solishtirish",
-        "hidden_costs_risk": "Yashirin xarajatlar xavfi",
-        "price_adequacy": "past|mos|yuqori",
-        "price_score": 0-100
-    }},
-    "technical_capabilities": {{
-        "equipment_quality": "Uskunalar sifati",
-        "certifications": ["Sertifikatlar ro'yxati"],
-        "quality_systems": ["Sifat tizimlari"],
-        "safety_standards": "Xavfsizlik standartlari",
-        "environmental_compliance": "Ekologik muvofiqlik",
-        "technical_score": 0-100
-    }},
-    "risk_assessment": {{
-        "financial_risk": "past|o'rta|yuqori",
-        "operational_risk": "past|o'rta|yuqori",
-        "timeline_risk": "past|o'rta|yuqori",
-        "quality_risk": "past|o'rta|yuqori",
-        "legal_risk": "past|o'rta|yuqori",
-        "overall_risk": "low|medium|high",
-        "risk_mitigation": ["Risk kamaytirish choralari"]
-    }},
-    "strengths": ["Har bir ustunlik batafsil"],
-    "weaknesses": ["Har bir kamchilik batafsil"],
-    "minor_advantages": ["Kichik ustunliklar"],
-    "minor_disadvantages": ["Kichik kamchiliklar"],
-    "recommendation": "Batafsil tavsiya",
-    "final_verdict": "Tender uchun tavsiya etiladi/Shartli tavsiya/Tavsiya etilmaydi",
-    "improvement_suggestions": ["Yaxshilash uchun tavsiyalar"],
-    "disqualification_reasons": ["Agar bo'lsa, rad etish sabablari"]
-}}
-"""
+            analysis_prompt, system_prompt, _ = PARTICIPANT_ANALYSIS.render(
+                lang,
+                requirements=requirements_text,
+                tender_purpose=self.tender_info.get('tender_purpose', default_purpose),
+                participant_name=participant_name,
+                document=DOCUMENT_SLOT,
+            )
+            # Hujjatdan talablarga tegishli parchalar qolgan token byudjetiga tanlanadi
+            analysis_prompt = self._fill_participant_prompt(analysis_prompt, participant_text, system_prompt, 3500)
             
             llm_result = llm_engine.generate_response(
                 analysis_prompt,
                 system_prompt=system_prompt,
                 temperature=0.3,
-                max_tokens=3500  # Ishtirokchi tahlili uchun yetarli token
+                max_tokens=3500,  # Ishtirokchi tahlili uchun yetarli token
+                caller='participant_analysis',
+                prompt_version=PARTICIPANT_ANALYSIS.id
             )
             
             # LLM natijasini tekshirish
@@ -548,27 +538,14 @@ JSON FORMAT (faqat JSON qaytar):
             except json.JSONDecodeError as e:
                 logger.error(f"JSON parse xatosi: {e}")
                 # Qayta urinish - soddalashtirilgan prompt
-                retry_prompt = f"""
-Ishtirokchi: {participant_name}
-Ma'lumotlar: {participant_text[:3000]}
-
-ODDIY JSON qaytar:
-{{
-    "participant_name": "{participant_name}",
-    "overall_match_percentage": 0-100,
-    "experience_score": 0-100,
-    "location_score": 0-100,
-    "service_score": 0-100,
-    "price_score": 0-100,
-    "technical_score": 0-100,
-    "risk_level": "low|medium|high",
-    "strengths": ["ustunlik1"],
-    "weaknesses": ["kamchilik1"],
-    "recommendation": "tavsiya",
-    "final_verdict": "tavsiya etiladi|shartli|tavsiya etilmaydi"
-}}
-"""
-                retry_result = llm_engine.generate_response(retry_prompt, temperature=0.1, max_tokens=2000)
+                retry_prompt = PARTICIPANT_RETRY.render(participant_name=participant_name, document=DOCUMENT_SLOT).prompt
+                retry_prompt = self._fill_participant_prompt(
+                    retry_prompt, participant_text, max_tokens=2000, limit=RETRY_DOCUMENT_TOKENS
+                )
+                retry_result = llm_engine.generate_response(
+                    retry_prompt, temperature=0.1, max_tokens=2000, caller='participant_analysis',
+                    prompt_version=PARTICIPANT_RETRY.id
+                )
                 if retry_result.get('success'):
                     try:
                         retry_json = re.search(r'\{[\s\S]*\}', retry_result.get('response', ''))
@@ -597,6 +574,9 @@ ODDIY JSON qaytar:
                         analysis = self._fallback_participant_analysis(participant_name, participant_text)
                 else:
                     analysis = self._fallback_participant_analysis(participant_name, participant_text)
+                analysis['prompt_version'] = PARTICIPANT_RETRY.id
+            
+            analysis.setdefault('prompt_version', PARTICIPANT_ANALYSIS.id)
             
             # Umumiy ballni hisoblash - analysis ham uzatiladi
             total_score = self._calculate_weighted_score(analysis.get('scores', []), analysis)
@@ -620,6 +600,91 @@ ODDIY JSON qaytar:
                 'error': str(e)
             }
     
+    def _select_participant_context(self, participant_text: str, max_tokens: int, model: Optional[str] = None) -> str:
+        """Ishtirokchi hujjatidan har bir tender talabiga eng mos parchalarni token byudjetiga tanlash"""
+        queries = [
+            f"{req.title} {req.description} {req.evaluation_criteria}"
+            for req in self.tender_requirements
+        ]
+        return select_relevant_passages(
+            participant_text,
+            queries,
+            max_chars=max_tokens,
+            top_k=getattr(settings, 'RAG_TOP_K', 3),
+            passage_chars=getattr(settings, 'RAG_PASSAGE_CHARS', 800),
+            measure=lambda text: count_tokens(text, model),
+        )
+    
+    def _fill_participant_prompt(
+        self,
+        prompt: str,
+        participant_text: str,
+        system_prompt: str = '',
+        max_tokens: int = 3500,
+        limit: Optional[int] = None,
+    ) -> str:
+        """Prompt shablonidagi hujjat o'rniga talablarga mos parchalarni qo'yish"""
+        budget = PromptBudget.for_engine(max_tokens)
+        return budget.fill(
+            prompt,
+            participant_text,
+            system_prompt,
+            limit=limit or getattr(settings, 'RAG_CONTEXT_TOKENS', 6000) or None,
+            selector=lambda text, tokens: self._select_participant_context(text, tokens, budget.model),
+        )
+    
+    def analyze_participants_concurrently(
+        self,
+        participants: List[Dict[str, Any]],
+        max_workers: Optional[int] = None,
+        on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Bir nechta ishtirokchini parallel tahlil qilish
+        
+        Har bir ishtirokchi joriy tender talablarining o'zgarmas nusxasiga
+        nisbatan alohida TenderAnalyzer'da tahlil qilinadi.
+        
+        Args:
+            participants: [{'name': ..., 'text': ..., 'metadata': {...}}]
+            max_workers: Bir vaqtda bajariladigan LLM so'rovlari soni
+            on_result: Har bir natija tayyor bo'lganda chaqiriladi (index, natija)
+        
+        Returns:
+            Natijalar ro'yxati - kirish tartibida
+        """
+        if not participants:
+            return []
+        
+        if max_workers is None:
+            max_workers = getattr(settings, 'PARTICIPANT_ANALYSIS_MAX_WORKERS', 4)
+        max_workers = max(1, min(max_workers, len(participants)))
+        
+        requirements_snapshot = tuple(self.tender_requirements)
+        info_snapshot = dict(self.tender_info)
+        
+        def _run(index: int, participant: Dict[str, Any]) -> Dict[str, Any]:
+            worker = TenderAnalyzer()
+            worker.tender_requirements = list(requirements_snapshot)
+            worker.tender_info = dict(info_snapshot)
+            try:
+                result = worker.analyze_participant(
+                    participant['name'],
+                    participant['text'],
+                    participant.get('metadata'),
+                )
+            except Exception as e:
+                logger.error(f"Ishtirokchi tahlilida xatolik: {participant.get('name')}: {str(e)}")
+                result = {'success': False, 'error': str(e)}
+            if on_result:
+                on_result(index, result)
+            return result
+        
+        logger.info(f"{len(participants)} ta ishtirokchi parallel tahlil qilinmoqda (max_workers={max_workers})")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='participant') as executor:
+            futures = [executor.submit(_run, i, p) for i, p in enumerate(participants)]
+            return [future.result() for future in futures]
+    
     def compare_participants(self, participants: List[Dict[str, Any]], language: str = 'uz_latn') -> Dict[str, Any]:
         # Kamida 2 ta ishtirokchi bo'lishi shart
         language = _normalize_language(language)
@@ -646,173 +711,19 @@ ODDIY JSON qaytar:
         try:
             logger.info(f"{len(participants)} ta ishtirokchini solishtirish")
             
-            # Balllar bo'yicha saralash
-            sorted_participants = sorted(
-                participants, 
-                key=lambda x: x.get('total_weighted_score', 0), 
-                reverse=True
-            )
-            
-            # Reyting qo'shish
-            for i, p in enumerate(sorted_participants, 1):
-                p['rank'] = i
-            
-            # G'olib va tavsiya
-            winner = sorted_participants[0] if sorted_participants else None
-            
-            # Solishtirma jadval - BATAFSIL
-            comparison_table = []
-            for p in sorted_participants:
-                comparison_table.append({
-                    'rank': p.get('rank'),
-                    'name': p.get('participant_name'),
-                    'score': p.get('total_weighted_score', 0),
-                    'match_percentage': p.get('overall_match_percentage', 0),
-                    'experience_score': p.get('experience_analysis', {}).get('experience_score', 0),
-                    'location_score': p.get('location_analysis', {}).get('location_score', 0),
-                    'service_score': p.get('service_offer_analysis', {}).get('service_score', 0),
-                    'financial_score': p.get('financial_analysis', {}).get('price_score', 0),
-                    'technical_score': p.get('technical_capabilities', {}).get('technical_score', 0),
-                    'risk_level': p.get('risk_assessment', {}).get('overall_risk', p.get('risk_level', 'unknown')),
-                    'strengths': p.get('strengths', [])[:3],
-                    'weaknesses': p.get('weaknesses', [])[:3],
-                    'recommendation': p.get('recommendation', '')[:150],
-                    'final_verdict': p.get('final_verdict', '')
-                })
-            
-            # Tahlil xulosa - til bo'yicha
-            if language == 'ru':
-                summary_prompt = f"""
-Ты эксперт и арбитр по тендерам. Сравни следующих участников ВСЕСТОРОННЕ и напиши ПОДРОБНОЕ заключение.
-
-АНАЛИЗ УЧАСТНИКОВ:
-{json.dumps(comparison_table, ensure_ascii=False, indent=2)}
-
-НАПИШИ ПОДРОБНОЕ ЗАКЛЮЧЕНИЕ:
-
-1. ОСНОВАНИЯ ОБЩЕГО РЕЙТИНГА:
-   - Почему именно такой порядок
-   - Основные различия каждого участника
-
-2. АНАЛИЗ ПОБЕДИТЕЛЯ:
-   - Почему на первом месте
-   - Его основные преимущества
-   - Потенциальные риски
-
-3. ДРУГИЕ УЧАСТНИКИ:
-   - Сильные стороны каждого
-   - Слабые стороны каждого
-   - Возможности для улучшения
-
-4. СРАВНЕНИЕ:
-   - По опыту
-   - По цене
-   - По качеству
-   - По местоположению
-
-5. ИТОГОВАЯ РЕКОМЕНДАЦИЯ:
-   - Кого следует выбрать
-   - На каких условиях
-   - С какими предупреждениями
-
-6. АЛЬТЕРНАТИВНЫЙ ВАРИАНТ:
-   - Если победитель откажется, кто следующий
-   - Почему
-"""
-                system_prompt = "Ты высококвалифицированный эксперт и арбитр по государственным закупкам. Пиши всестороннее, справедливое и подробное заключение на русском языке."
-            elif language == 'uz_cyrl':
-                summary_prompt = f"""
-Сен тендер эксперти ва ҳаккамсан. Қуйидаги иштирокчиларни ҲАР ТАРАФЛАМА солиштир ва БАТАФСИЛ хулоса ёз.
-
-ИШТИРОКЧИЛАР ТАҲЛИЛИ:
-{json.dumps(comparison_table, ensure_ascii=False, indent=2)}
-
-БАТАФСИЛ ХУЛОСА ЁЗ:
-
-1. УМУМИЙ РЕЙТИНГ АСОСЛАРИ:
-   - Нима учун айнан шу тартибда жойлаштирилди
-   - Ҳар бир иштирокчининг асосий фарқлари
-
-2. ҒОЛИБ ТАҲЛИЛИ:
-   - Нима учун биринчи ўринда
-   - Унинг асосий устунликлари
-   - Потенциал рисклари
-
-3. БОШҚА ИШТИРОКЧИЛАР:
-   - Ҳар бирининг кучли томонлари
-   - Ҳар бирининг заиф томонлари
-   - Яхшилаш имкониятлари
-
-4. ТАҚҚОСЛАШ:
-   - Таҗриба бўйича солиштириш
-   - Нарҳ бўйича солиштириш
-   - Сифат бўйича солиштириш
-   - Локация бўйича солиштириш
-
-5. ЯКУНИЙ ТАВСИЯ:
-   - Ким танланиши керак
-   - Қандай шартлар билан
-   - Қандай огоҳлантиришлар билан
-
-6. АЛТЕРНАТИВ ВАРИАНТ:
-   - Агар ғолиб рад этса, ким кейинги
-   - Нима учун
-"""
-                system_prompt = "Сен Ўзбекистон давлат харидлари бўйича юқори малакали эксперт ва ҳакамсан. Ҳар тарафлама, адолатли ва батафсил хулоса ёз (ўзбек кирилл)."
-            else:
-                summary_prompt = f"""
-Sen tender eksperti va hakamsan. Quyidagi ishtirokchilarni HAR TARAFLAMA solishtir va BATAFSIL xulosa yoz.
-
-ISHTIROKCHILAR TAHLILI:
-{json.dumps(comparison_table, ensure_ascii=False, indent=2)}
-
-BATAFSIL XULOSA YOZ:
-
-1. UMUMIY REYTING ASOSLARI:
-   - Nima uchun aynan shu tartibda joylashtirildi
-   - Har bir ishtirokchining asosiy farqlari
-
-2. G'OLIB TAHLILI:
-   - Nima uchun birinchi o'rinda
-   - Uning asosiy ustunliklari
-   - Potentsial risklari
-
-3. BOSHQA ISHTIROKCHILAR:
-   - Har birining kuchli tomonlari
-   - Har birining zaif tomonlari
-   - Yaxshilash imkoniyatlari
-
-4. TAQQOSLASH:
-   - Tajriba bo'yicha solishtirish
-   - Narx bo'yicha solishtirish
-   - Sifat bo'yicha solishtirish
-   - Lokatsiya bo'yicha solishtirish
-
-5. YAKUNIY TAVSIYA:
-   - Kim tanlanishi kerak
-   - Qanday shartlar bilan
-   - Qanday ogohlantirishlar bilan
-
-6. ALTERNATIV VARIANT:
-   - Agar g'olib rad etsa, kim keyingi
-   - Nima uchun
-"""
-                system_prompt = "Sen O'zbekiston davlat xaridlari bo'yicha yuqori malakali ekspert va hakamsan. Har taraflama, adolatli va batafsil xulosa yoz."
+            sorted_participants, winner, comparison_table = self._rank_participants(participants)
+            summary_prompt, system_prompt = self._build_compare_prompt(comparison_table, language)
             
             summary_result = llm_engine.generate_response(
                 summary_prompt,
                 system_prompt=system_prompt,
                 temperature=0.3,
-                max_tokens=4000  # Xulosa to'liq chiqishi uchun
+                max_tokens=4000,  # Xulosa to'liq chiqishi uchun
+                caller='compare',
+                prompt_version=COMPARE_SUMMARY.id
             )
             
-            if language == 'ru':
-                no_summary = 'Заключение не подготовлено'
-            elif language == 'uz_cyrl':
-                no_summary = 'Хулоса тайёрланмади'
-            else:
-                no_summary = 'Xulosa tayyorlanmadi'
-            summary = summary_result.get('response', '') if summary_result.get('success') else no_summary
+            summary = summary_result.get('response', '') if summary_result.get('success') else self._no_summary_text(language)
             
             return {
                 'success': True,
@@ -821,7 +732,8 @@ BATAFSIL XULOSA YOZ:
                 'winner': winner,
                 'summary': summary,
                 'total_participants': len(participants),
-                'analysis_depth': 'comprehensive'
+                'analysis_depth': 'comprehensive',
+                'prompt_version': COMPARE_SUMMARY.id
             }
             
         except Exception as e:
@@ -831,6 +743,109 @@ BATAFSIL XULOSA YOZ:
                 'error': str(e)
             }
     
+    def stream_compare_participants(self, participants: List[Dict[str, Any]], language: str = 'uz_latn') -> Iterator[Dict[str, Any]]:
+        """
+        Ishtirokchilarni solishtirish - xulosa oqim sifatida
+        
+        Yields:
+            {'type': 'ranking', ...} - reyting va solishtirma jadval (darhol)
+            {'type': 'summary', 'text': '...'} - xulosa bo'laklari
+            {'type': 'done', ...} - compare_participants bilan bir xil yakuniy natija
+        """
+        language = _normalize_language(language)
+        if len(participants) < 2:
+            yield {'type': 'error', **self.compare_participants(participants, language)}
+            return
+        
+        logger.info(f"{len(participants)} ta ishtirokchini oqimli solishtirish")
+        sorted_participants, winner, comparison_table = self._rank_participants(participants)
+        yield {
+            'type': 'ranking',
+            'ranking': sorted_participants,
+            'comparison_table': comparison_table,
+            'winner': winner,
+        }
+        
+        summary_prompt, system_prompt = self._build_compare_prompt(comparison_table, language)
+        chunks = []
+        try:
+            for chunk in llm_engine.stream_response(
+                summary_prompt,
+                system_prompt=system_prompt,
+                temperature=0.3,
+                max_tokens=4000,
+                caller='compare',
+                prompt_version=COMPARE_SUMMARY.id
+            ):
+                chunks.append(chunk)
+                yield {'type': 'summary', 'text': chunk}
+        except Exception as e:
+            logger.error(f"Xulosa oqimida xatolik: {str(e)}")
+        
+        yield {
+            'type': 'done',
+            'success': True,
+            'ranking': sorted_participants,
+            'comparison_table': comparison_table,
+            'winner': winner,
+            'summary': ''.join(chunks).strip() or self._no_summary_text(language),
+            'total_participants': len(participants),
+            'analysis_depth': 'comprehensive',
+            'prompt_version': COMPARE_SUMMARY.id
+        }
+    
+    def _no_summary_text(self, language: str) -> str:
+        """Xulosa tayyorlanmaganda qaytariladigan matn"""
+        if language == 'ru':
+            return 'Заключение не подготовлено'
+        elif language == 'uz_cyrl':
+            return 'Хулоса тайёрланмади'
+        return 'Xulosa tayyorlanmadi'
+    
+    def _rank_participants(self, participants: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Ishtirokchilarni ball bo'yicha saralash va solishtirma jadval tuzish"""
+        # Balllar bo'yicha saralash
+        sorted_participants = sorted(
+            participants, 
+            key=lambda x: x.get('total_weighted_score', 0), 
+            reverse=True
+        )
+        
+        # Reyting qo'shish
+        for i, p in enumerate(sorted_participants, 1):
+            p['rank'] = i
+        
+        # G'olib va tavsiya
+        winner = sorted_participants[0] if sorted_participants else None
+        
+        # Solishtirma jadval - BATAFSIL
+        comparison_table = []
+        for p in sorted_participants:
+            comparison_table.append({
+                'rank': p.get('rank'),
+                'name': p.get('participant_name'),
+                'score': p.get('total_weighted_score', 0),
+                'match_percentage': p.get('overall_match_percentage', 0),
+                'experience_score': p.get('experience_analysis', {}).get('experience_score', 0),
+                'location_score': p.get('location_analysis', {}).get('location_score', 0),
+                'service_score': p.get('service_offer_analysis', {}).get('service_score', 0),
+                'financial_score': p.get('financial_analysis', {}).get('price_score', 0),
+                'technical_score': p.get('technical_capabilities', {}).get('technical_score', 0),
+                'risk_level': p.get('risk_assessment', {}).get('overall_risk', p.get('risk_level', 'unknown')),
+                'strengths': p.get('strengths', [])[:3],
+                'weaknesses': p.get('weaknesses', [])[:3],
+                'recommendation': p.get('recommendation', '')[:150],
+                'final_verdict': p.get('final_verdict', '')
+            })
+        return sorted_participants, winner, comparison_table
+    
+    def _build_compare_prompt(self, comparison_table: List[Dict[str, Any]], language: str) -> Tuple[str, str]:
+        """Solishtirish xulosasi uchun prompt va system prompt yaratish"""
+        summary_prompt, system_prompt, _ = COMPARE_SUMMARY.render(
+            language, participants=json.dumps(comparison_table, ensure_ascii=False, indent=2)
+        )
+        return summary_prompt, system_prompt
+    
     def _calculate_weighted_score(self, scores: List[Dict[str, Any]], analysis: Dict[str, Any] = None) -> float:
         """Vaznli ballni hisoblash - turli manbalardan"""
         # Avval scores massividan hisoblashga urinish
@@ -1055,5 +1070,207 @@ BATAFSIL XULOSA YOZ:
         return self.tender_info
 
 
-# Global instance
-tender_analyzer = TenderAnalyzer()
+
+
+def _parse_llm_json(result: str) -> Dict[str, Any]:
+    """LLM javobidan JSON obyektini ajratib olish"""
+    json_match = re.search(r'\{[\s\S]*\}', result or '')
+    if not json_match:
+        raise ValueError("JSON topilmadi")
+    json_str = json_match.group()
+    json_str = re.sub(r',\s*}', '}', json_str)
+    json_str = re.sub(r',\s*]', ']', json_str)
+    json_str = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', json_str)
+    return json.loads(json_str)
+
+
+def _merge_requirements(requirement_lists: List[List[Dict[str, Any]]], similarity: float = 0.8) -> List[Dict[str, Any]]:
+    """
+    Qismlardan kelgan talablarni birlashtirish
+    
+    Nomi deyarli bir xil (so'z o'zaklari bo'yicha Jaccard >= similarity) talablar
+    bitta talabga qo'shiladi, ID lar qaytadan raqamlanadi.
+    """
+    merged: List[Dict[str, Any]] = []
+    signatures: List[set] = []
+    
+    for requirements in requirement_lists:
+        for req in requirements or []:
+            if not isinstance(req, dict) or not req.get('title'):
+                continue
+            signature = set(tokenize(req['title']))
+            duplicate = None
+            for index, existing in enumerate(signatures):
+                union = signature | existing
+                if union and len(signature & existing) / len(union) >= similarity:
+                    duplicate = index
+                    break
+            
+            if duplicate is None:
+                merged.append(dict(req))
+                signatures.append(signature)
+                continue
+            
+            existing_req = merged[duplicate]
+            existing_req['is_mandatory'] = bool(existing_req.get('is_mandatory')) or bool(req.get('is_mandatory'))
+            if len(req.get('description') or '') > len(existing_req.get('description') or ''):
+                existing_req['description'] = req['description']
+            try:
+                existing_req['weight'] = max(float(existing_req.get('weight', 0.5)), float(req.get('weight', 0.5)))
+            except (TypeError, ValueError):
+                pass
+    
+    for index, req in enumerate(merged, start=1):
+        req['id'] = f"REQ{index:03d}"
+    return merged
+
+
+def resolve_participant_names(raw_participants: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Ishtirokchilarga deterministik nom berish
+    
+    Matni bo'sh ishtirokchilar tashlab yuboriladi. Nomi bo'sh yoki takrorlangan
+    ishtirokchilar kirish tartibida 'Ishtirokchi N' deb nomlanadi.
+    
+    Args:
+        raw_participants: [(nom, matn), ...]
+    
+    Returns:
+        [{'name': ..., 'text': ...}, ...]
+    """
+    participant_names = set()
+    participant_counter = 1
+    jobs = []
+    for name, text in raw_participants:
+        if not (text or '').strip():
+            continue
+        name = (name or '').strip()
+        if not name or name in participant_names:
+            name = f'Ishtirokchi {participant_counter}'
+        participant_names.add(name)
+        participant_counter += 1
+        jobs.append({'name': name, 'text': text})
+    return jobs
+
+
+def run_full_analysis(
+    tender_text: str,
+    participants: List[Dict[str, Any]],
+    total_participants: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    To'liq tahlil: tender + barcha ishtirokchilar + solishtirish
+    
+    Args:
+        tender_text: Tender shartnoma matni
+        participants: resolve_participant_names natijasi
+        total_participants: Yuborilgan ishtirokchilar soni (bo'sh matnlilar bilan)
+        max_workers: Parallel ishtirokchi tahlillari soni
+        on_progress: Har bir bosqichda joriy natijalar bilan chaqiriladi
+    
+    Returns:
+        full_analysis endpointi formatidagi natijalar. Xatolikda success=False
+        va progress.step 'tender_error' yoki 'compare_error' bo'ladi.
+    """
+    if total_participants is None:
+        total_participants = len(participants)
+    
+    results = {
+        'success': True,
+        'tender_analysis': None,
+        'participants_analysis': [],
+        'partial_results': [],
+        'ranking': [],
+        'winner': None,
+        'summary': '',
+        'progress': {
+            'step': 'init',
+            'current': 0,
+            'total': 1,
+            'status': 'Tender tahlili boshlanmoqda'
+        }
+    }
+    progress_lock = threading.Lock()
+    
+    def _progress(step: str, current: int, total: int, status_text: str) -> None:
+        results['progress'] = {
+            'step': step,
+            'current': current,
+            'total': total,
+            'status': status_text
+        }
+        if on_progress:
+            on_progress(results)
+    
+    _progress('init', 0, 1, 'Tender tahlili boshlanmoqda')
+    
+    # 1. Tender tahlili
+    analyzer = TenderAnalyzer()
+    tender_result = analyzer.analyze_tender_document(tender_text)
+    if not tender_result['success']:
+        results['success'] = False
+        results['error'] = tender_result.get('error', 'Tender tahlilida xatolik')
+        _progress('tender_error', 1, 1, 'Tender tahlilida xatolik')
+        return results
+    
+    # To'liq tender tahlilini saqlaymiz (requirements va boshqa maydonlar bilan)
+    full_tender_analysis = tender_result['analysis']
+    tender_key = make_tender_key(tender_text)
+    full_tender_analysis['tender_key'] = tender_key
+    save_tender_analysis(tender_key, full_tender_analysis)
+    results['tender_analysis'] = full_tender_analysis
+    _progress('tender_analysis', 1, 1, 'Tender tahlili yakunlandi')
+    
+    # 2. Ishtirokchilar tahlili - bitta tender nusxasiga nisbatan parallel
+    skipped = total_participants - len(participants)
+    
+    def _on_participant(index: int, participant_result: Dict[str, Any]) -> None:
+        name = participants[index]['name']
+        if participant_result.get('success'):
+            _ensure_risk_level(participant_result['analysis'])
+        with progress_lock:
+            results['partial_results'].append({
+                'index': index,
+                'name': name,
+                'success': participant_result.get('success', False),
+                'analysis': participant_result.get('analysis'),
+                'error': participant_result.get('error'),
+            })
+            _progress('participant', skipped + len(results['partial_results']), total_participants, f'{name} tahlil qilindi')
+    
+    analyzer.restore_tender_analysis(full_tender_analysis)
+    participant_results = analyzer.analyze_participants_concurrently(
+        participants,
+        max_workers=max_workers,
+        on_result=_on_participant,
+    )
+    results['participants_analysis'] = [
+        r['analysis'] for r in participant_results if r.get('success')
+    ]
+    
+    # 3. Solishtirish
+    if len(results['participants_analysis']) < 2:
+        error_msg = 'Reyting yaratish uchun kamida 2 ta ishtirokchi kerak. Hozircha {} ta tahlil qilingan. Yana ishtirokchi qo\'shing.'.format(len(results['participants_analysis']))
+        results['success'] = False
+        results['error'] = error_msg
+        _progress('compare_error', total_participants, total_participants, error_msg)
+        return results
+    
+    _progress('compare', total_participants, total_participants, 'Ishtirokchilar solishtirilmoqda')
+    compare_result = analyzer.compare_participants(results['participants_analysis'])
+    if compare_result['success']:
+        results['ranking'] = compare_result['ranking']
+        results['winner'] = compare_result['winner']
+        results['summary'] = compare_result['summary']
+        _progress('done', total_participants, total_participants, 'Tahlil yakunlandi')
+    else:
+        _progress('compare_error', total_participants, total_participants, compare_result.get('error', 'Solishtirishda xatolik'))
+    return results
+
+
+def _ensure_risk_level(analysis: Dict[str, Any]) -> None:
+    """risk_level maydoni har doim mavjud bo'lishini ta'minlash"""
+    if 'risk_level' not in analysis:
+        analysis['risk_level'] = analysis.get('risk_assessment', {}).get('overall_risk', 'unknown')
@@ -0,0 +1,363 @@
+"""
+Hujjat bo'laklari vektor ombori
+
+Embeddinglar DocumentChunk jadvalida float32 baytlari ko'rinishida saqlanadi.
+Qidiruv uchun jarayon ichida NumPy indeksi quriladi:
+    - kichik to'plamlarda aniq (brute-force) kosinus qidiruv
+    - katta to'plamlarda IVF (k-means klasterlari bo'yicha taxminiy qidiruv)
+Indeks tender/manba bo'yicha keshlanadi va bo'laklar o'zgarganda qayta quriladi.
+"""
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+
+def encode_vector(vector: Sequence[float]) -> bytes:
+    """Vektorni ixcham float32 baytlariga aylantirish"""
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    """float32 baytlaridan vektorni tiklash"""
+    return np.frombuffer(bytes(data), dtype=np.float32)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """Qatorlarni L2 bo'yicha normallashtirish (kosinus = skalyar ko'paytma)"""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class VectorIndex:
+    """Kosinus o'xshashlik indeksi: kichik to'plamda aniq, kattasida IVF"""
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        vectors: np.ndarray,
+        ivf_threshold: Optional[int] = None,
+        nprobe: Optional[int] = None,
+    ):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(self.ids), -1))
+        self.nprobe = nprobe or getattr(settings, 'VECTOR_INDEX_NPROBE', 8)
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []
+
+        threshold = ivf_threshold or getattr(settings, 'VECTOR_INDEX_IVF_THRESHOLD', 2000)
+        if len(self.ids) >= threshold:
+            self._build_ivf()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _build_ivf(self, iterations: int = 10) -> None:
+        """Sferik k-means bilan IVF ro'yxatlarini qurish"""
+        count = len(self.ids)
+        nlist = max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(0)
+        centroids = self.vectors[rng.choice(count, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.argmax(self.vectors @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = self.vectors[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        assignment = np.argmax(self.vectors @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.lists = [np.flatnonzero(assignment == cluster) for cluster in range(nlist)]
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            return np.arange(len(self.ids))
+        probe = np.argsort(-(self.centroids @ query))[:self.nprobe]
+        return np.concatenate([self.lists[cluster] for cluster in probe])
+
+    def search(self, query: Sequence[float], top_k: int = 5) -> List[Tuple[int, float]]:
+        """Eng o'xshash vektorlar: [(id, kosinus o'xshashlik), ...]"""
+        if not len(self.ids):
+            return []
+
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        candidates = self._candidates(query)
+        if not len(candidates):
+            return []
+
+        scores = self.vectors[candidates] @ query
+        k = min(top_k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[candidates[i]]), float(scores[i])) for i in top]
+
+
+class ChunkVectorStore:
+    """DocumentChunk jadvali ustidagi vektor ombori va o'xshashlik qidiruvi"""
+
+    def __init__(self):
+        self._indexes: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _model():
+        from apps.participants.models import DocumentChunk
+        return DocumentChunk
+
+    def _build_chunks(
+        self,
+        tender_id: int,
+        source: str,
+        texts: List[str],
+        embeddings: List[Sequence[float]],
+        embedding_model: str = '',
+        tender_document=None,
+        participant_document=None,
+        start_index: int = 0,
+    ) -> list:
+        if len(texts) != len(embeddings):
+            raise ValueError("Bo'laklar va embeddinglar soni mos emas")
+
+        DocumentChunk = self._model()
+        return [
+            DocumentChunk(
+                tender_id=tender_id,
+                source=source,
+                tender_document=tender_document,
+                participant_document=participant_document,
+                chunk_index=start_index + index,
+                text=text,
+                content_hash=hashlib.sha256(text.encode('utf-8')).hexdigest(),
+                embedding=encode_vector(vector),
+                dimensions=len(vector),
+                embedding_model=embedding_model or '',
+            )
+            for index, (text, vector) in enumerate(zip(texts, embeddings))
+        ]
+
+    def _delete_document_chunks(self, tender_document=None, participant_document=None) -> None:
+        DocumentChunk = self._model()
+        if tender_document is not None:
+            DocumentChunk.objects.filter(tender_document=tender_document).delete()
+        if participant_document is not None:
+            DocumentChunk.objects.filter(participant_document=participant_document).delete()
+
+    def add_chunks(
+        self,
+        tender_id: int,
+        source: str,
+        texts: List[str],
+        embeddings: List[Sequence[float]],
+        embedding_model: str = '',
+        tender_document=None,
+        participant_document=None,
+    ) -> int:
+        """
+        Hujjat bo'laklarini vektorlari bilan saqlash
+
+        Hujjat qayta ishlanganda uning eski bo'laklari almashtiriladi.
+        """
+        chunks = self._build_chunks(
+            tender_id, source, texts, embeddings, embedding_model, tender_document, participant_document,
+        )
+
+        with transaction.atomic():
+            self._delete_document_chunks(tender_document, participant_document)
+            self._model().objects.bulk_create(chunks)
+
+        self.invalidate(tender_id)
+        return len(chunks)
+
+    def chunk_writer(
+        self,
+        tender_id: int,
+        source: str,
+        embed: Callable[[List[str]], List[Sequence[float]]],
+        embedding_model: str = '',
+        tender_document=None,
+        participant_document=None,
+    ) -> 'ChunkWriter':
+        """Hujjat bo'laklarini paket-paket embedding qilib yozuvchi"""
+        return ChunkWriter(self, tender_id, source, embed, embedding_model, tender_document, participant_document)
+
+    def invalidate(self, tender_id: Optional[int] = None) -> None:
+        """Keshlangan indekslarni bekor qilish"""
+        with self._lock:
+            if tender_id is None:
+                self._indexes.clear()
+            else:
+                for key in [key for key in self._indexes if key[0] == tender_id]:
+                    del self._indexes[key]
+
+    def _queryset(self, tender_id: Optional[int], source: Optional[str], dimensions: int):
+        queryset = self._model().objects.filter(dimensions=dimensions)
+        if tender_id is not None:
+            queryset = queryset.filter(tender_id=tender_id)
+        if source:
+            queryset = queryset.filter(source=source)
+        return queryset
+
+    def get_index(self, tender_id: Optional[int], source: Optional[str], dimensions: int) -> VectorIndex:
+        """Tender/manba uchun indeksni olish (o'zgarmagan bo'lsa keshdan)"""
+        queryset = self._queryset(tender_id, source, dimensions)
+        signature = tuple(queryset.aggregate(count=Count('id'), last=Max('id')).values())
+        key = (tender_id, source, dimensions)
+
+        with self._lock:
+            cached = self._indexes.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        rows = list(queryset.values_list('id', 'embedding'))
+        ids = [row[0] for row in rows]
+        vectors = np.stack([decode_vector(row[1]) for row in rows]) if rows else np.zeros((0, dimensions), dtype=np.float32)
+        index = VectorIndex(ids, vectors)
+
+        with self._lock:
+            self._indexes[key] = (signature, index)
+        logger.info(f"Vektor indeksi qurildi: {len(index)} ta bo'lak (tender={tender_id}, manba={source})")
+        return index
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        tender_id: Optional[int] = None,
+        source: Optional[str] = None,
+        top_k: int = 5,
+        min_score: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        """Vektor bo'yicha eng o'xshash bo'laklarni topish"""
+        index = self.get_index(tender_id, source, len(query_vector))
+        hits = [(chunk_id, score) for chunk_id, score in index.search(query_vector, top_k) if score >= min_score]
+        if not hits:
+            return []
+
+        chunks = self._model().objects.in_bulk([chunk_id for chunk_id, _ in hits])
+        return [
+            {
+                'chunk_id': chunk_id,
+                'score': round(score, 4),
+                'text': chunks[chunk_id].text,
+                'source': chunks[chunk_id].source,
+                'chunk_index': chunks[chunk_id].chunk_index,
+                'tender_document_id': chunks[chunk_id].tender_document_id,
+                'participant_document_id': chunks[chunk_id].participant_document_id,
+            }
+            for chunk_id, score in hits
+            if chunk_id in chunks
+        ]
+
+    def search_text(self, text: str, **kwargs) -> List[Dict[str, Any]]:
+        """Matn bo'yicha qidiruv - so'rov matni embedding qilinadi"""
+        from .services import embedding_service
+
+        query_vector = embedding_service.create_embeddings([text])[0]
+        return self.search(query_vector, **kwargs)
+
+    def find_duplicate_chunks(self, tender_id: int, threshold: float = 0.95, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Turli ishtirokchilar hujjatlaridagi deyarli bir xil bo'laklarni topish
+        (takliflarni ko'chirish/kelishuvni aniqlash uchun)
+        """
+        rows = list(
+            self._model().objects
+            .filter(tender_id=tender_id, source='participant')
+            .values_list('id', 'embedding', 'participant_document__tender_participant_id')
+        )
+        if len(rows) < 2:
+            return []
+
+        by_dimension: Dict[int, list] = {}
+        for row in rows:
+            vector = decode_vector(row[1])
+            by_dimension.setdefault(len(vector), []).append((row[0], vector, row[2]))
+
+        duplicates = []
+        for items in by_dimension.values():
+            owners = {chunk_id: owner for chunk_id, _, owner in items}
+            index = VectorIndex([item[0] for item in items], np.stack([item[1] for item in items]))
+            for chunk_id, vector, owner in items:
+                for other_id, score in index.search(vector, top_k + 1):
+                    if other_id <= chunk_id or owners[other_id] == owner or score < threshold:
+                        continue
+                    duplicates.append({
+                        'chunk_id': chunk_id,
+                        'other_chunk_id': other_id,
+                        'tender_participant_id': owner,
+                        'other_tender_participant_id': owners[other_id],
+                        'score': round(score, 4),
+                    })
+
+        duplicates.sort(key=lambda item: item['score'], reverse=True)
+        return duplicates
+
+
+class ChunkWriter:
+    """
+    Hujjat bo'laklarini oqim ko'rinishida yozish
+
+    Har bir paket kelishi bilan embedding qilinadi va saqlanadi, shuning uchun
+    butun hujjatning bo'laklari yoki vektorlari xotirada to'planmaydi.
+    Birinchi paketda hujjatning eski bo'laklari o'chiriladi.
+    """
+
+    def __init__(
+        self,
+        store: 'ChunkVectorStore',
+        tender_id: int,
+        source: str,
+        embed: Callable[[List[str]], List[Sequence[float]]],
+        embedding_model: str = '',
+        tender_document=None,
+        participant_document=None,
+    ):
+        self.store = store
+        self.tender_id = tender_id
+        self.source = source
+        self.embed = embed
+        self.embedding_model = embedding_model
+        self.tender_document = tender_document
+        self.participant_document = participant_document
+        self.count = 0
+        self._started = False
+
+    def add(self, texts: List[str]) -> int:
+        """Bo'laklar paketini embedding qilib saqlash"""
+        if not texts:
+            return 0
+
+        embeddings = self.embed(texts)
+        chunks = self.store._build_chunks(
+            self.tender_id, self.source, texts, embeddings, self.embedding_model,
+            self.tender_document, self.participant_document, start_index=self.count,
+        )
+
+        DocumentChunk = self.store._model()
+        with transaction.atomic():
+            if not self._started:
+                self.store._delete_document_chunks(self.tender_document, self.participant_document)
+                self._started = True
+            DocumentChunk.objects.bulk_create(chunks)
+
+        self.count += len(chunks)
+        return len(chunks)
+
+    def close(self) -> int:
+        """Yozishni yakunlash va tender indekslarini bekor qilish"""
+        if self._started:
+            self.store.invalidate(self.tender_id)
+        return self.count
+
+
+# Global vektor ombori
+vector_store = ChunkVectorStore()
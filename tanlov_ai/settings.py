@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -232,6 +233,138 @@ OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3:8b')
 
+# LLM javoblari keshi (lokal LRU + umumiy Django cache)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 512))
+LLM_CACHE_ALIAS = os.getenv('LLM_CACHE_ALIAS', 'default')
+
+# Django cache - REDIS_CACHE_URL berilsa umumiy Redis kesh ishlatiladi
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL'),
+        }
+    }
+
+# LLM HTTP ulanishlari: pul hajmi parallel so'rovlar soniga mos bo'lishi kerak
+# (PARTICIPANT_ANALYSIS_MAX_WORKERS, TENDER_MAP_MAX_WORKERS, EMBEDDING_MAX_WORKERS).
+# O'qish timeouti = TIMEOUT_BASE + max_tokens / TOKENS_PER_SECOND (MAX_TIMEOUT gacha)
+LLM_HTTP_POOL_SIZE = int(os.getenv('LLM_HTTP_POOL_SIZE', 10))
+LLM_CONNECT_TIMEOUT = int(os.getenv('LLM_CONNECT_TIMEOUT', 5))
+LLM_TIMEOUT_BASE = int(os.getenv('LLM_TIMEOUT_BASE', 15))
+LLM_TOKENS_PER_SECOND = int(os.getenv('LLM_TOKENS_PER_SECOND', 20))
+LLM_MAX_TIMEOUT = int(os.getenv('LLM_MAX_TIMEOUT', 600))
+
+# Asinxron LLM dvigateli: bitta event loop'da bir vaqtda bajariladigan generatsiyalar
+LLM_ASYNC_POOL_SIZE = int(os.getenv('LLM_ASYNC_POOL_SIZE', 50))
+LLM_ASYNC_MAX_CONCURRENCY = int(os.getenv('LLM_ASYNC_MAX_CONCURRENCY', 50))
+
+# Promptlar model kontekst oynasiga token bo'yicha sig'diriladi (javob uchun max_tokens ajratiladi).
+# Oyna hajmlari tokenlarda: {"model": tokenlar}. SAFETY_RATIO - tokenizatorlar farqi uchun zaxira
+LLM_CONTEXT_WINDOWS = json.loads(os.getenv('LLM_CONTEXT_WINDOWS', '{}')) or {
+    'gpt-4o-mini': 128000,
+    'gpt-4o': 128000,
+    'llama3:8b': 8192,
+}
+LLM_DEFAULT_CONTEXT_WINDOW = int(os.getenv('LLM_DEFAULT_CONTEXT_WINDOW', 8192))
+LLM_PROMPT_SAFETY_RATIO = float(os.getenv('LLM_PROMPT_SAFETY_RATIO', 0.05))
+
+# LLM metrikalari (tokenlar, kechikish, narx) - LLMUsageStat jadvali va /api/metrics/
+LLM_METRICS_ENABLED = os.getenv('LLM_METRICS_ENABLED', 'True') == 'True'
+# Kesh mosliklari xotirada to'planib, shu songa yetganda yoki interval (soniya) o'tganda yoziladi
+LLM_METRICS_CACHE_HIT_BATCH = int(os.getenv('LLM_METRICS_CACHE_HIT_BATCH', 50))
+LLM_METRICS_FLUSH_INTERVAL = int(os.getenv('LLM_METRICS_FLUSH_INTERVAL', 60))
+# Narxlar 1M token uchun USD: {"model": [kirish, chiqish]}
+LLM_TOKEN_PRICES = json.loads(os.getenv('LLM_TOKEN_PRICES', '{}')) or {
+    'gpt-4o-mini': [0.15, 0.60],
+    'gpt-4o': [2.50, 10.00],
+}
+
+# LLM provayderlari uchun circuit breaker: ketma-ket FAILURE_THRESHOLD ta xatolik yoki
+# oxirgi WINDOW ta so'rovda ERROR_RATE ulushidagi xatolik provayderni COOLDOWN soniyaga
+# o'chiradi; sinov muvaffaqiyatsiz bo'lsa muddat MAX_COOLDOWN gacha ikki barobar oshadi
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', 3))
+LLM_BREAKER_ERROR_RATE = float(os.getenv('LLM_BREAKER_ERROR_RATE', 0.5))
+LLM_BREAKER_WINDOW = int(os.getenv('LLM_BREAKER_WINDOW', 20))
+LLM_BREAKER_COOLDOWN = int(os.getenv('LLM_BREAKER_COOLDOWN', 30))
+LLM_BREAKER_MAX_COOLDOWN = int(os.getenv('LLM_BREAKER_MAX_COOLDOWN', 600))
+# half_open sinovi natijasiz qolsa, shu muddatdan keyin yangi sinovga ruxsat (soniyalarda)
+LLM_BREAKER_TRIAL_TIMEOUT = int(os.getenv('LLM_BREAKER_TRIAL_TIMEOUT', 180))
+
+# full_analysis: bir vaqtda tahlil qilinadigan ishtirokchilar soni
+PARTICIPANT_ANALYSIS_MAX_WORKERS = int(os.getenv('PARTICIPANT_ANALYSIS_MAX_WORKERS', 4))
+
+# OpenAI embedding paketlari: bitta so'rovdagi matnlar soni va taxminiy token limiti
+# (API cheklovi: 2048 ta matn, 300k token), parallel so'rovlar va qayta urinishlar soni
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 256))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv('EMBEDDING_BATCH_MAX_TOKENS', 250000))
+EMBEDDING_MAX_WORKERS = int(os.getenv('EMBEDDING_MAX_WORKERS', 4))
+EMBEDDING_BATCH_RETRIES = int(os.getenv('EMBEDDING_BATCH_RETRIES', 3))
+
+# Vektor indeksi: shu sondan ko'p bo'lakda IVF (taxminiy) qidiruv ishlatiladi,
+# NPROBE - qidiruvda ko'riladigan klasterlar soni
+VECTOR_INDEX_IVF_THRESHOLD = int(os.getenv('VECTOR_INDEX_IVF_THRESHOLD', 2000))
+VECTOR_INDEX_NPROBE = int(os.getenv('VECTOR_INDEX_NPROBE', 8))
+
+# Ishtirokchi tahlili: hujjatdan talablarga mos parchalarni tanlash (retrieval).
+# CONTEXT_TOKENS - hujjat uchun token chegarasi (katta oynali modellarda ham parchalar
+# tanlanadi, prompt provayderdan qat'i nazar bir xil), TOP_K - har bir talab uchun parchalar soni
+RAG_CONTEXT_TOKENS = int(os.getenv('RAG_CONTEXT_TOKENS', 6000))
+RAG_TOP_K = int(os.getenv('RAG_TOP_K', 3))
+RAG_PASSAGE_CHARS = int(os.getenv('RAG_PASSAGE_CHARS', 800))
+
+# Uzun tender hujjatlari map-reduce usulida tahlil qilinadi: REDUCE_TOKENS dan (yoki eng
+# kichik modelning tender prompti byudjetidan) ko'p tokenli matn CHUNK_CHARS hajmdagi
+# qismlarga bo'linib, MAX_WORKERS ta parallel so'rov bilan tahlil qilinadi
+TENDER_MAP_REDUCE_TOKENS = int(os.getenv('TENDER_MAP_REDUCE_TOKENS', 24000))
+TENDER_MAP_CHUNK_CHARS = int(os.getenv('TENDER_MAP_CHUNK_CHARS', 8000))
+TENDER_MAP_MAX_WORKERS = int(os.getenv('TENDER_MAP_MAX_WORKERS', 4))
+
+# PDF sahifalarini parallel ajratish: shu sondan ko'p sahifali hujjatlar
+# PAGES_PER_TASK sahifalik guruhlarda WORKERS ta jarayonda parse qilinadi (0 - CPU soniga qarab)
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 32))
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 16))
+PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', 0))
+
+# OCR: faqat matn qatlami bo'lmagan sahifalar (MIN_TEXT_CHARS dan kam belgi) OCR qilinadi.
+# PAGE_TIMEOUT - bitta rasm uchun Tesseract vaqt chegarasi (soniya), DPI - sahifani
+# pdftoppm bilan rasmga aylantirish aniqligi
+OCR_ENABLED = os.getenv('OCR_ENABLED', 'True').lower() == 'true'
+OCR_LANGUAGES = os.getenv('OCR_LANGUAGES', 'uzb+rus+eng')
+OCR_MIN_TEXT_CHARS = int(os.getenv('OCR_MIN_TEXT_CHARS', 20))
+OCR_PAGE_TIMEOUT = int(os.getenv('OCR_PAGE_TIMEOUT', 60))
+OCR_MAX_WORKERS = int(os.getenv('OCR_MAX_WORKERS', 2))
+OCR_DPI = int(os.getenv('OCR_DPI', 300))
+OCR_CACHE_TTL = int(os.getenv('OCR_CACHE_TTL', 30 * 24 * 3600))
+
+# Hujjat yaroqliligi: mahalliy klassifikator kamida ACCEPT_TERMS ta turli kalit so'z
+# topsa qabul qiladi, REJECT_TERMS tadan kam bo'lsa rad etadi. Oraliqdagi hujjatlar
+# LLM_FALLBACK yoqilgan bo'lsa LLM orqali tekshiriladi
+VALIDITY_MIN_WORDS = int(os.getenv('VALIDITY_MIN_WORDS', 20))
+VALIDITY_ACCEPT_TERMS = int(os.getenv('VALIDITY_ACCEPT_TERMS', 6))
+VALIDITY_REJECT_TERMS = int(os.getenv('VALIDITY_REJECT_TERMS', 1))
+VALIDITY_LLM_FALLBACK = os.getenv('VALIDITY_LLM_FALLBACK', 'True').lower() == 'true'
+
+# Yuklangan fayllardan ajratilgan matnni SHA-256 xesh bo'yicha bazada keshlash
+EXTRACTION_CACHE_ENABLED = os.getenv('EXTRACTION_CACHE_ENABLED', 'True').lower() == 'true'
+
+# Tender korrupsiya tahlili keshi (tender va ishtirokchilar/hujjatlar versiyasi bo'yicha, soniyalarda)
+FRAUD_ANALYSIS_CACHE_TTL = int(os.getenv('FRAUD_ANALYSIS_CACHE_TTL', 3600))
+
+# Narx anomaliyalari: tender turi bo'yicha tarixiy narx/byudjet bazasi
+PRICE_BASELINE_MIN_SAMPLES = int(os.getenv('PRICE_BASELINE_MIN_SAMPLES', 20))
+PRICE_BASELINE_CACHE_TTL = int(os.getenv('PRICE_BASELINE_CACHE_TTL', 24 * 3600))
+PRICE_ROBUST_Z_THRESHOLD = float(os.getenv('PRICE_ROBUST_Z_THRESHOLD', 3.5))
+
+# Tender tahlillari ombori (tender_key bo'yicha, soniyalarda)
+TENDER_ANALYSIS_STORE_TTL = int(os.getenv('TENDER_ANALYSIS_STORE_TTL', 24 * 3600))
+
+# Fon tahlil vazifalari holati saqlanadigan muddat (soniyalarda).
+# Holat bazada (AnalysisJob) saqlanadi - web va Celery jarayonlari uchun umumiy
+ANALYSIS_JOB_TTL = int(os.getenv('ANALYSIS_JOB_TTL', 24 * 3600))
+
 # File Upload Configuration
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
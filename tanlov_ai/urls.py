@@ -2,11 +2,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.db import connection
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from apps.users.permissions import IsAdmin
 
 
 def health_check(request):
@@ -156,6 +157,15 @@ def system_status(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def llm_metrics(request):
+    """LLM chaqiruvlari metrikalari (Prometheus matn formati) - faqat administrator uchun"""
+    from core.llm_metrics import render_prometheus
+    
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     
@@ -163,6 +173,7 @@ urlpatterns = [
     path('api/health/', health_check, name='health-check'),
     path('api/stats/', dashboard_stats, name='dashboard-stats'),
     path('api/status/', system_status, name='system-status'),
+    path('api/metrics/', llm_metrics, name='llm-metrics'),
     path('api/', api_info, name='api-info'),
     
     # OpenAPI Schema va Dokumentatsiya
@@ -155,3 +155,199 @@ class TestExport:
         response = api_client.post('/api/evaluations/download-excel/', data, format='json')
         assert response.status_code == status.HTTP_200_OK
         assert 'spreadsheet' in response['Content-Type']
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFullAnalysisJob:
+    """Fon to'liq tahlil vazifasi testlari"""
+
+    @pytest.fixture
+    def fake_llm(self, monkeypatch):
+        from core.tender_analyzer import TenderAnalyzer
+
+        def fake_tender(self, text, metadata=None):
+            return {'success': True, 'analysis': {
+                'tender_purpose': 'Test tender',
+                'requirements': [{'id': 'REQ001', 'title': 'Tajriba', 'weight': 0.5}],
+            }}
+
+        def fake_participant(self, name, text, metadata=None):
+            return {'success': True, 'analysis': {
+                'participant_name': name,
+                'total_weighted_score': len(text),
+            }}
+
+        def fake_compare(self, participants, language='uz_latn'):
+            ranking = sorted(participants, key=lambda p: p['total_weighted_score'], reverse=True)
+            return {'success': True, 'ranking': ranking, 'winner': ranking[0], 'summary': 'Xulosa'}
+
+        monkeypatch.setattr(TenderAnalyzer, 'analyze_tender_document', fake_tender)
+        monkeypatch.setattr(TenderAnalyzer, 'analyze_participant', fake_participant)
+        monkeypatch.setattr(TenderAnalyzer, 'compare_participants', fake_compare)
+
+    def test_job_reports_progress_and_result(self, fake_llm):
+        from apps.evaluations.tasks import create_analysis_job, get_analysis_job, run_full_analysis_job
+
+        job = create_analysis_job(total_participants=2)
+        participants = [{'name': 'A', 'text': 'qisqa'}, {'name': 'B', 'text': 'uzunroq matn'}]
+        run_full_analysis_job(job['job_id'], 'tender matni', participants, 2)
+
+        job = get_analysis_job(job['job_id'])
+        assert job['status'] == 'completed'
+        assert job['progress']['step'] == 'done'
+        assert sorted(p['name'] for p in job['partial_results']) == ['A', 'B']
+        assert job['result']['winner']['participant_name'] == 'B'
+        assert [p['participant_name'] for p in job['result']['participants_analysis']] == ['A', 'B']
+
+    def test_job_state_is_stored_in_database(self, settings):
+        from django.core.cache import cache
+        from apps.evaluations.models import AnalysisJob
+        from apps.evaluations.tasks import create_analysis_job, get_analysis_job, update_analysis_job
+
+        job = create_analysis_job(total_participants=3)
+        cache.clear()
+        update_analysis_job(job['job_id'], status='running', progress={'step': 'participants', 'current': 1})
+
+        job = get_analysis_job(job['job_id'])
+        assert job['status'] == 'running'
+        assert job['progress']['current'] == 1
+        assert AnalysisJob.objects.get(job_id=job['job_id']).status == 'running'
+
+        settings.ANALYSIS_JOB_TTL = -1
+        assert get_analysis_job(job['job_id']) is None
+
+    def test_submit_and_poll(self, admin_user, monkeypatch):
+        from apps.evaluations import analysis_views
+
+        queued = []
+        monkeypatch.setattr(
+            analysis_views.run_full_analysis_job, 'apply_async',
+            lambda args, task_id: queued.append((args, task_id))
+        )
+        client = APIClient()
+        client.force_authenticate(admin_user)
+
+        response = client.post('/api/evaluations/full-analysis/jobs/', {
+            'tender_text': 'tender matni',
+            'participants': [{'name': 'A', 'text': 'matn'}, {'name': '', 'text': 'matn'}],
+        }, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job_id = response.data['job_id']
+        assert queued[0][1] == job_id
+        assert [p['name'] for p in queued[0][0][2]] == ['A', 'Ishtirokchi 2']
+
+        response = client.get(f'/api/evaluations/full-analysis/jobs/{job_id}/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == 'queued'
+
+    def test_job_visible_only_to_owner(self, admin_user):
+        from apps.evaluations.tasks import create_analysis_job
+
+        owner = User.objects.create_user(username='egasi', password='x', role=UserRole.OPERATOR)
+        other = User.objects.create_user(username='boshqa', password='x', role=UserRole.OPERATOR)
+        job = create_analysis_job(total_participants=1, user=owner)
+        url = f"/api/evaluations/full-analysis/jobs/{job['job_id']}/"
+
+        client = APIClient()
+        client.force_authenticate(other)
+        assert client.get(url).status_code == status.HTTP_404_NOT_FOUND
+        client.force_authenticate(owner)
+        assert client.get(url).status_code == status.HTTP_200_OK
+        client.force_authenticate(admin_user)
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+    def test_unknown_job(self, admin_user):
+        client = APIClient()
+        client.force_authenticate(admin_user)
+        response = client.get('/api/evaluations/full-analysis/jobs/mavjud-emas/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestExtractionCache:
+    """Fayl matni keshi testlari"""
+
+    def test_repeat_upload_skips_parsing(self, monkeypatch):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from apps.evaluations import analysis_views
+        from apps.evaluations.models import ExtractedDocumentText
+
+        calls = []
+        original = analysis_views._parse_uploaded_file
+
+        def counting_parse(file, file_type):
+            calls.append(file.name)
+            return original(file, file_type)
+
+        monkeypatch.setattr(analysis_views, '_parse_uploaded_file', counting_parse)
+        content = "Tender talablari: 5 yil tajriba".encode('utf-8')
+
+        first = analysis_views.extract_document(SimpleUploadedFile('tender.txt', content))
+        second = analysis_views.extract_document(SimpleUploadedFile('boshqa_nom.txt', content))
+
+        assert first['text'] == second['text'] == "Tender talablari: 5 yil tajriba"
+        assert first['cached'] is False
+        assert second['cached'] is True
+        assert calls == ['tender.txt']
+        assert ExtractedDocumentText.objects.get().hit_count == 1
+
+    def test_extractor_version_change_reparses(self, monkeypatch):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from core import services
+        from apps.evaluations.analysis_views import extract_document
+        from apps.evaluations.models import ExtractedDocumentText
+
+        content = b'Tender talablari'
+        assert extract_document(SimpleUploadedFile('a.txt', content))['cached'] is False
+        assert extract_document(SimpleUploadedFile('a.txt', content))['cached'] is True
+
+        monkeypatch.setattr(services, 'EXTRACTOR_VERSION', services.EXTRACTOR_VERSION + 1)
+        assert extract_document(SimpleUploadedFile('a.txt', content))['cached'] is False
+        assert ExtractedDocumentText.objects.count() == 2
+
+    def test_pdf_version_tracks_ocr_settings(self, settings):
+        from core.services import extraction_version
+
+        settings.OCR_LANGUAGES = 'uzb+rus'
+        before = extraction_version('.pdf')
+        settings.OCR_LANGUAGES = 'uzb+rus+eng'
+        assert extraction_version('.pdf') != before
+        assert extraction_version('.txt') == extraction_version('.docx')
+        settings.OCR_ENABLED = False
+        assert 'ocr-off' in extraction_version('.pdf')
+
+    def test_batch_parses_in_pool_and_caches_on_request_thread(self, monkeypatch):
+        import threading
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from apps.evaluations import analysis_views
+        from apps.evaluations.models import ExtractedDocumentText
+
+        analysis_views.extract_document(SimpleUploadedFile('a.txt', b'birinchi'))
+        threads = []
+        original = analysis_views._parse_uploaded_file
+
+        def recording_parse(file, file_type):
+            threads.append(threading.current_thread())
+            return original(file, file_type)
+
+        monkeypatch.setattr(analysis_views, '_parse_uploaded_file', recording_parse)
+        results = analysis_views.extract_documents([
+            SimpleUploadedFile('a.txt', b'birinchi'),
+            SimpleUploadedFile('b.txt', b'ikkinchi'),
+            SimpleUploadedFile('c.txt', b'uchinchi'),
+        ], max_workers=2)
+
+        assert [r['text'] for r in results] == ['birinchi', 'ikkinchi', 'uchinchi']
+        assert [r['cached'] for r in results] == [True, False, False]
+        assert len(threads) == 2 and threading.main_thread() not in threads
+        # Pul oqimlari bazaga yozmaydi - yozuvlar so'rov oqimida saqlangan
+        assert ExtractedDocumentText.objects.count() == 3
+
+    def test_different_content_is_parsed(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from apps.evaluations.analysis_views import extract_document
+
+        extract_document(SimpleUploadedFile('a.txt', b'birinchi'))
+        result = extract_document(SimpleUploadedFile('a.txt', b'ikkinchi'))
+        assert result['cached'] is False
+        assert result['text'] == 'ikkinchi'
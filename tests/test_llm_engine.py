@@ -0,0 +1,487 @@
+"""
+LLM dvigateli testlari
+"""
+import asyncio
+import time
+import pytest
+from core.async_llm_engine import AsyncHybridLLMEngine
+from core.circuit_breaker import CircuitBreaker
+from core.http_clients import get_http_session, scaled_timeout
+from core.llm_engine import HybridLLMEngine, OllamaProvider
+from core.llm_cache import LLMResponseCache, LocalLRUCache, make_cache_key
+from core.json_stream import IncrementalJSONAssembler
+from core import llm_metrics
+from core.llm_metrics import flush_cache_hits, render_prometheus, token_cost
+
+
+class FakeProvider:
+    """Soxta provayder - chaqiruvlar sonini sanaydi"""
+
+    def __init__(self, model='fake-model', fail=False):
+        self.model = model
+        self.fail = fail
+        self.calls = 0
+        self.probes = 0
+
+    def generate_response(self, prompt, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError('provayder ishlamayapti')
+        return f'javob: {prompt}'
+
+    def stream_response(self, prompt, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError('provayder ishlamayapti')
+        yield 'javob: '
+        yield prompt
+
+    def is_available(self):
+        self.probes += 1
+        return not self.fail
+
+
+@pytest.fixture
+def engine(monkeypatch, settings):
+    settings.LLM_METRICS_ENABLED = False
+    monkeypatch.setattr(HybridLLMEngine, '_initialize_providers', lambda self: None)
+    engine = HybridLLMEngine()
+    engine.cache = LLMResponseCache(enabled=True, ttl=60, max_entries=10, shared_alias='')
+    return engine
+
+
+class TestLLMResponseCache:
+    """LLM javob keshi testlari"""
+
+    def test_cache_key_normalizes_whitespace(self):
+        key1 = make_cache_key('Salom   dunyo\n\n', 'gpt', temperature=0.2)
+        key2 = make_cache_key('  Salom dunyo', 'gpt', temperature=0.2)
+        assert key1 == key2
+
+    def test_cache_key_depends_on_params(self):
+        base = make_cache_key('Salom', 'gpt', temperature=0.2)
+        assert base != make_cache_key('Salom', 'gpt', temperature=0.3)
+        assert base != make_cache_key('Salom', 'llama', temperature=0.2)
+        assert base != make_cache_key('Salom', 'gpt', temperature=0.2, system_prompt='JSON')
+
+    def test_lru_eviction(self):
+        cache = LocalLRUCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+
+    def test_ttl_expiry(self):
+        cache = LocalLRUCache(max_entries=2, ttl=-1)
+        cache.set('a', 1)
+        assert cache.get('a') is None
+
+    def test_repeat_request_served_from_cache(self, engine):
+        provider = FakeProvider()
+        engine.providers = [('fake', provider)]
+
+        first = engine.generate_response('tender', temperature=0.2)
+        second = engine.generate_response('tender', temperature=0.2)
+
+        assert provider.calls == 1
+        assert first['cached'] is False
+        assert second['cached'] is True
+        assert second['response'] == first['response']
+        stats = engine.cache.get_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_use_cache_false_bypasses_cache(self, engine):
+        provider = FakeProvider()
+        engine.providers = [('fake', provider)]
+
+        engine.generate_response('tender')
+        engine.generate_response('tender', use_cache=False)
+        assert provider.calls == 2
+
+    def test_prompt_version_changes_cache_key(self, engine):
+        provider = FakeProvider()
+        engine.providers = [('fake', provider)]
+
+        first = engine.generate_response('tender', prompt_version='tender_analysis:v2')
+        assert first['prompt_version'] == 'tender_analysis:v2'
+        assert engine.generate_response('tender', prompt_version='tender_analysis:v2')['cached'] is True
+        assert engine.generate_response('tender', prompt_version='tender_analysis:v3')['cached'] is False
+        assert provider.calls == 2
+        assert engine._cache_key('tender', prompt_version='a:v1') != engine._cache_key('tender', prompt_version='a:v2')
+
+    def test_failed_response_not_cached(self, engine):
+        provider = FakeProvider(fail=True)
+        engine.providers = [('fake', provider)]
+
+        assert engine.generate_response('tender')['success'] is False
+        assert engine.cache.get_stats()['sets'] == 0
+
+
+class TestStreaming:
+    """Oqimli generatsiya testlari"""
+
+    def test_stream_fails_over_before_first_chunk(self, engine):
+        broken = FakeProvider(fail=True)
+        working = FakeProvider()
+        engine.providers = [('broken', broken), ('fake', working)]
+
+        assert ''.join(engine.stream_response('tender')) == 'javob: tender'
+        assert broken.calls == 1
+
+    def test_streamed_response_is_cached(self, engine):
+        provider = FakeProvider()
+        engine.providers = [('fake', provider)]
+
+        ''.join(engine.stream_response('tender'))
+        assert engine.generate_response('tender')['cached'] is True
+        assert list(engine.stream_response('tender')) == ['javob: tender']
+        assert provider.calls == 1
+
+    def test_assembler_emits_requirements_incrementally(self):
+        text = (
+            'Natija:\n```json\n{"tender_purpose": "Ko\'prik {qurilishi}", "requirements": ['
+            '{"id": "REQ001", "title": "Tajriba \\"5 yil\\""}, '
+            '{"id": "REQ002", "meta": {"min": [1, 2]},}'
+            ']}\n```'
+        )
+        assembler = IncrementalJSONAssembler()
+        emitted = []
+        for i in range(0, len(text), 7):
+            emitted.extend(assembler.feed(text[i:i + 7]))
+
+        assert [item['id'] for key, item in emitted if key == 'requirements'] == ['REQ001', 'REQ002']
+        assert emitted[0][1]['title'] == 'Tajriba "5 yil"'
+        assert assembler.is_complete
+        assert assembler.result['tender_purpose'] == "Ko'prik {qurilishi}"
+
+
+class TestCircuitBreaker:
+    """Provayder circuit breaker testlari"""
+
+    def test_open_provider_is_skipped(self, engine):
+        broken = FakeProvider(fail=True)
+        working = FakeProvider()
+        engine.providers = [('broken', broken), ('fake', working)]
+        engine.breakers['broken'] = CircuitBreaker('broken', failure_threshold=2, cooldown=60)
+
+        for i in range(5):
+            assert engine.generate_response(f'tender {i}')['provider'] == 'fake'
+
+        assert broken.calls == 2
+        assert engine.check_provider_status()['providers']['broken']['state'] == 'open'
+
+    def test_provider_reenabled_after_cooldown(self, engine):
+        provider = FakeProvider(fail=True)
+        engine.providers = [('flaky', provider)]
+        engine.breakers['flaky'] = CircuitBreaker('flaky', failure_threshold=1, cooldown=0.05)
+
+        assert engine.generate_response('a')['success'] is False
+        assert engine.generate_response('b')['success'] is False
+        assert provider.calls == 1
+
+        provider.fail = False
+        time.sleep(0.06)
+        result = engine.generate_response('c')
+        assert result['success'] is True
+        assert engine.breakers['flaky'].state == 'closed'
+
+    def test_failed_half_open_probe_doubles_cooldown(self):
+        breaker = CircuitBreaker('p', failure_threshold=1, cooldown=0.01, max_cooldown=1)
+        breaker.record_failure('xato')
+        time.sleep(0.02)
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+        breaker.record_failure('yana xato')
+        assert breaker.state == 'open'
+        assert breaker.cooldown == 0.02
+
+    def test_stale_half_open_trial_expires(self):
+        breaker = CircuitBreaker('p', failure_threshold=1, cooldown=0.01, trial_timeout=0.05)
+        breaker.record_failure('xato')
+        time.sleep(0.02)
+        assert breaker.allow_request() is True
+        # Sinov natijasiz qoldi - muddat tugaguncha boshqa sinov yo'q
+        assert breaker.allow_request() is False
+        time.sleep(0.06)
+        assert breaker.allow_request() is True
+
+    def test_closed_stream_releases_half_open_trial(self, engine):
+        provider = FakeProvider()
+        engine.providers = [('flaky', provider)]
+        breaker = engine.breakers['flaky'] = CircuitBreaker('flaky', failure_threshold=1, cooldown=0.01)
+        breaker.record_failure('xato')
+        time.sleep(0.02)
+
+        # Mijoz birinchi bo'lakdan keyin uzildi
+        stream = engine.stream_response('tender', use_cache=False)
+        assert next(stream) == 'javob: '
+        stream.close()
+
+        assert breaker.state == 'half_open'
+        assert breaker.allow_request() is True
+
+    def test_status_uses_cached_health(self, engine):
+        provider = FakeProvider()
+        engine.providers = [('fake', provider)]
+        engine.generate_response('tender')
+
+        status = engine.check_provider_status()
+        assert provider.probes == 0
+        assert status['available_providers'] == 1
+        assert status['providers']['fake']['recent_calls'] == 1
+
+
+class TestHTTPClients:
+    """Umumiy HTTP ulanishlar va timeout testlari"""
+
+    def test_timeout_scales_with_max_tokens(self, settings):
+        settings.LLM_CONNECT_TIMEOUT = 5
+        settings.LLM_TIMEOUT_BASE = 10
+        settings.LLM_TOKENS_PER_SECOND = 20
+        settings.LLM_MAX_TIMEOUT = 120
+
+        assert scaled_timeout(0) == (5.0, 10.0)
+        assert scaled_timeout(400) == (5.0, 30.0)
+        assert scaled_timeout(100000)[1] == 120.0
+
+    def test_session_shared_within_process(self):
+        assert get_http_session() is get_http_session()
+
+    def test_ollama_reuses_pooled_session(self, monkeypatch):
+        session = get_http_session()
+        calls = []
+
+        class Response:
+            status_code = 200
+
+            def json(self):
+                return {'response': 'ok'}
+
+        def fake_post(url, json=None, timeout=None, **kwargs):
+            calls.append(timeout)
+            return Response()
+
+        monkeypatch.setattr(session, 'post', fake_post)
+        first = OllamaProvider()
+        second = OllamaProvider()
+        assert first.session is second.session is session
+
+        first.generate_response('a', max_tokens=200)
+        second.generate_response('b', max_tokens=2000)
+        assert len(calls) == 2
+        assert calls[0][1] < calls[1][1]
+
+
+class FakeAsyncProvider:
+    """Soxta asinxron provayder - har bir javob `delay` soniya kutadi"""
+
+    def __init__(self, model='fake-model', fail=False, delay=0.0):
+        self.model = model
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_response(self, prompt, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError('provayder ishlamayapti')
+            return f'javob: {prompt}'
+        finally:
+            self.in_flight -= 1
+
+    async def stream_response(self, prompt, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError('provayder ishlamayapti')
+        yield 'javob: '
+        yield prompt
+
+    async def is_available(self):
+        return not self.fail
+
+
+@pytest.fixture
+def async_engine(monkeypatch, settings):
+    settings.LLM_METRICS_ENABLED = False
+    monkeypatch.setattr(AsyncHybridLLMEngine, '_initialize_providers', lambda self: None)
+    engine = AsyncHybridLLMEngine()
+    engine.cache = LLMResponseCache(enabled=True, ttl=60, max_entries=100, shared_alias='')
+    engine._probed = True
+    return engine
+
+
+class TestAsyncEngine:
+    """Asinxron LLM dvigateli testlari"""
+
+    def test_many_generations_in_flight(self, async_engine):
+        provider = FakeAsyncProvider(delay=0.2)
+        async_engine.providers = [('fake', provider)]
+
+        started = time.monotonic()
+        results = asyncio.run(async_engine.generate_many([f'tender {i}' for i in range(40)]))
+        elapsed = time.monotonic() - started
+
+        assert [r['response'] for r in results] == [f'javob: tender {i}' for i in range(40)]
+        assert provider.max_in_flight == 40
+        # Ketma-ket bo'lganda 8 soniya ketardi
+        assert elapsed < 2
+
+    def test_concurrency_limit(self, async_engine):
+        provider = FakeAsyncProvider(delay=0.01)
+        async_engine.providers = [('fake', provider)]
+        async_engine.max_concurrency = 5
+
+        asyncio.run(async_engine.generate_many([f'tender {i}' for i in range(20)]))
+        assert provider.max_in_flight == 5
+
+    def test_failover_and_cache(self, async_engine):
+        broken = FakeAsyncProvider(fail=True)
+        working = FakeAsyncProvider()
+        async_engine.providers = [('broken', broken), ('fake', working)]
+
+        async def run():
+            first = await async_engine.generate_response('tender')
+            second = await async_engine.generate_response('tender')
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first['provider'] == 'fake' and first['cached'] is False
+        assert second['cached'] is True
+        assert working.calls == 1
+        assert async_engine.check_provider_status()['providers']['broken']['consecutive_failures'] == 1
+
+    def test_stream_failover(self, async_engine):
+        async_engine.providers = [('broken', FakeAsyncProvider(fail=True)), ('fake', FakeAsyncProvider())]
+
+        async def collect():
+            return [chunk async for chunk in async_engine.stream_response('tender')]
+
+        assert ''.join(asyncio.run(collect())) == 'javob: tender'
+
+    def _half_open(self, async_engine, provider):
+        async_engine.providers = [('flaky', provider)]
+        breaker = async_engine.breakers['flaky'] = CircuitBreaker('flaky', failure_threshold=1, cooldown=0.01)
+        breaker.record_failure('xato')
+        time.sleep(0.02)
+        return breaker
+
+    def test_cancelled_generation_releases_trial_and_slot(self, async_engine):
+        breaker = self._half_open(async_engine, FakeAsyncProvider(delay=5))
+        async_engine.max_concurrency = 1
+
+        async def run():
+            task = asyncio.create_task(async_engine.generate_response('tender', use_cache=False))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return async_engine._semaphore()._value
+
+        assert asyncio.run(run()) == 1
+        assert breaker.state == 'half_open'
+        assert breaker.allow_request() is True
+
+    def test_abandoned_stream_releases_trial_and_slot(self, async_engine):
+        breaker = self._half_open(async_engine, FakeAsyncProvider())
+        async_engine.max_concurrency = 1
+
+        async def run():
+            stream = async_engine.stream_response('tender', use_cache=False)
+            assert await stream.__anext__() == 'javob: '
+            # Oqim o'qilayotganda slot band
+            assert async_engine._semaphore()._value == 0
+            await stream.aclose()
+            return async_engine._semaphore()._value
+
+        assert asyncio.run(run()) == 1
+        assert breaker.allow_request() is True
+
+
+@pytest.mark.django_db
+class TestLLMMetrics:
+    """LLM chaqiruvlari metrikalari testlari"""
+
+    @pytest.fixture(autouse=True)
+    def enable_metrics(self, engine, settings):
+        settings.LLM_METRICS_ENABLED = True
+        settings.LLM_TOKEN_PRICES = {'fake-model': [1.0, 2.0]}
+        llm_metrics._pending_hits.clear()
+        yield
+        llm_metrics._pending_hits.clear()
+
+    def test_calls_aggregated_per_caller(self, engine):
+        from apps.evaluations.models import LLMUsageStat
+
+        engine.providers = [('broken', FakeProvider(fail=True)), ('fake', FakeProvider())]
+        result = engine.generate_response('tender matni', caller='tender_analysis')
+        engine.generate_response('tender matni', caller='tender_analysis')
+        engine.generate_response('ishtirokchi', caller='participant_analysis', use_cache=False)
+
+        assert result['usage']['prompt_tokens'] > 0
+        stat = LLMUsageStat.objects.get(caller='tender_analysis', provider='fake')
+        assert stat.calls == 2
+        assert stat.cache_hits == 1
+        assert stat.failovers == 1
+        assert stat.prompt_tokens == result['usage']['prompt_tokens']
+        assert stat.cost_usd == pytest.approx(token_cost('fake-model', stat.prompt_tokens, stat.completion_tokens))
+        assert LLMUsageStat.objects.get(caller='tender_analysis', provider='broken').failures == 1
+        assert LLMUsageStat.objects.get(caller='participant_analysis', provider='fake').calls == 1
+
+    def test_prometheus_export(self, engine):
+        engine.providers = [('fake', FakeProvider())]
+        engine.generate_response('tender', caller='compare')
+
+        text = render_prometheus()
+        assert '# TYPE llm_calls_total counter' in text
+        assert 'llm_calls_total{caller="compare",provider="fake",model="fake-model"} 1' in text
+
+    def test_cache_hits_are_batched(self, engine, settings, django_assert_num_queries):
+        from apps.evaluations.models import LLMUsageStat
+
+        settings.LLM_METRICS_CACHE_HIT_BATCH = 3
+        engine.providers = [('fake', FakeProvider())]
+        engine.generate_response('tender', caller='compare')
+
+        with django_assert_num_queries(0):
+            engine.generate_response('tender', caller='compare')
+            engine.generate_response('tender', caller='compare')
+        assert LLMUsageStat.objects.get().cache_hits == 0
+
+        engine.generate_response('tender', caller='compare')
+        stat = LLMUsageStat.objects.get()
+        assert (stat.calls, stat.cache_hits) == (4, 3)
+
+    def test_render_flushes_pending_hits(self, engine):
+        engine.providers = [('fake', FakeProvider())]
+        engine.generate_response('tender', caller='compare')
+        engine.generate_response('tender', caller='compare')
+
+        text = render_prometheus()
+        assert 'llm_cache_hits_total{caller="compare",provider="fake",model="fake-model"} 1' in text
+        flush_cache_hits()
+        assert 'llm_calls_total{caller="compare",provider="fake",model="fake-model"} 2' in render_prometheus()
+
+    def test_metrics_endpoint_requires_admin(self, engine):
+        from rest_framework.test import APIClient
+        from apps.users.models import User, UserRole
+
+        client = APIClient()
+        assert client.get('/api/metrics/').status_code in (401, 403)
+
+        client.force_authenticate(User.objects.create_user(username='operator', password='x', role=UserRole.OPERATOR))
+        assert client.get('/api/metrics/').status_code == 403
+
+        client.force_authenticate(User.objects.create_user(username='admin', password='x', role=UserRole.ADMIN))
+        response = client.get('/api/metrics/')
+        assert response.status_code == 200
+        assert b'# TYPE llm_calls_total counter' in response.content
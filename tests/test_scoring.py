@@ -0,0 +1,336 @@
+"""
+Baholash va korrupsiya tahlili xizmatlari testlari
+"""
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+from apps.tenders.models import Tender, TenderRequirement
+from apps.tenders.snapshot import load_evaluation_snapshot
+from apps.compliance.services import compliance_checker
+from apps.participants.models import Participant, TenderParticipant, ParticipantDocument
+from apps.anti_fraud.services import AntiFraudAnalyzer, anti_fraud_analyzer
+from apps.anti_fraud.shingles import ShingleIndex
+from apps.anti_fraud.price_analysis import price_statistics, score_price_group, unnaturally_round_mask
+from apps.evaluations.models import Evaluation, EvaluationLog, ParticipantScore, ScoreDetail
+from apps.evaluations.services import ScoringEngine
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def make_tender(number='T-100', tender_type='open', budget=1000000):
+    return Tender.objects.create(
+        title="Ko'prik qurilishi", description='Tavsif', tender_number=number,
+        organization='Vazirlik', estimated_budget=budget, tender_type=tender_type,
+        start_date=timezone.now(), end_date=timezone.now() + timedelta(days=30),
+    )
+
+
+@pytest.fixture
+def tender(db):
+    return make_tender()
+
+
+def add_participant(tender, index, price=900000, text='Taklif matni'):
+    participant = Participant.objects.create(
+        company_name=f'Kompaniya {index}', company_type='llc',
+        tax_identification_number=f'4{tender.id:04d}000{index}', registration_number=f'RS-{tender.id}-{index}',
+        legal_address='Toshkent', actual_address='Toshkent', phone='+998900000000',
+        email=f'info{tender.id}-{index}@test.uz', director_name='Direktor',
+        director_phone='+998900000000', director_email=f'dir{tender.id}-{index}@test.uz',
+    )
+    tender_participant = TenderParticipant.objects.create(
+        tender=tender, participant=participant, proposed_price=Decimal(price),
+        delivery_time=30, warranty_period=24,
+    )
+    ParticipantDocument.objects.create(
+        tender_participant=tender_participant, title='Taklif', document_type='technical',
+        file='participants/documents/taklif.pdf', file_size=100 + index, file_type='pdf',
+        extracted_text=text,
+    )
+    return tender_participant
+
+
+class TestFraudAnalysisReuse:
+    """Tender korrupsiya tahlili baholashda bir marta hisoblanishi"""
+
+    def test_fraud_analysis_computed_once_per_evaluation(self, tender, monkeypatch):
+        for index in range(4):
+            add_participant(tender, index, price=900000 + index * 10000)
+        calls = []
+        original = AntiFraudAnalyzer.analyze_tender_fraud_risks
+
+        def counting(self, tender):
+            calls.append(tender.id)
+            return original(self, tender)
+
+        monkeypatch.setattr(AntiFraudAnalyzer, 'analyze_tender_fraud_risks', counting)
+        engine = ScoringEngine()
+
+        results = engine.evaluate_tender_participants(tender)
+        assert len(results['participants_scores']) == 4
+        assert calls == [tender.id]
+
+        # Ma'lumotlar o'zgarmagan - qayta baholashda keshdan olinadi
+        engine.evaluate_tender_participants(tender)
+        assert calls == [tender.id]
+
+    def test_cache_invalidated_when_participant_changes(self, tender):
+        first = add_participant(tender, 1)
+        add_participant(tender, 2)
+        version = anti_fraud_analyzer.tender_data_version(tender)
+
+        add_participant(tender, 3)
+        assert anti_fraud_analyzer.tender_data_version(tender) != version
+
+        version = anti_fraud_analyzer.tender_data_version(tender)
+        first.proposed_price = Decimal(500000)
+        first.save()
+        assert anti_fraud_analyzer.tender_data_version(tender) != version
+
+
+    def test_cache_invalidated_when_settings_or_rules_change(self, tender, settings, monkeypatch):
+        from apps.anti_fraud.models import FraudDetectionRule
+
+        version = anti_fraud_analyzer.analysis_config_version()
+        settings.PRICE_ROBUST_Z_THRESHOLD = 5.0
+        assert anti_fraud_analyzer.analysis_config_version() != version
+
+        version = anti_fraud_analyzer.analysis_config_version()
+        monkeypatch.setattr(anti_fraud_analyzer, 'price_deviation_threshold', 0.3)
+        assert anti_fraud_analyzer.analysis_config_version() != version
+
+        version = anti_fraud_analyzer.analysis_config_version()
+        rule = FraudDetectionRule.objects.create(
+            name='Narx', rule_type='price', description='Narx qoidasi', threshold=Decimal('0.25'), severity='high',
+        )
+        assert anti_fraud_analyzer.analysis_config_version() != version
+
+        version = anti_fraud_analyzer.analysis_config_version()
+        rule.is_active = False
+        rule.save()
+        assert anti_fraud_analyzer.analysis_config_version() != version
+
+
+class TestBulkPersistence:
+    """Baholash natijalarini bitta tranzaksiyada yozish"""
+
+    def test_rows_and_ranking_persisted(self, tender):
+        for index in range(3):
+            add_participant(tender, index, price=800000 + index * 50000)
+
+        results = ScoringEngine().evaluate_tender_participants(tender)
+
+        evaluation = Evaluation.objects.get(id=results['evaluation_id'])
+        assert evaluation.status == 'completed'
+        scores = list(ParticipantScore.objects.filter(evaluation=evaluation).order_by('rank'))
+        assert [score.rank for score in scores] == [1, 2, 3]
+        expected = {item['participant_id']: item['rank'] for item in results['ranking']}
+        assert {score.tender_participant_id: score.rank for score in scores} == expected
+        assert ScoreDetail.objects.filter(participant_score__evaluation=evaluation).count() == 15
+        assert EvaluationLog.objects.filter(evaluation=evaluation).count() == 3
+
+    def test_write_failure_rolls_back_all_rows(self, tender, monkeypatch):
+        for index in range(2):
+            add_participant(tender, index)
+
+        def broken_bulk_create(*args, **kwargs):
+            raise RuntimeError('baza ishlamayapti')
+
+        monkeypatch.setattr(EvaluationLog.objects, 'bulk_create', broken_bulk_create)
+        results = ScoringEngine().evaluate_tender_participants(tender)
+
+        assert results['status'] == 'error'
+        assert ParticipantScore.objects.count() == 0
+        assert ScoreDetail.objects.count() == 0
+        assert Evaluation.objects.get(tender=tender).status == 'failed'
+
+
+class TestEvaluationSnapshot:
+    """Baholash grafigini belgilangan sondagi so'rovlarda yuklash"""
+
+    @pytest.fixture
+    def requirements(self, tender):
+        for requirement_type in ('technical', 'experience', 'financial'):
+            TenderRequirement.objects.create(
+                tender=tender, title=requirement_type, description='Talab tavsifi',
+                requirement_type=requirement_type, is_mandatory=True,
+            )
+
+    @pytest.mark.parametrize('participant_count', [2, 8])
+    def test_evaluation_query_count_is_constant(self, tender, requirements, participant_count, django_assert_num_queries):
+        for index in range(participant_count):
+            add_participant(tender, index, price=900000 + index * 7000)
+
+        # snapshot (5) + evaluation yaratish (1) + versiya (3) + narx bazasi (1)
+        # + savepoint va bulk yozuvlar (7)
+        with django_assert_num_queries(17):
+            results = ScoringEngine().evaluate_tender_participants(tender)
+        assert len(results['participants_scores']) == participant_count
+        assert all('error' not in score for score in results['participants_scores'])
+
+    def test_engines_read_snapshot_without_queries(self, tender, requirements, django_assert_num_queries):
+        for index in range(4):
+            add_participant(tender, index)
+        snapshot = load_evaluation_snapshot(tender)
+        anti_fraud_analyzer.get_price_history()
+
+        with django_assert_num_queries(0):
+            assert compliance_checker.check_tender_compliance(snapshot)['status'] != 'error'
+            for participant in snapshot.participants.all():
+                assert compliance_checker.check_participant_compliance(participant)['status'] != 'error'
+            assert 'error' not in anti_fraud_analyzer.analyze_tender_fraud_risks(snapshot)
+
+
+class TestPriceAnomalies:
+    """Narx anomaliyalarini vektorlashtirilgan hisoblash"""
+
+    def test_statistics_include_robust_measures(self):
+        stats = price_statistics(np.array([100.0, 102.0, 98.0, 101.0, 500.0]))
+        assert stats['median'] == 101.0
+        assert stats['mad'] == 1.0
+        assert stats['q1'] == 100.0 and stats['q3'] == 102.0
+        assert stats['upper_fence'] == 105.0
+
+    def test_round_mask_matches_previous_rules(self):
+        def is_round(price, mean_price):
+            deviation = abs(price - mean_price) / mean_price
+            return (
+                f"{price:.2f}".endswith(('.00', '.50')) or price % 1000 == 0
+                or (deviation >= 0.3 and price % 100 == 0)
+            )
+
+        prices = np.array([1000000.0, 1234567.5, 1234567.89, 1234500.0, 987654.32, 1500000.25])
+        mask = unnaturally_round_mask(prices, 1000000.0)
+        assert mask.tolist() == [is_round(price, 1000000.0) for price in prices]
+        assert mask.tolist() == [True, True, False, True, False, False]
+
+    def test_deviation_detections_keep_format(self):
+        prices = np.array([1000000.11, 1010000.11, 990000.11, 400000.11])
+        results = score_price_group([1, 2, 3, 4], prices, 0.2)
+
+        assert [d['participant_id'] for d in results['detections']] == [4]
+        detection = results['detections'][0]
+        assert detection['anomaly_type'] == 'too_low'
+        assert detection['severity'] == 'critical'
+        evidence = detection['evidence']
+        assert evidence['expected_price'] == pytest.approx(prices.mean())
+        assert evidence['z_score'] == pytest.approx(abs(prices[3] - prices.mean()) / prices.std())
+        assert evidence['robust_z_score'] > 3.5
+        assert evidence['iqr_outlier'] is True
+        assert evidence['category_baseline'] is None
+        assert results['risk_score'] == pytest.approx(detection['risk_score'])
+
+    def test_category_baseline_flags_market_deviation(self):
+        baseline = {'count': 40, 'median': 0.9, 'mad': 0.02, 'q1': 0.88, 'q3': 0.92}
+        prices = np.array([1800000.11, 1810000.11, 1805000.11])
+        results = score_price_group([1, 2, 3], prices, 0.2, budget=1000000, baseline=baseline)
+
+        assert [d['anomaly_type'] for d in results['detections']] == ['market_deviation'] * 3
+        assert results['detections'][0]['evidence']['category_baseline']['median_ratio'] == 0.9
+
+    def test_price_baselines_grouped_by_tender_type(self, db, settings):
+        settings.PRICE_BASELINE_MIN_SAMPLES = 3
+        open_tender = make_tender('T-1', 'open')
+        for index, price in enumerate((900000, 950000, 1000000)):
+            add_participant(open_tender, index, price=price)
+        closed_tender = make_tender('T-2', 'closed')
+        add_participant(closed_tender, 0, price=500000)
+
+        baselines = anti_fraud_analyzer.get_price_baselines()
+        assert set(baselines) == {'open'}
+        assert baselines['open']['median'] == pytest.approx(0.95)
+        assert baselines['open']['count'] == 3
+
+    def test_baseline_excludes_scored_tender(self, db, settings):
+        settings.PRICE_BASELINE_MIN_SAMPLES = 3
+        history_tender = make_tender('T-1')
+        for index, price in enumerate((880000.11, 900000.11, 920000.11, 910000.11)):
+            add_participant(history_tender, index, price=price)
+        scored = make_tender('T-2')
+        for index, price in enumerate((1800000.11, 1810000.11, 1805000.11, 1795000.11)):
+            add_participant(scored, index, price=price)
+
+        baseline = anti_fraud_analyzer.price_baseline('open', exclude_tender_id=scored.id)
+        assert baseline['count'] == 4
+        assert baseline['median'] == pytest.approx(0.905, abs=1e-3)
+        # O'z takliflari qo'shilsa mediana chetlanishlar tomon siljiydi
+        assert anti_fraud_analyzer.get_price_baselines()['open']['median'] > 1.3
+
+        results = anti_fraud_analyzer.score_price_anomalies_batch([scored])[scored.id]
+        market = [d for d in results['detections'] if d['anomaly_type'] == 'market_deviation']
+        assert len(market) == 4
+        assert market[0]['evidence']['category_baseline']['median_ratio'] == pytest.approx(baseline['median'])
+
+    def test_batch_scoring_matches_per_tender_analysis(self, db, django_assert_num_queries):
+        tenders = [make_tender(f'T-{number}') for number in range(3)]
+        for number, tender in enumerate(tenders):
+            for index in range(3):
+                add_participant(tender, index, price=900000 + index * 150000 * number + 0.11)
+        empty = make_tender('T-empty')
+
+        # narxlar (1) + narx bazasi (1) - tenderlar sonidan qat'i nazar
+        with django_assert_num_queries(2):
+            batch = anti_fraud_analyzer.score_price_anomalies_batch(Tender.objects.all())
+
+        assert set(batch) == {tender.id for tender in tenders}
+        assert empty.id not in batch
+        for tender in tenders:
+            single = anti_fraud_analyzer._analyze_price_anomalies(
+                tender, load_evaluation_snapshot(tender).participants.all(), anti_fraud_analyzer.get_price_history()
+            )
+            assert batch[tender.id] == single
+        assert batch[tenders[0].id]['detections'] == []
+        assert batch[tenders[2].id]['risk_score'] > 0
+
+
+class TestShingleIndex:
+    """Takliflar orasidagi umumiy iboralarni shingle indeksi orqali topish"""
+
+    SHARED = 'yetkazib berish muddati shartnoma imzolangandan keyin 30 kalendar kun'
+
+    def test_longest_common_run_with_offsets(self):
+        text1 = f'Kompaniya A taklifi. {self.SHARED.capitalize()}. Narx 900 mln.'
+        text2 = f'Bizning shartlarimiz: {self.SHARED} ichida amalga oshiriladi.'
+        index1, index2 = ShingleIndex(text1), ShingleIndex(text2)
+
+        runs = index1.common_runs(index2)
+        assert runs[0].length == len(self.SHARED.split())
+        matches = anti_fraud_analyzer._find_matching_phrases(index1, index2)
+        assert len(matches) == 1
+        match = matches[0]
+        assert match['phrase'].lower() == self.SHARED
+        assert text1[match['offset_1']:].lower().startswith(self.SHARED)
+        assert text2[match['offset_2']:].startswith(self.SHARED)
+        assert match['word_count'] == len(self.SHARED.split())
+
+    def test_separate_runs_do_not_overlap(self):
+        text1 = 'alfa beta gamma delta. boshqa matn bu yerda. epsilon zeta eta theta iota'
+        text2 = 'epsilon zeta eta theta iota va yana alfa beta gamma delta'
+        runs = ShingleIndex(text1).common_runs(ShingleIndex(text2))
+        assert [(run.length, run.start_2) for run in runs] == [(5, 0), (4, 7)]
+
+    def test_short_or_unrelated_texts_have_no_matches(self):
+        assert ShingleIndex('ikki soz').common_runs(ShingleIndex('ikki soz')) == []
+        assert ShingleIndex('bir ikki uch tort').common_runs(ShingleIndex('besh olti yetti sakkiz')) == []
+
+    def test_content_similarity_reports_phrases(self, tender):
+        body = ' '.join(f'{self.SHARED} band {number}' for number in range(20))
+        first = add_participant(tender, 1, text=f'Birinchi taklif. {body}')
+        second = add_participant(tender, 2, text=f'Ikkinchi ariza: {body}')
+
+        results = anti_fraud_analyzer._analyze_content_similarity(load_evaluation_snapshot(tender).participants.all())
+
+        detection = results['detections'][0]
+        assert detection['involved_participants'] == [first.id, second.id]
+        evidence = detection['evidence']
+        assert evidence['matching_phrases'][0] == body
+        assert evidence['matching_phrase_offsets'][0]['offset_1'] == len('Birinchi taklif. ')
+        assert evidence['matching_phrase_offsets'][0]['offset_2'] == len('Ikkinchi ariza: ')
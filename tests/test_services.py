@@ -0,0 +1,316 @@
+"""
+Hujjat va embedding xizmatlari testlari
+"""
+import threading
+from types import SimpleNamespace
+import pytest
+from core.document_validity import INVALID, UNCERTAIN, VALID, check_document_validity, classify_document
+from core.services import VectorEmbeddingService
+
+
+class FakeEmbeddings:
+    """Soxta OpenAI embeddings klienti - har bir so'rovni yozib boradi"""
+
+    def __init__(self, fail_first_for=None):
+        self.requests = []
+        self.fail_first_for = fail_first_for
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def create(self, model, input):
+        with self._lock:
+            self.requests.append(list(input))
+            if self.fail_first_for in input and not self._failed:
+                self._failed = True
+                raise RuntimeError('vaqtinchalik xatolik')
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+@pytest.fixture
+def service(settings, monkeypatch):
+    settings.EMBEDDING_BATCH_SIZE = 2
+    settings.EMBEDDING_BATCH_MAX_TOKENS = 1000
+    settings.EMBEDDING_MAX_WORKERS = 2
+    monkeypatch.setattr('core.services.time.sleep', lambda seconds: None)
+    service = VectorEmbeddingService.__new__(VectorEmbeddingService)
+    service.model_type = 'openai'
+    service.model_name = 'text-embedding-3-small'
+    service.client = SimpleNamespace(embeddings=FakeEmbeddings())
+    return service
+
+
+class TestBatchedEmbeddings:
+    """Paketli embedding testlari"""
+
+    def test_batches_respect_item_limit_and_keep_order(self, service):
+        texts = ['a', 'bb', 'ccc', 'dddd', 'eeeee']
+        embeddings = service.create_embeddings(texts)
+
+        assert embeddings == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert len(service.client.embeddings.requests) == 3
+
+    def test_batches_respect_token_limit(self, service, settings):
+        settings.EMBEDDING_BATCH_SIZE = 100
+        settings.EMBEDDING_BATCH_MAX_TOKENS = 40
+        texts = ['x' * 90, 'y' * 90, 'z' * 20]
+
+        assert service._make_batches(texts) == [[0], [1, 2]]
+
+    def test_only_failed_batch_is_retried(self, service):
+        service.client.embeddings.fail_first_for = 'ccc'
+        texts = ['a', 'bb', 'ccc', 'dddd']
+        embeddings = service.create_embeddings(texts)
+
+        assert embeddings == [[1.0], [2.0], [3.0], [4.0]]
+        requests = service.client.embeddings.requests
+        assert len(requests) == 3
+        assert sum(1 for r in requests if r == ['a', 'bb']) == 1
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    from reportlab.pdfgen import canvas
+
+    path = tmp_path / 'tender.pdf'
+    pdf = canvas.Canvas(str(path))
+    for page in range(12):
+        pdf.drawString(72, 720, f'Sahifa {page + 1} talablari')
+        pdf.showPage()
+    pdf.save()
+    return str(path)
+
+
+class TestPdfPageIterator:
+    """PDF sahifalarini oqimli ajratish testlari"""
+
+    def test_sequential_pages_in_order(self, sample_pdf):
+        from core.pdf_pages import iter_pdf_pages
+
+        pages = list(iter_pdf_pages(sample_pdf, max_workers=1, pages_per_task=5))
+        assert [index for index, _ in pages] == list(range(12))
+        assert 'Sahifa 12 talablari' in pages[-1][1]
+
+    def test_process_pool_is_shared_and_fork_free(self):
+        from core.pdf_pages import shared_process_pool
+
+        pool = shared_process_pool()
+        assert shared_process_pool() is pool
+        assert pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+
+    def test_parallel_matches_sequential(self, sample_pdf, settings):
+        from core.pdf_pages import iter_pdf_pages
+
+        settings.PDF_PARALLEL_MIN_PAGES = 1
+        sequential = list(iter_pdf_pages(sample_pdf, max_workers=1, pages_per_task=3))
+        parallel = list(iter_pdf_pages(sample_pdf, max_workers=2, pages_per_task=3))
+        assert parallel == sequential
+
+
+class TestStreamingDocumentPipeline:
+    """Sahifalarni strukturalash, bo'laklash va embeddingga oqimli uzatish testlari"""
+
+    PAGES = [
+        'Kirish matni\n1. UMUMIY TALABLAR\n' + 'tajriba ' * 150 + '\n',
+        '2. TEXNIK TALABLAR\n' + 'litsenziya ' * 150 + '\n',
+        '3. MOLIYAVIY TALABLAR\n' + 'narx 1000 USD ' * 100 + '\n',
+    ]
+
+    @pytest.fixture
+    def processor(self, monkeypatch, tmp_path):
+        from core.services import DocumentProcessor
+
+        processor = DocumentProcessor()
+        consumed = []
+
+        def fake_pages(file_path, file_type):
+            for page in self.PAGES:
+                consumed.append(page)
+                yield page
+
+        monkeypatch.setattr(processor, '_detect_file_type', lambda path: 'pdf')
+        monkeypatch.setattr(processor, '_extract_metadata', lambda path, file_type: {'file_name': path.name, 'file_type': file_type})
+        monkeypatch.setattr(processor, '_iter_text_pages', fake_pages)
+        processor.consumed = consumed
+        path = tmp_path / 'tender.pdf'
+        path.write_bytes(b'%PDF')
+        processor.path = str(path)
+        return processor
+
+    def test_sections_match_whole_text_structuring(self, processor):
+        expected = processor._structure_content(''.join(self.PAGES), 'auto')
+        assert list(processor.iter_sections(self.PAGES)) == expected['sections']
+
+    def test_chunks_match_fixed_slicing(self, processor):
+        sections = list(processor.iter_sections(self.PAGES))
+        all_text = ''.join(f"{s['title']}\n{' '.join(s['content'])}\n\n" for s in sections)
+        expected = [all_text[i:i + 1000] for i in range(0, len(all_text), 1000)]
+        assert list(processor.iter_content_chunks(iter(sections))) == expected
+
+    def test_chunk_batches_emitted_before_all_pages_read(self, processor, settings):
+        settings.EMBEDDING_BATCH_SIZE = 1
+        settings.EMBEDDING_MAX_WORKERS = 1
+        batches = []
+
+        def on_chunks(chunks):
+            batches.append((list(chunks), len(processor.consumed)))
+
+        result = processor.process_document(processor.path, on_chunks=on_chunks)
+
+        assert result['processing_status'] == 'success'
+        assert batches[0][1] < len(self.PAGES)
+        assert result['vector_data']['content_chunks'] == []
+        assert result['vector_data']['content_chunk_count'] == len(batches)
+        assert result['text_content'] == ''.join(self.PAGES)
+        assert [s['title'] for s in result['structured_data']['sections']][:2] == ['Kirish', '1. UMUMIY TALABLAR']
+        assert '1000 USD' in ''.join(result['structured_data']['key_information']['amounts'])
+
+    def test_chunk_sink_errors_propagate(self, processor):
+        def on_chunks(chunks):
+            raise RuntimeError('embedding xatosi')
+
+        with pytest.raises(RuntimeError):
+            processor.process_document(processor.path, on_chunks=on_chunks)
+
+
+class TestSelectiveOCR:
+    """Skanerlangan sahifalarni tanlab OCR qilish testlari"""
+
+    @pytest.fixture
+    def mixed_pdf(self, tmp_path):
+        from PIL import Image
+        from reportlab.pdfgen import canvas
+
+        image_path = tmp_path / 'skan.png'
+        Image.new('RGB', (200, 100), 'white').save(image_path)
+
+        path = tmp_path / 'aralash.pdf'
+        pdf = canvas.Canvas(str(path))
+        pdf.drawString(72, 720, "Raqamli sahifa: kompaniya 10 yillik tajribaga ega")
+        pdf.showPage()
+        pdf.drawImage(str(image_path), 72, 500, width=200, height=100)
+        pdf.showPage()
+        pdf.save()
+        return str(path)
+
+    @pytest.fixture
+    def fake_tesseract(self, monkeypatch):
+        from django.core.cache import cache
+
+        cache.clear()
+        calls = []
+
+        def fake_ocr(images, lang, timeout):
+            calls.append(len(images))
+            return 'SKAN MATNI'
+
+        monkeypatch.setattr('core.ocr._ocr_page_images', fake_ocr)
+        # Sahifadagi rasm obyektlari orqali (pdftoppm o'rnatilmagan muhit)
+        monkeypatch.setattr('core.ocr.shutil.which', lambda name: None)
+        return calls
+
+    def test_only_image_pages_are_ocred_and_cached(self, mixed_pdf, fake_tesseract):
+        from core.ocr import iter_pdf_text_pages
+        from core.pdf_pages import iter_pdf_pages
+
+        raw = list(iter_pdf_pages(mixed_pdf, max_workers=1))
+        completed = list(iter_pdf_text_pages(mixed_pdf))
+
+        assert [index for index, _ in completed] == [0, 1]
+        assert completed[0] == raw[0]
+        assert completed[1][1] == 'SKAN MATNI'
+        assert fake_tesseract == [1]
+
+        list(iter_pdf_text_pages(mixed_pdf))
+        assert fake_tesseract == [1]
+
+    def test_document_text_streams_pages_with_ocr(self, mixed_pdf, fake_tesseract):
+        from core.services import document_processor
+
+        text, page_count = document_processor.read_pdf_text(mixed_pdf)
+        assert page_count == 2
+        assert text.endswith('SKAN MATNI\n')
+        assert 'Raqamli sahifa' in text
+
+    def test_failed_page_returns_empty_text(self, monkeypatch):
+        from core.ocr import ocr_images
+
+        def failing_ocr(images, lang, timeout):
+            raise RuntimeError('Tesseract process timeout')
+
+        monkeypatch.setattr('core.ocr._ocr_page_images', failing_ocr)
+        assert ocr_images({3: [b'rasm']}) == {3: ''}
+
+    def test_hung_page_does_not_block(self, monkeypatch, settings):
+        import threading
+        import time
+        from django.core.cache import cache
+        from core.ocr import ocr_images
+
+        cache.clear()
+        settings.OCR_PAGE_TIMEOUT = 1
+        settings.OCR_MAX_WORKERS = 1
+        monkeypatch.setattr('core.ocr.OCR_TIMEOUT_GRACE', 0)
+        release = threading.Event()
+
+        def hung_ocr(images, lang, timeout):
+            release.wait(10)
+            return 'kech'
+
+        monkeypatch.setattr('core.ocr._ocr_page_images', hung_ocr)
+        started = time.monotonic()
+        try:
+            assert ocr_images({0: [b'rasm-1'], 1: [b'rasm-2']}) == {0: '', 1: ''}
+            assert time.monotonic() - started < 4
+        finally:
+            release.set()
+
+    def test_pages_rasterized_when_pdftoppm_available(self, mixed_pdf, fake_tesseract, monkeypatch):
+        from core.ocr import extract_page_images
+
+        rendered = []
+        monkeypatch.setattr('core.ocr.shutil.which', lambda name: '/usr/bin/pdftoppm')
+        monkeypatch.setattr('core.ocr.render_pdf_page', lambda path, index: rendered.append(index) or b'sahifa-png')
+
+        assert extract_page_images(mixed_pdf, [1]) == {1: [b'sahifa-png']}
+        assert rendered == [1]
+
+
+class TestDocumentValidity:
+    """Mahalliy hujjat yaroqliligi klassifikatori testlari"""
+
+    TENDER = (
+        "TENDER HUJJATI. Buyurtmachi: Toshkent shahar hokimligi. Xarid predmeti: ko'prik qurilishi. "
+        "Ishtirokchilarga talablar: qurilish litsenziyasi, kamida 5 yillik tajriba, bank kafolati. "
+        "Baholash mezonlari: narx 40%, sifat 30%, tajriba 30%. Ishlarni bajarish muddati 12 oy. "
+        "Texnik topshiriq va shartnoma loyihasi ilova qilinadi. "
+    ) * 3
+
+    def test_obvious_tender_accepted_without_llm(self, monkeypatch):
+        monkeypatch.setattr('core.document_validity._llm_check', lambda *args: pytest.fail('LLM chaqirilmasligi kerak'))
+        verdict = check_document_validity(self.TENDER, 'tender')
+        assert verdict.label == VALID and verdict.source == 'local'
+
+    def test_russian_and_cyrillic_tenders_accepted(self):
+        russian = ("Заказчик объявляет тендер на закупку услуг. Требования к участникам: лицензия, "
+                   "опыт работы, банковская гарантия. Критерии оценки: цена и качество. Срок поставки. ") * 3
+        cyrillic = ("Буюртмачи тендер эълон қилади. Иштирокчиларга талаблар: лицензия, тажриба, кафолат. "
+                    "Баҳолаш мезонлари: нарх ва сифат. Бажариш муддати 6 ой. Шартнома лойиҳаси. ") * 3
+        assert classify_document(russian, 'tender').label == VALID
+        assert classify_document(cyrillic, 'tender').label == VALID
+
+    def test_junk_rejected_without_llm(self, monkeypatch):
+        monkeypatch.setattr('core.document_validity._llm_check', lambda *args: pytest.fail('LLM chaqirilmasligi kerak'))
+        recipe = "Osh tayyorlash uchun guruch, sabzi, piyoz va go'sht olinadi. Qozonda yog' qizdiriladi. " * 5
+        assert check_document_validity(recipe, 'tender').label == INVALID
+        assert check_document_validity('%PDF 0x00 ' + '1234 5678 ' * 100, 'tender').label == INVALID
+        assert check_document_validity('salom', 'tender').label == INVALID
+
+    def test_uncertain_document_falls_back_to_llm(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr('core.document_validity._llm_check', lambda text, kind: calls.append(kind) or False)
+        text = "Ushbu hujjatda narx va sifat haqida ma'lumot berilgan. Boshqa mavzular ham yoritilgan. " * 5
+        assert classify_document(text, 'tender').label == UNCERTAIN
+        verdict = check_document_validity(text, 'tender')
+        assert calls == ['tender']
+        assert verdict.label == INVALID and verdict.source == 'llm'
@@ -0,0 +1,57 @@
+"""
+Ishga tushish vaqti testlari
+
+Django/Celery jarayoni modullarni import qilganda og'ir kutubxonalar (ML, OCR,
+LLM klientlari) yuklanmasligi va LLM provayderlari tekshirilmasligi kerak.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Import vaqti chegarasi (soniya). Sekin CI mashinalari uchun env orqali oshiriladi
+IMPORT_TIME_BUDGET = float(os.getenv('IMPORT_TIME_BUDGET', 3.0))
+
+HEAVY_MODULES = [
+    'unstructured', 'pandas', 'pytesseract', 'magic', 'sentence_transformers',
+    'torch', 'openai', 'sklearn',
+]
+
+BENCHMARK_SCRIPT = f"""
+import json, os, sys, time
+os.environ['DJANGO_SETTINGS_MODULE'] = 'tanlov_ai.settings'
+start = time.perf_counter()
+import django
+django.setup()
+import core.services, core.llm_engine, core.tender_analyzer, core.tasks
+import apps.evaluations.analysis_views, apps.anti_fraud.services, tanlov_ai.urls
+elapsed = time.perf_counter() - start
+from django.utils.functional import empty
+print(json.dumps({{
+    'seconds': elapsed,
+    'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+    'llm_engine_initialized': core.llm_engine.llm_engine._wrapped is not empty,
+    'embedding_initialized': core.services.embedding_service._wrapped is not empty,
+}}))
+"""
+
+
+def run_import_benchmark():
+    root = Path(__file__).resolve().parent.parent
+    output = subprocess.run(
+        [sys.executable, '-c', BENCHMARK_SCRIPT],
+        cwd=root, capture_output=True, text=True, timeout=120,
+        env={**os.environ, 'PYTHONPATH': str(root)},
+    )
+    assert output.returncode == 0, output.stderr
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def test_startup_is_lazy():
+    result = run_import_benchmark()
+
+    assert result['heavy'] == []
+    assert result['llm_engine_initialized'] is False
+    assert result['embedding_initialized'] is False
+    assert result['seconds'] < IMPORT_TIME_BUDGET, f"Import {result['seconds']:.2f}s davom etdi"
@@ -0,0 +1,405 @@
+"""
+Tender tahlil xizmati testlari
+"""
+import json
+import threading
+import time
+import pytest
+from rest_framework.test import APIClient
+from apps.users.models import User, UserRole
+from core.tender_analyzer import (
+    TenderAnalyzer,
+    TenderRequirement,
+    make_tender_key,
+    save_tender_analysis,
+    load_tender_analysis,
+)
+from core.prompt_budget import DOCUMENT_SLOT, PromptBudget, count_tokens, truncate_to_tokens
+from core.prompt_templates import PARTICIPANT_ANALYSIS, TEMPLATES, TENDER_ANALYSIS
+from core.retrieval import select_relevant_passages, split_passages
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = TenderAnalyzer()
+    analyzer.tender_requirements = [
+        TenderRequirement(
+            id='REQ001', category='experience', title='Tajriba',
+            description='Kamida 5 yil tajriba', is_mandatory=True, weight=0.5
+        )
+    ]
+    analyzer.tender_info = {'tender_purpose': "Ko'prik qurilishi"}
+    return analyzer
+
+
+class TestConcurrentParticipantAnalysis:
+    """Parallel ishtirokchi tahlili testlari"""
+
+    def test_results_keep_input_order(self, analyzer, monkeypatch):
+        def fake_analyze(self, name, text, metadata=None):
+            # Birinchi ishtirokchi eng oxirida tugaydi
+            time.sleep(0.05 if name == 'A' else 0.0)
+            return {'success': True, 'analysis': {'participant_name': name}}
+
+        monkeypatch.setattr(TenderAnalyzer, 'analyze_participant', fake_analyze)
+        jobs = [{'name': n, 'text': 'matn'} for n in ['A', 'B', 'C']]
+
+        results = analyzer.analyze_participants_concurrently(jobs, max_workers=3)
+        assert [r['analysis']['participant_name'] for r in results] == ['A', 'B', 'C']
+
+    def test_max_workers_limit(self, analyzer, monkeypatch):
+        in_flight = []
+        peak = []
+        lock = threading.Lock()
+
+        def fake_analyze(self, name, text, metadata=None):
+            with lock:
+                in_flight.append(name)
+                peak.append(len(in_flight))
+            time.sleep(0.02)
+            with lock:
+                in_flight.remove(name)
+            return {'success': True, 'analysis': {'participant_name': name}}
+
+        monkeypatch.setattr(TenderAnalyzer, 'analyze_participant', fake_analyze)
+        jobs = [{'name': f'P{i}', 'text': 'matn'} for i in range(6)]
+
+        analyzer.analyze_participants_concurrently(jobs, max_workers=2)
+        assert max(peak) <= 2
+
+    def test_workers_do_not_share_state(self, analyzer, monkeypatch):
+        seen = []
+
+        def fake_analyze(self, name, text, metadata=None):
+            seen.append(self)
+            self.tender_requirements.clear()
+            return {'success': True, 'analysis': {'participant_name': name}}
+
+        monkeypatch.setattr(TenderAnalyzer, 'analyze_participant', fake_analyze)
+        jobs = [{'name': f'P{i}', 'text': 'matn'} for i in range(3)]
+
+        analyzer.analyze_participants_concurrently(jobs, max_workers=3)
+        assert analyzer not in seen
+        assert len(analyzer.tender_requirements) == 1
+
+    def test_errors_are_reported_per_participant(self, analyzer, monkeypatch):
+        def fake_analyze(self, name, text, metadata=None):
+            if name == 'B':
+                raise RuntimeError('LLM xatolik')
+            return {'success': True, 'analysis': {'participant_name': name}}
+
+        monkeypatch.setattr(TenderAnalyzer, 'analyze_participant', fake_analyze)
+        jobs = [{'name': n, 'text': 'matn'} for n in ['A', 'B']]
+
+        results = analyzer.analyze_participants_concurrently(jobs)
+        assert results[0]['success'] is True
+        assert results[1]['success'] is False
+
+
+class TestTenderAnalysisStore:
+    """Tender tahlillari ombori testlari"""
+
+    tender_data = {
+        'tender_purpose': "Ko'prik qurilishi",
+        'requirements': [
+            {'id': 'REQ001', 'title': 'Tajriba', 'category': 'experience', 'weight': 0.5},
+            {'id': 'REQ002', 'title': 'Litsenziya', 'category': 'document', 'weight': 0.3},
+        ],
+    }
+
+    def test_tender_key_is_stable(self):
+        assert make_tender_key('matn', 'uz') == make_tender_key('matn', 'uz_latn')
+        assert make_tender_key('matn', 'uz') != make_tender_key('matn', 'ru')
+
+    def test_from_tender_data_creates_independent_instances(self):
+        first = TenderAnalyzer.from_tender_data(self.tender_data)
+        second = TenderAnalyzer.from_tender_data(self.tender_data)
+        first.tender_requirements.clear()
+        assert len(second.tender_requirements) == 2
+
+    def test_save_and_load(self):
+        key = make_tender_key('tender matni')
+        save_tender_analysis(key, self.tender_data)
+        assert load_tender_analysis(key) == self.tender_data
+        assert load_tender_analysis('mavjud-emas') is None
+
+    def test_requirements_endpoint_by_tender_key(self, db):
+        key = make_tender_key('boshqa tender matni')
+        save_tender_analysis(key, self.tender_data)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username='operator_test', password='operator123', role=UserRole.OPERATOR
+        ))
+        response = client.get('/api/evaluations/tender-requirements/', {'tender_key': key})
+        assert response.status_code == 200
+        assert [r['id'] for r in response.data['requirements']] == ['REQ001', 'REQ002']
+
+    def test_reset_keeps_shared_analysis(self, db):
+        key = make_tender_key('umumiy tender matni')
+        save_tender_analysis(key, self.tender_data)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username='operator_reset', password='operator123', role=UserRole.OPERATOR
+        ))
+        session = client.session
+        session['tender_key'] = key
+        session.save()
+
+        response = client.post('/api/evaluations/reset/', {'tender_key': key}, format='json')
+        assert response.status_code == 200
+        assert 'tender_key' not in client.session
+        # Boshqa foydalanuvchilar uchun tahlil saqlanib qoladi
+        assert load_tender_analysis(key) == self.tender_data
+
+
+class TestParticipantRetrieval:
+    """Ishtirokchi hujjatidan tegishli parchalarni tanlash testlari"""
+
+    boilerplate = '\n\n'.join(f"Umumiy shartlar bandi {i}: hujjat rasmiylashtirish tartibi." for i in range(400))
+
+    def test_short_text_is_unchanged(self):
+        assert select_relevant_passages('qisqa matn', ['tajriba'], max_chars=100) == 'qisqa matn'
+
+    def test_split_passages_respects_size(self):
+        passages = split_passages(self.boilerplate, passage_chars=300)
+        assert len(passages) > 1
+        assert all(len(p) <= 300 for p in passages)
+
+    def test_selects_relevant_tail_passage(self):
+        text = "MChJ Qurilish Invest, Toshkent\n\n" + self.boilerplate + (
+            "\n\nKompaniya 12 yillik tajribaga ega, 30 ta ko'prik qurildi."
+        )
+        context = select_relevant_passages(text, ["Tajriba ko'prik qurilishida"], max_chars=1500)
+
+        assert len(context) <= 1500
+        assert 'Qurilish Invest' in context
+        assert '12 yillik tajribaga' in context
+
+    def test_large_window_still_selects_passages(self, analyzer, monkeypatch, settings):
+        settings.LLM_CONTEXT_WINDOWS = {'katta-model': 128000}
+        monkeypatch.setattr(PromptBudget, 'for_engine', classmethod(lambda cls, max_tokens=1000: cls(['katta-model'], max_tokens)))
+        text = (self.boilerplate + "\n\n") * 40 + "Kamida 5 yil tajriba: kompaniya 7 yil tajribaga ega."
+        assert count_tokens(text, 'katta-model') > settings.RAG_CONTEXT_TOKENS > 0
+
+        prompt = analyzer._fill_participant_prompt(DOCUMENT_SLOT, text)
+        assert count_tokens(prompt, 'katta-model') <= settings.RAG_CONTEXT_TOKENS
+        assert '7 yil tajribaga ega' in prompt
+
+    def test_participant_prompt_uses_selected_passages(self, analyzer, monkeypatch, settings):
+        settings.RAG_CONTEXT_TOKENS = 1000
+        prompts = []
+
+        def fake_generate(prompt, **kwargs):
+            prompts.append(prompt)
+            return {'success': True, 'response': '{"participant_name": "A", "scores": []}'}
+
+        monkeypatch.setattr('core.tender_analyzer.llm_engine.generate_response', fake_generate)
+        text = self.boilerplate + "\n\nKamida 5 yil tajriba: kompaniya 7 yil tajribaga ega."
+
+        result = analyzer.analyze_participant('A', text)
+        assert result['success'] is True
+        assert '7 yil tajribaga ega' in prompts[0]
+        assert len(prompts[0]) < len(text)
+
+
+class TestTenderMapReduce:
+    """Uzun tender hujjatini map-reduce tahlili testlari"""
+
+    def make_tender(self, sections):
+        return '\n\n'.join(
+            f"{i + 1}-BO'LIM TALABLARI:\n" + '\n'.join([body] + [f"Izoh qatori {j}." for j in range(60)])
+            for i, body in enumerate(sections)
+        )
+
+    @pytest.fixture
+    def small_window(self, settings, monkeypatch):
+        # Butun hujjat tender promptiga sig'maydi, 1500 belgili qismlar sig'adi
+        settings.LLM_CONTEXT_WINDOWS = {'orta-model': 5000}
+        settings.TENDER_MAP_CHUNK_CHARS = 1500
+        monkeypatch.setattr(PromptBudget, 'for_engine', classmethod(lambda cls, max_tokens=1000: cls(['orta-model'], max_tokens)))
+
+    def test_map_reduce_decided_by_tokens(self, small_window, settings):
+        analyzer = TenderAnalyzer()
+        latin = "Pudratchi litsenziyaga ega bo'lishi kerak. " * 50
+        cyrillic = "Пудратчи лицензияга эга бўлиши керак. " * 50
+        # Lotin matni uzunroq, lekin kirill matni ko'proq token oladi
+        assert len(latin) > len(cyrillic)
+        assert analyzer._needs_map_reduce(latin) is False
+        assert analyzer._needs_map_reduce(cyrillic) is True
+
+        settings.LLM_CONTEXT_WINDOWS = {'orta-model': 128000}
+        assert analyzer._needs_map_reduce(cyrillic * 20) is False
+
+    def test_map_reduce_threshold_is_a_setting(self, small_window, settings):
+        analyzer = TenderAnalyzer()
+        text = "Pudratchi litsenziyaga ega bo'lishi kerak. " * 200
+        settings.LLM_CONTEXT_WINDOWS = {'orta-model': 128000}
+        assert analyzer._needs_map_reduce(text) is False
+
+        settings.TENDER_MAP_REDUCE_TOKENS = count_tokens(text, 'orta-model') - 1
+        assert analyzer._needs_map_reduce(text) is True
+
+    def test_requirements_from_all_sections_are_merged(self, small_window, monkeypatch):
+        responses = {
+            'Litsenziya': {'title': 'Qurilish litsenziyasi', 'is_mandatory': True},
+            'Tajriba': {'title': "Ko'prik qurilishida tajriba", 'description': 'Kamida 5 yil'},
+            'Kafolat': {'title': 'Bank kafolati'},
+            'Takror': {'title': 'Qurilish litsenziyasi', 'description': 'Davlat litsenziyasi talab etiladi'},
+        }
+        prompts = []
+
+        def fake_generate(prompt, **kwargs):
+            prompts.append(prompt)
+            reqs = [dict(req, id='REQ001') for key, req in responses.items() if f'MARKER-{key}' in prompt]
+            return {'success': True, 'response': json.dumps({'tender_purpose': 'Qurilish', 'requirements': reqs})}
+
+        monkeypatch.setattr('core.tender_analyzer.llm_engine.generate_response', fake_generate)
+        text = self.make_tender([f'MARKER-{key}' for key in responses])
+
+        analyzer = TenderAnalyzer()
+        result = analyzer.analyze_tender_document(text)
+
+        assert result['success'] is True
+        analysis = result['analysis']
+        assert len(prompts) == analysis['map_reduce']['sections'] > 1
+        titles = [r['title'] for r in analysis['requirements']]
+        assert sorted(titles) == sorted(['Qurilish litsenziyasi', "Ko'prik qurilishida tajriba", 'Bank kafolati'])
+        assert [r['id'] for r in analysis['requirements']] == ['REQ001', 'REQ002', 'REQ003']
+        assert len(analyzer.tender_requirements) == 3
+
+        licence = next(r for r in analysis['requirements'] if r['title'] == 'Qurilish litsenziyasi')
+        assert licence['is_mandatory'] is True
+        assert licence['description'] == 'Davlat litsenziyasi talab etiladi'
+
+    def test_short_tender_uses_single_call(self, monkeypatch):
+        prompts = []
+
+        def fake_generate(prompt, **kwargs):
+            prompts.append(prompt)
+            return {'success': True, 'response': '{"tender_purpose": "Qurilish", "requirements": []}'}
+
+        monkeypatch.setattr('core.tender_analyzer.llm_engine.generate_response', fake_generate)
+        assert TenderAnalyzer().analyze_tender_document('qisqa tender')['success'] is True
+        assert len(prompts) == 1
+
+
+class TestPromptBudget:
+    """Token byudjetiga mos prompt yig'ish testlari"""
+
+    @pytest.fixture(autouse=True)
+    def windows(self, settings):
+        settings.LLM_CONTEXT_WINDOWS = {'katta-model': 128000, 'kichik-model': 4000}
+        settings.LLM_PROMPT_SAFETY_RATIO = 0.05
+
+    def test_cyrillic_costs_more_tokens(self):
+        latin = "Tender hujjatlari to'liq taqdim etilishi shart. " * 20
+        cyrillic = "Тендер ҳужжатлари тўлиқ тақдим этилиши шарт. " * 20
+        assert count_tokens(cyrillic) > count_tokens(latin)
+
+    def test_truncate_to_tokens(self):
+        text = "Kompaniya ko'prik qurilishida tajribaga ega. " * 200
+        truncated = truncate_to_tokens(text, 100)
+        assert count_tokens(truncated) <= 100
+        assert text.startswith(truncated)
+        assert truncate_to_tokens('qisqa', 100) == 'qisqa'
+
+    def test_smallest_window_wins(self):
+        budget = PromptBudget(['katta-model', 'kichik-model'], max_tokens=1000)
+        assert budget.model == 'kichik-model'
+        assert budget.context_window == 4000
+
+    def test_engine_budget_ignores_breaker_state(self, monkeypatch):
+        from core.circuit_breaker import CircuitBreaker
+        from core.llm_engine import llm_engine
+
+        class Provider:
+            def __init__(self, model):
+                self.model = model
+
+        monkeypatch.setattr(llm_engine, 'providers', [('openai', Provider('katta-model')), ('ollama', Provider('kichik-model'))])
+        monkeypatch.setattr(llm_engine, 'breakers', {name: CircuitBreaker(name, cooldown=60) for name in ('openai', 'ollama')})
+        assert PromptBudget.for_engine().model == 'kichik-model'
+
+        # Provayder holati promptni (va kesh kalitini) o'zgartirmaydi
+        llm_engine.breakers['ollama'].force_open('Ollama mavjud emas')
+        assert PromptBudget.for_engine().model == 'kichik-model'
+
+    def test_fill_reserves_room_for_answer(self):
+        budget = PromptBudget(['kichik-model'], max_tokens=1000)
+        template = f"Quyidagi hujjatni tahlil qil:\n{DOCUMENT_SLOT}\nFaqat JSON qaytar."
+        system_prompt = 'Sen ekspertsan.'
+
+        for document in ["Шартнома бўйича мажбуриятлар. " * 2000, "Shartnoma bo'yicha majburiyatlar. " * 2000]:
+            prompt = budget.fill(template, document, system_prompt)
+            used = budget.count(prompt) + budget.count(system_prompt)
+            assert used + budget.max_tokens <= budget.context_window
+            # Oynaning katta qismi hujjat uchun ishlatiladi
+            assert used > budget.context_window * 0.6
+            assert DOCUMENT_SLOT not in prompt
+
+    def test_short_document_is_unchanged(self):
+        budget = PromptBudget(['katta-model'], max_tokens=1000)
+        assert budget.fill(f"Hujjat: {DOCUMENT_SLOT}", 'qisqa matn') == 'Hujjat: qisqa matn'
+
+    def test_tender_prompt_fits_window(self, settings, monkeypatch):
+        monkeypatch.setattr(PromptBudget, 'for_engine', classmethod(lambda cls, max_tokens=1000: cls(['kichik-model'], max_tokens)))
+        tender_text = "Pudratchi kamida 5 yillik tajribaga ega bo'lishi kerak. " * 3000
+
+        prompt, system_prompt = TenderAnalyzer()._build_tender_prompt(tender_text, max_tokens=1000)
+        assert count_tokens(prompt) + count_tokens(system_prompt) + 1000 <= 4000
+        assert 'Pudratchi kamida 5 yillik' in prompt
+
+
+class TestPromptTemplates:
+    """Versiyalangan prompt shablonlari testlari"""
+
+    @pytest.mark.parametrize('language', ['uz_latn', 'uz_cyrl', 'ru'])
+    def test_static_prefix_comes_first(self, language):
+        for template in TEMPLATES.values():
+            values = {name: f'<{name}>' for name in ('document', 'part', 'total', 'requirements',
+                                                    'tender_purpose', 'participant_name', 'participants')}
+            prompt, _, version = template.render(language, **values)
+            assert prompt.startswith(template.prefix(language))
+            assert '<document>' not in template.prefix(language)
+            assert version == template.id
+
+    def test_tender_prompt_prefix_is_byte_identical(self, monkeypatch):
+        monkeypatch.setattr(PromptBudget, 'for_engine', classmethod(lambda cls, max_tokens=1000: cls(['gpt-4'], max_tokens)))
+        analyzer = TenderAnalyzer()
+        prefix = TENDER_ANALYSIS.prefix('ru').encode('utf-8')
+
+        first, system1 = analyzer._build_tender_prompt('Birinchi tender: yo\'l qurilishi', {'language': 'ru'})
+        second, system2 = analyzer._build_tender_prompt('Ikkinchi tender: maktab ta\'miri', {'language': 'ru'})
+        assert first.encode('utf-8')[:len(prefix)] == second.encode('utf-8')[:len(prefix)] == prefix
+        assert system1 == system2
+        assert first.index("yo'l qurilishi") > len(TENDER_ANALYSIS.prefix('ru'))
+
+    def test_participant_document_after_prefix(self, analyzer, monkeypatch):
+        prompts = []
+
+        def fake_generate(prompt, **kwargs):
+            prompts.append((prompt, kwargs.get('prompt_version')))
+            return {'success': True, 'response': '{"overall_match_percentage": 70, "scores": []}'}
+
+        monkeypatch.setattr('core.tender_analyzer.llm_engine.generate_response', fake_generate)
+        result = analyzer.analyze_participant('Alfa MChJ', 'Kompaniya 7 yillik tajribaga ega.')
+
+        assert result['analysis']['prompt_version'] == PARTICIPANT_ANALYSIS.id
+        prompt, version = prompts[0]
+        assert version == PARTICIPANT_ANALYSIS.id
+        assert prompt.startswith(PARTICIPANT_ANALYSIS.prefix('uz_latn'))
+        assert prompt.index('Alfa MChJ') > len(PARTICIPANT_ANALYSIS.prefix('uz_latn'))
+
+    def test_analysis_records_prompt_version(self, monkeypatch):
+        versions = []
+
+        def fake_generate(prompt, **kwargs):
+            versions.append(kwargs.get('prompt_version'))
+            return {'success': True, 'response': '{"tender_purpose": "Qurilish", "requirements": []}'}
+
+        monkeypatch.setattr('core.tender_analyzer.llm_engine.generate_response', fake_generate)
+        result = TenderAnalyzer().analyze_tender_document('qisqa tender')
+        assert versions == [TENDER_ANALYSIS.id]
+        assert result['analysis']['prompt_version'] == TENDER_ANALYSIS.id
@@ -0,0 +1,119 @@
+"""
+Vektor ombori testlari
+"""
+from datetime import timedelta
+import numpy as np
+import pytest
+from django.utils import timezone
+from apps.tenders.models import Tender
+from apps.participants.models import Participant, TenderParticipant, ParticipantDocument, DocumentChunk
+from core.vector_store import ChunkVectorStore, VectorIndex, decode_vector, encode_vector
+
+
+@pytest.fixture
+def tender(db):
+    return Tender.objects.create(
+        title="Ko'prik qurilishi", description='Tavsif', tender_number='T-001',
+        organization='Vazirlik', estimated_budget=1000000,
+        start_date=timezone.now(), end_date=timezone.now() + timedelta(days=30),
+    )
+
+
+def make_document(tender, index):
+    participant = Participant.objects.create(
+        company_name=f'Kompaniya {index}', company_type='llc',
+        tax_identification_number=f'30000000{index}', registration_number=f'R-{index}',
+        legal_address='Toshkent', actual_address='Toshkent', phone='+998900000000',
+        email=f'info{index}@test.uz', director_name='Direktor',
+        director_phone='+998900000000', director_email=f'dir{index}@test.uz',
+    )
+    tender_participant = TenderParticipant.objects.create(tender=tender, participant=participant)
+    return ParticipantDocument.objects.create(
+        tender_participant=tender_participant, title='Taklif', document_type='proposal',
+        file='participants/documents/taklif.pdf', file_size=100, file_type='pdf',
+    )
+
+
+class TestVectorIndex:
+    """NumPy indeksi testlari"""
+
+    def test_vector_roundtrip_is_float32(self):
+        data = encode_vector([0.5, -1.0, 2.0])
+        assert len(data) == 12
+        assert decode_vector(data).tolist() == [0.5, -1.0, 2.0]
+
+    def test_exact_search_orders_by_cosine(self):
+        index = VectorIndex([10, 20, 30], np.array([[1, 0], [0.7, 0.7], [0, 1]]), ivf_threshold=100)
+        hits = index.search([1, 0.1], top_k=2)
+        assert [chunk_id for chunk_id, _ in hits] == [10, 20]
+        assert hits[0][1] > hits[1][1]
+
+    def test_ivf_finds_nearest_neighbour(self):
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(500, 16)).astype(np.float32)
+        index = VectorIndex(list(range(500)), vectors, ivf_threshold=100, nprobe=4)
+        assert index.centroids is not None
+
+        found = sum(index.search(vectors[i], top_k=1)[0][0] == i for i in range(0, 500, 10))
+        assert found >= 45
+
+
+class TestChunkVectorStore:
+    """DocumentChunk asosidagi vektor ombori testlari"""
+
+    def test_add_and_search(self, tender):
+        store = ChunkVectorStore()
+        document = make_document(tender, 1)
+        store.add_chunks(
+            tender.id, 'participant', ['tajriba 5 yil', 'litsenziya bor'],
+            [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], 'test-model', participant_document=document,
+        )
+
+        hits = store.search([0.1, 0.9, 0.0], tender_id=tender.id, top_k=1)
+        assert hits[0]['text'] == 'litsenziya bor'
+        assert hits[0]['participant_document_id'] == document.id
+
+    def test_reprocessing_replaces_chunks_and_refreshes_index(self, tender):
+        store = ChunkVectorStore()
+        document = make_document(tender, 1)
+        store.add_chunks(tender.id, 'participant', ['eski'], [[1.0, 0.0]], participant_document=document)
+        assert store.search([1.0, 0.0], tender_id=tender.id)[0]['text'] == 'eski'
+
+        store.add_chunks(tender.id, 'participant', ['yangi'], [[1.0, 0.0]], participant_document=document)
+        assert DocumentChunk.objects.filter(participant_document=document).count() == 1
+        assert store.search([1.0, 0.0], tender_id=tender.id)[0]['text'] == 'yangi'
+
+    def test_find_duplicate_chunks_across_participants(self, tender):
+        store = ChunkVectorStore()
+        first = make_document(tender, 1)
+        second = make_document(tender, 2)
+        store.add_chunks(tender.id, 'participant', ['a', 'b'], [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], participant_document=first)
+        store.add_chunks(tender.id, 'participant', ['a', 'c'], [[1.0, 0.01, 0.0], [0.0, 0.0, 1.0]], participant_document=second)
+
+        duplicates = store.find_duplicate_chunks(tender.id, threshold=0.99)
+        assert len(duplicates) == 1
+        assert {duplicates[0]['tender_participant_id'], duplicates[0]['other_tender_participant_id']} == {
+            first.tender_participant_id, second.tender_participant_id
+        }
+
+    def test_chunk_writer_streams_batches_and_replaces_old_chunks(self, tender):
+        store = ChunkVectorStore()
+        document = make_document(tender, 1)
+        store.add_chunks(tender.id, 'participant', ['eski'], [[1.0, 0.0]], participant_document=document)
+        assert store.search([1.0, 0.0], tender_id=tender.id)[0]['text'] == 'eski'
+
+        embedded = []
+
+        def embed(texts):
+            embedded.append(list(texts))
+            return [[1.0, float(len(text))] for text in texts]
+
+        writer = store.chunk_writer(tender.id, 'participant', embed, 'test-model', participant_document=document)
+        writer.add(['a', 'bb'])
+        writer.add(['ccc'])
+        assert writer.close() == 3
+
+        assert embedded == [['a', 'bb'], ['ccc']]
+        chunks = DocumentChunk.objects.filter(participant_document=document).order_by('chunk_index')
+        assert [(chunk.chunk_index, chunk.text) for chunk in chunks] == [(0, 'a'), (1, 'bb'), (2, 'ccc')]
+        assert store.search([1.0, 0.0], tender_id=tender.id, top_k=1)[0]['text'] != 'eski'